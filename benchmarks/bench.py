@@ -0,0 +1,205 @@
+"""
+Benchmarks every stage of the fitness pipeline over a sweep of agents N, targets M and time steps K.
+
+Results are written to a JSON file and optionally compared against a saved baseline. Cases that need Gurobi are skipped
+when it is not installed or when its license limits the model size. Run from the repository root:
+
+    python benchmarks/bench.py --out results.json
+    python benchmarks/bench.py --out new.json --baseline results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+
+from data_util.catalog_generation import generate_catalog
+from data_util.cr3bp import build_taylor_cr3bp
+from data_util.scenarios import ORBITS
+from data_util.target_generation import TargetGenerator
+from SensorTasking import SSA_Problem
+from SensorTasking.compute_coefficients import (compute_coefficients, iter_coefficients, prune_coefficients,
+                                                solve_model_max, solve_model_maxmin, solve_model_max_blocks,
+                                                solve_model_maxmin_blocks, solve_model_max_sparse,
+                                                solve_model_maxmin_sparse)
+
+TSTEP = 0.015
+TARGET_ORBITS = ["l2_halo", "l1_lyapunov", "l2_lyapunov", "butterfly", "l1_axial", "resonant_2_1"]
+AGENT_ORBITS = ["dro_6_15", "dro_5_03", "l2_lyapunov_1_1", "l1_lyapunov_1_1"]
+
+
+def timeit(func, repeats):
+    """
+    Times a callable.
+
+    Returns:
+        dict: the minimum and median wall time in seconds over the repeats.
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    return {"min": min(times), "median": float(np.median(times)), "repeats": repeats}
+
+def run_case(results, case, params, func, repeats):
+    """
+    Times a case and appends the result. Failures, e.g. a missing or size-limited Gurobi, are recorded as skipped.
+    """
+    try:
+        result = {"case": case, "params": params, "status": "ok", **timeit(func, repeats)}
+    except Exception as e:
+        result = {"case": case, "params": params, "status": f"skipped: {type(e).__name__}: {e}"}
+
+    results.append(result)
+    print(f"{case:28s} {json.dumps(params):40s} " + (f"{result['median']:10.4f} s" if result["status"] == "ok" else result["status"][:60]))
+
+def cycle(names, n):
+    """
+    Returns the initial conditions and periods of n orbits, cycling through the given orbits.
+    """
+    orbits = [ORBITS[names[i % len(names)]] for i in range(n)]
+
+    return np.array([ic for ic, _ in orbits]), np.array([period for _, period in orbits])
+
+def bench_generation(results, n_points, repeats):
+    """
+    Benchmarks the stages that do not depend on the sweep: integrator construction, propagation and spline fitting.
+    """
+    targets, periods = cycle(TARGET_ORBITS, 1)
+    tg = TargetGenerator(targets, periods, n_points=n_points)
+    state_hist, stm_hist = tg.gen_state_history(0, n_points)
+
+    run_case(results, "build_taylor_cr3bp", {}, lambda: build_taylor_cr3bp(tg.mu, stm=True, cached=False), 1)
+    run_case(results, "gen_state_history", {"n_points": n_points}, lambda: tg.gen_state_history(0, n_points), repeats)
+    run_case(results, "make_spline", {"n_points": n_points}, lambda: (tg.make_spline(state_hist, periodic=True),
+                                                                     tg.make_spline(stm_hist, periodic=False)), repeats)
+
+def bench_pipeline(results, N, M, K, repeats, catalog=False):
+    """
+    Benchmarks the stages that depend on the number of agents, targets and time steps. With `catalog`, the targets are
+    distinct orbits drawn from a generated catalog rather than repeats of the hand-picked target orbits.
+    """
+    params = {"N": N, "M": M, "K": K}
+    if catalog:
+        params["catalog"] = True
+        targets, target_periods = generate_catalog(M)
+    else:
+        targets, target_periods = cycle(TARGET_ORBITS, M)
+    agents, agent_periods = cycle(AGENT_ORBITS, N)
+    x = np.linspace(0, 1, N, endpoint=False)
+
+    # ephemeris generation of all agents and targets
+    start = time.perf_counter()
+    p = SSA_Problem(targets, target_periods, agents, agent_periods, tstep=TSTEP, horizon=(K + 0.5) * TSTEP)
+    elapsed = time.perf_counter() - start
+    results.append({"case": "SSA_Problem", "params": params, "status": "ok", "min": elapsed, "median": elapsed, "repeats": 1})
+
+    p._gen_env(x)
+
+    def steps():
+        p.env.reset()
+        for _ in range(K):
+            p.env.step()
+
+    run_case(results, "SpaceEnv.step", params, steps, repeats)
+    run_case(results, "compute_coefficients", params, lambda: compute_coefficients(p.env), repeats)
+
+    information = compute_coefficients(p.env)
+    sparse = prune_coefficients(information)
+
+    for solver in [solve_model_max, solve_model_maxmin]:
+        run_case(results, solver.__name__, params, lambda: solver(information), repeats)
+
+    for solver in [solve_model_max_sparse, solve_model_maxmin_sparse]:
+        run_case(results, solver.__name__, params, lambda: solver(sparse), repeats)
+
+    for solver in [solve_model_max_blocks, solve_model_maxmin_blocks]:
+        run_case(results, solver.__name__, params, lambda: solver(iter_coefficients(p.env, block_size=50)), repeats)
+
+    for opt in ["max", "maxmin"]:
+        p = SSA_Problem(targets, target_periods, agents, agent_periods, opt=opt, tstep=TSTEP, horizon=(K + 0.5) * TSTEP)
+        run_case(results, f"fitness[{opt}]", params, lambda: p.fitness(x), repeats)
+
+    run_case(results, "myopic_fitness", params, lambda: p.myopic_fitness(x), repeats)
+
+def compare(results, baseline, tolerance):
+    """
+    Prints the ratio of each median time to the baseline and returns the number of regressions beyond the tolerance.
+    """
+    reference = {(r["case"], json.dumps(r["params"], sort_keys=True)): r for r in baseline["results"] if r["status"] == "ok"}
+    regressions = 0
+
+    print(f"\n{'case':28s} {'params':40s} {'ratio':>8s}")
+    for result in results:
+        key = (result["case"], json.dumps(result["params"], sort_keys=True))
+        if result["status"] != "ok" or key not in reference:
+            continue
+
+        ratio = result["median"] / reference[key]["median"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  slower"
+            regressions += 1
+        elif ratio < 1 - tolerance:
+            flag = "  faster"
+
+        print(f"{result['case']:28s} {key[1]:40s} {ratio:8.2f}{flag}")
+
+    return regressions
+
+def metadata():
+    """
+    Returns the environment the benchmarks ran in.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+
+    return {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": commit, "python": platform.python_version(),
+            "numpy": np.__version__, "platform": platform.platform(), "cpus": os.cpu_count()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, nargs="+", default=[1, 2, 4], help="numbers of agents N")
+    parser.add_argument("--targets", type=int, nargs="+", default=[3, 6], help="numbers of targets M")
+    parser.add_argument("--steps", type=int, nargs="+", default=[50, 100, 200], help="numbers of time steps K")
+    parser.add_argument("--n-points", type=int, default=500, help="ephemeris samples per period")
+    parser.add_argument("--catalog", action="store_true", help="draw the targets from a generated catalog of orbits")
+    parser.add_argument("--repeats", type=int, default=3, help="repeats of each case, the median is reported")
+    parser.add_argument("--out", default="benchmark.json", help="file the results are written to")
+    parser.add_argument("--baseline", help="results of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = []
+    bench_generation(results, args.n_points, args.repeats)
+
+    for N in args.agents:
+        for M in args.targets:
+            for K in args.steps:
+                bench_pipeline(results, N, M, K, args.repeats, args.catalog)
+
+    with open(args.out, "w") as f:
+        json.dump({"meta": metadata(), "results": results}, f, indent=1)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""
+Accuracy of the information coefficients against the number of time steps, for each quadrature order.
+
+The error is measured on the time average of the information of every observer-target pair over the horizon, relative to
+a reference computed on a fine grid. Run from the experiments directory:
+
+    python quadrature_accuracy.py [scenario ...]
+"""
+import sys
+sys.path.append("../src")
+
+import numpy as np
+
+from SensorTasking import SSA_Problem
+from SensorTasking.compute_coefficients import compute_coefficients
+from data_util.scenarios import SCENARIOS, load_scenario
+
+STEPS = [25, 50, 100, 200, 400]
+QUAD_ORDERS = [1, 2, 3, 4]
+REFERENCE_STEPS = 4000
+
+
+def mean_information(p: SSA_Problem, steps: int, quad_order: int) -> np.ndarray:
+    # the grid must cover the whole horizon, maxsteps is floor(period / tstep)
+    p.set_fidelity(tstep=p.period / (steps + 1e-9), quad_order=quad_order)
+    p._gen_env(np.zeros(p.num_agents))
+
+    return compute_coefficients(p.env, quad_order=quad_order).mean(axis=0)
+
+
+def main(scenarios):
+    for name in scenarios:
+        p = SSA_Problem(**load_scenario(name))
+        reference = mean_information(p, REFERENCE_STEPS, max(QUAD_ORDERS))
+
+        print(f"\nscenario {name}: relative error of the mean information")
+        print("steps " + "".join(f"{f'p={q}':>12}" for q in QUAD_ORDERS))
+
+        for steps in STEPS:
+            errors = [np.linalg.norm(mean_information(p, steps, q) - reference) / np.linalg.norm(reference) for q in QUAD_ORDERS]
+            print(f"{steps:5d} " + "".join(f"{e:12.2e}" for e in errors))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or list(SCENARIOS))
@@ -0,0 +1,60 @@
+"""
+Accuracy of the STM of a Spline beyond the fitted period, against a direct propagation.
+
+The STM spline of an orbit is fitted over one period and extended with its monodromy matrix. The history of a phased orbit
+starts at Phi(phase * T, 0), so the extension is checked at non-zero phases as well, for scalar and array times. The
+extension assumes the orbit is periodic, so the default orbits are those whose periods are known to full precision. Run
+from the experiments directory:
+
+    python stm_extension.py [orbit ...]
+"""
+import sys
+sys.path.append("../src")
+
+import numpy as np
+
+from SensorTasking import Spline
+from data_util.scenarios import ORBITS
+from data_util.target_generation import TargetGenerator
+
+PHASES = [0.0, 0.3, 0.7]
+REVOLUTIONS = [0.5, 1.6, 2.3]
+TOLERANCE = 1e-4
+ORBITS_CHECKED = ["l2_lyapunov", "l1_axial", "butterfly", "dro_5_03"]
+
+
+def propagated_stm(gen: TargetGenerator, t: float) -> np.ndarray:
+    gen.r.time = 0
+    gen.r.state[:] = np.hstack((gen.catalog[0], np.eye(gen.dim).flatten()))
+    gen.r.propagate_for(delta_t=t)
+
+    return gen.r.state[gen.dim:].reshape(6, 6).copy()
+
+
+def main(orbits):
+    failures = 0
+
+    for name in orbits:
+        ic, period = ORBITS[name]
+        gen = TargetGenerator([ic], [period])
+
+        print(f"\norbit {name}: relative error of the STM against propagation")
+        print("phase " + "".join(f"{f't={revs}T':>12}" for revs in REVOLUTIONS) + f"{'array':>12}")
+
+        for phase in PHASES:
+            target = gen.gen_phased_ic(0, phase)
+            spline = Spline(0.1, target["spline"], target["stm_spline"], period)
+
+            times = np.array(REVOLUTIONS) * period
+            expected = [propagated_stm(gen, (phase + revs) * period) for revs in REVOLUTIONS]
+            errors = [np.linalg.norm(spline.eval_stm_spl(t).reshape(6, 6) - phi) / np.linalg.norm(phi) for t, phi in zip(times, expected)]
+            errors.append(max(np.linalg.norm(stm.reshape(6, 6) - phi) / np.linalg.norm(phi) for stm, phi in zip(spline.eval_stm_spl(times), expected)))
+
+            failures += max(errors) > TOLERANCE
+            print(f"{phase:5.2f} " + "".join(f"{e:12.2e}" for e in errors) + ("  FAILED" if max(errors) > TOLERANCE else ""))
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:] or ORBITS_CHECKED))
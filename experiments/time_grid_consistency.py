@@ -0,0 +1,51 @@
+"""
+Consistency of the information coefficients on a non-uniform time grid.
+
+A step of a non-uniform grid counts as its number of nominal time steps, so the coefficients of a grid whose steps merge
+groups of uniform steps must sum over the horizon to those of the uniform grid. The quadrature order is high enough that
+the information varies polynomially within a merged step. Run from the experiments directory:
+
+    python time_grid_consistency.py [scenario ...]
+"""
+import sys
+sys.path.append("../src")
+
+import numpy as np
+
+from SensorTasking import SSA_Problem
+from SensorTasking.compute_coefficients import compute_coefficients
+from data_util.scenarios import SCENARIOS, load_scenario
+
+MERGES = [1, 2, 4]
+QUAD_ORDER = 8
+TOLERANCE = 1e-5
+
+
+def total_information(p: SSA_Problem, merge: int) -> np.ndarray:
+    p._gen_env(np.zeros(p.num_agents))
+
+    # boundaries of the uniform grid, keeping every `merge`-th one, over a horizon that every merge divides
+    steps = p.maxsteps - p.maxsteps % np.lcm.reduce(MERGES)
+    p.env.set_times(np.arange(0, steps + 1, merge) * p.env.tstep)
+
+    return compute_coefficients(p.env, quad_order=QUAD_ORDER).sum(axis=0)
+
+
+def main(scenarios):
+    failures = 0
+
+    for name in scenarios:
+        p = SSA_Problem(**load_scenario(name))
+        reference = total_information(p, 1)
+
+        print(f"\nscenario {name}: relative error of the total information against the uniform grid")
+        for merge in MERGES[1:]:
+            error = np.linalg.norm(total_information(p, merge) - reference) / np.linalg.norm(reference)
+            failures += error > TOLERANCE
+            print(f"merged steps {merge:2d} {error:12.2e}" + ("  FAILED" if error > TOLERANCE else ""))
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:] or list(SCENARIOS)))
@@ -1,5 +1,71 @@
-from .spacenv import SpaceEnv
-from .state import Spline, Dynamics
-from .search_methods import greedy_search, search, sga_search
-from .ssa_problem import SSA_Problem, Greedy_SSA_Problem
-from .main import run_experiment
\ No newline at end of file
+import importlib
+import sys
+import types
+
+# public name -> submodule defining it. Submodules are imported on first access, so that `import SensorTasking` does
+# not load pygmo (searches), gurobipy (solvers) or heyoka (propagation), and the NumPy paths work without them installed.
+_EXPORTS = {
+    "SpaceEnv": "spacenv",
+    "Spline": "state",
+    "Dynamics": "state",
+    "InformationFilter": "information_filter",
+    "control_to_index": "control",
+    "index_to_control": "control",
+    "index_objective": "control",
+    "Stats": "instrumentation",
+    "Tracer": "instrumentation",
+    "export_chrome_trace": "instrumentation",
+    "trace": "instrumentation",
+    "Progress": "progress",
+    "read_events": "progress",
+    "nearest_targets": "spatial",
+    "range_pairs": "spatial",
+    "range_triples": "spatial",
+    "aggregate_steps": "aggregation",
+    "expand_control": "aggregation",
+    "adaptive_time_grid": "time_grid",
+    "geometry_rates": "time_grid",
+    "greedy_search": "search_methods",
+    "lazy_greedy_search": "search_methods",
+    "search": "search_methods",
+    "sga_search": "search_methods",
+    "island_sga_search": "search_methods",
+    "SSA_Problem": "ssa_problem",
+    "Greedy_SSA_Problem": "ssa_problem",
+    "receding_horizon": "receding_horizon",
+    "monte_carlo": "monte_carlo",
+    "run_experiment": "main",
+    "Server": "server",
+    "Client": "server",
+    "serve": "server",
+    "sweep_configs": "batch",
+    "sweep_from_spec": "batch",
+    "run_batch": "batch",
+    "ResultStore": "batch",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+class _Package(types.ModuleType):
+    """
+    Importing a submodule binds it on the package, which would shadow the function of the same name, e.g. `monte_carlo`.
+    """
+    def __setattr__(self, name, value):
+        if isinstance(value, types.ModuleType) and _EXPORTS.get(name) == name:
+            return
+
+        super().__setattr__(name, value)
+
+sys.modules[__name__].__class__ = _Package
@@ -0,0 +1,59 @@
+import numpy as np
+from typing import Optional, Tuple
+
+
+def aggregate_steps(information: np.ndarray[float],
+                    max_length: Optional[int] = 8,
+                    depth: Optional[int] = None) -> Tuple[np.ndarray[float], np.ndarray[int]]:
+    """
+    Merges runs of consecutive time steps with a stable ranking of targets into super-steps.
+
+    A super-step ends when the ranking of targets by information of any observer changes, or when it reaches
+    `max_length` steps. The information coefficients of its steps are summed, and each observer looks at a single target
+    for the whole super-step.
+
+    Parameters:
+        information (np.ndarray[float]): Information coefficients of shape (steps, observers, targets).
+        max_length (Optional[int]): Maximum number of steps in a super-step. Unbounded if None. Defaults to 8.
+        depth (Optional[int]): Number of top-ranked targets compared between steps. Compares the full ranking if None.
+
+    Returns:
+        Tuple[np.ndarray[float], np.ndarray[int]]: Information coefficients of shape (super-steps, observers, targets),
+        and the first step of each super-step followed by the number of steps, of shape (super-steps + 1,).
+
+    Notes:
+        - Solving the aggregated problem restricts the original problem, so its objective is a lower bound for both the
+          max and maxmin objectives. The bound is tight where the ranking does not change within a super-step.
+    """
+    steps = information.shape[0]
+    if steps == 0:
+        return information.copy(), np.zeros(1, dtype=int)
+
+    ranks = np.argsort(-information, axis=2, kind="stable")[:, :, :depth]
+
+    # a new run begins wherever the ranking of any observer changes
+    changed = np.any(ranks[1:] != ranks[:-1], axis=(1, 2))
+    runs = np.concatenate(([0], np.flatnonzero(changed) + 1, [steps]))
+
+    boundaries = []
+    for start, stop in zip(runs[:-1], runs[1:]):
+        boundaries.extend(range(start, stop, max_length or stop - start))
+    boundaries.append(steps)
+
+    segments = np.array(boundaries, dtype=int)
+
+    return np.add.reduceat(information, segments[:-1], axis=0), segments
+
+def expand_control(control: np.ndarray[int], segments: np.ndarray[int]) -> np.ndarray[int]:
+    """
+    Expands a control over super-steps back to full resolution.
+
+    Parameters:
+        control (np.ndarray[int]): Control over super-steps, either a binary assignment matrix of shape
+            (super-steps, observers, targets) or its compact form of shape (super-steps, observers).
+        segments (np.ndarray[int]): Boundaries of the super-steps, as returned by `aggregate_steps`.
+
+    Returns:
+        np.ndarray[int]: Control of the same form over the original time steps.
+    """
+    return np.repeat(control, np.diff(segments), axis=0)
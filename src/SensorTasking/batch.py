@@ -0,0 +1,418 @@
+import argparse
+import glob
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from data_util.catalog_generation import DEFAULT_CACHE_DIR
+from data_util.target_generation import TargetGenerator, set_ephemeris_cache
+
+from .control import control_to_index
+from .progress import Progress
+
+DEFAULT_EPHEMERIS_CACHE = os.path.join(DEFAULT_CACHE_DIR, "ephemerides")
+
+# scalar columns of a ResultStore and their dtypes. phases and control are list columns, stored as values and offsets.
+_COLUMNS = {"key": str, "obj": str, "method": str, "agent_set": str, "guess": np.int64, "n_agents": np.int64,
+            "status": str, "error": str, "objective": np.float64, "evaluations": np.int64, "wall_time": np.float64,
+            "stage_times": str}
+
+
+def sweep_configs(objectives: List[str],
+                  methods: List[str],
+                  targets: ArrayLike,
+                  target_periods: ArrayLike,
+                  agent_sets: Dict[str, Tuple[ArrayLike, ArrayLike]],
+                  init_phase_guesses: Optional[Union[list, Dict[str, list]]] = None,
+                  fidelity_schedule: Optional[List[dict]] = None) -> List[dict]:
+    """
+    Expands a sweep, objective x method x agent set x initial guess, into the configurations of `run_experiment`.
+
+    Parameters:
+        objectives (List[str]): Objectives, "max" and/or "maxmin".
+        methods (List[str]): Search methods, see `run_experiment`.
+        targets (ArrayLike): Target initial conditions, shared by all configurations.
+        target_periods (ArrayLike): Target periods.
+        agent_sets (Dict[str, Tuple[ArrayLike, ArrayLike]]): Initial conditions and periods of the agents, by name.
+        init_phase_guesses (Optional[Union[list, Dict[str, list]]]): Initial guesses, each None or of shape
+            (n, agents). A list is shared by all agent sets, a dict gives the guesses of each agent set. Defaults to [None].
+        fidelity_schedule (Optional[List[dict]]): Passed to `run_experiment`.
+
+    Returns:
+        List[dict]: The configurations, each with a "key" identifying its arguments. Configurations with identical
+            arguments, e.g. a guess listed twice or two names for the same agents, are kept once.
+    """
+    if init_phase_guesses is None:
+        init_phase_guesses = [None]
+
+    configs = {}
+    for obj, method, (name, (agents, agent_periods)) in itertools.product(objectives, methods, agent_sets.items()):
+        agents = np.atleast_2d(np.asarray(agents, dtype=float))
+        guesses = init_phase_guesses[name] if isinstance(init_phase_guesses, dict) else init_phase_guesses
+
+        for g, guess in enumerate(guesses):
+            if guess is not None:
+                guess = np.atleast_2d(np.asarray(guess, dtype=float))
+                if guess.shape[1] != agents.shape[0]:
+                    raise ValueError(f"initial guess {g} has {guess.shape[1]} columns but agent set {name!r} has {agents.shape[0]} agents")
+
+            config = {"obj": obj.lower(), "method": method.lower(), "agent_set": name, "guess": g,
+                      "targets": np.asarray(targets, dtype=float), "target_periods": np.asarray(target_periods, dtype=float),
+                      "agents": agents, "agent_periods": np.asarray(agent_periods, dtype=float),
+                      "init_phase_guess": guess, "fidelity_schedule": fidelity_schedule}
+            config["key"] = _config_key(config)
+
+            configs.setdefault(config["key"], config)
+
+    return list(configs.values())
+
+def sweep_from_spec(spec: dict) -> List[dict]:
+    """
+    Expands a sweep specification, e.g. loaded from JSON, whose orbits are names of `data_util.scenarios.ORBITS`.
+
+    Parameters:
+        spec (dict): {"objectives": [...], "methods": [...], "targets": [orbit, ...], "agent_sets": {name: [orbit, ...]},
+            "init_phase_guesses": [...] or {name: [...]}, "fidelity_schedule": [...]}. The last two are optional.
+
+    Returns:
+        List[dict]: The configurations, see `sweep_configs`.
+    """
+    from data_util.scenarios import ORBITS
+
+    def orbits(names):
+        return np.array([ORBITS[name][0] for name in names]), np.array([ORBITS[name][1] for name in names])
+
+    targets, target_periods = orbits(spec["targets"])
+
+    return sweep_configs(spec["objectives"], spec["methods"], targets, target_periods,
+                         {name: orbits(names) for name, names in spec["agent_sets"].items()},
+                         init_phase_guesses=spec.get("init_phase_guesses"),
+                         fidelity_schedule=spec.get("fidelity_schedule"))
+
+def run_batch(configs: List[dict],
+              store: Union[str, "ResultStore"],
+              n_workers: Optional[int] = None,
+              islands_per_worker: Optional[int] = 1,
+              ephemeris_cache: Optional[str] = DEFAULT_EPHEMERIS_CACHE,
+              flush_every: Optional[int] = 8,
+              progress: Optional[Progress] = None) -> "ResultStore":
+    """
+    Runs configurations of `run_experiment` across a process pool and appends their results to a ResultStore.
+
+    Configurations already in the store are skipped, so an interrupted batch resumes where it stopped. A configuration
+    that raises, or whose worker process dies, is stored with its error rather than stopping the batch, and is run again
+    by the next batch. Results that finished before an interruption are written to the store.
+
+    Parameters:
+        configs (List[dict]): Configurations, from `sweep_configs` or `sweep_from_spec`.
+        store (Union[str, ResultStore]): The store, or its directory.
+        n_workers (Optional[int]): Number of worker processes. Defaults to the number of CPUs. 1 runs in this process.
+        islands_per_worker (Optional[int]): Size of the pool of pygmo island processes of each worker. Defaults to 1, so
+            that the batch uses about `n_workers` CPUs.
+        ephemeris_cache (Optional[str]): Directory the workers share the ephemerides of the orbits through. Defaults to
+            `DEFAULT_EPHEMERIS_CACHE`. None fits them in every problem.
+        flush_every (Optional[int]): Number of results written to the store together. Defaults to 8.
+        progress (Optional[Progress]): Receives a "config" event per finished configuration. Defaults to printing them.
+
+    Returns:
+        ResultStore: The store.
+
+    Notes:
+        - Workers are spawned, so scripts must guard the call with `if __name__ == "__main__":`.
+    """
+    if not isinstance(store, ResultStore):
+        store = ResultStore(store)
+
+    if progress is None:
+        progress = Progress()
+
+    if n_workers is None:
+        n_workers = os.cpu_count()
+
+    done = store.keys()
+    pending = [config for config in configs if config["key"] not in done]
+    progress.emit("batch", n_configs=len(configs), n_pending=len(pending), n_workers=n_workers)
+
+    rows = []
+    finished = 0
+
+    previous = set_ephemeris_cache(ephemeris_cache)
+    try:
+        # fit every orbit once, before the workers would all fit the same ones
+        if ephemeris_cache is not None:
+            _warm_ephemerides(pending)
+
+        def collect(row):
+            nonlocal finished
+            finished += 1
+            rows.append(row)
+            progress.emit("config", done=len(configs) - len(pending) + finished, total=len(configs),
+                          **{name: row[name] for name in ["obj", "method", "agent_set", "guess", "status", "objective", "wall_time"]})
+            if len(rows) >= flush_every:
+                store.append(rows)
+                rows.clear()
+
+        if n_workers == 1:
+            for config in pending:
+                collect(_run_config(config))
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_worker, initargs=(ephemeris_cache, islands_per_worker)) as executor:
+                futures = {executor.submit(_run_config, config): config for config in pending}
+
+                for future in as_completed(futures):
+                    try:
+                        row = future.result()
+                    except Exception as e:
+                        # e.g. BrokenProcessPool when a worker dies in a native library
+                        row = _error_row(futures[future], e)
+                    collect(row)
+    finally:
+        # keep the results that finished before an interruption
+        store.append(rows)
+        set_ephemeris_cache(previous)
+
+    return store
+
+class ResultStore:
+    """
+    Columnar on-disk store of the results of `run_batch`.
+
+    Results are appended as part files, each an uncompressed .npz with one array per column, written under a temporary
+    name and renamed so that a crash never leaves a partial part. Reading a column only loads that column of every part.
+
+    Columns:
+        - key, obj, method, agent_set, guess, n_agents: the configuration
+        - status: "ok" or "error", and error: the exception of a failed configuration
+        - objective, evaluations (fitness evaluations of the search), wall_time in seconds
+        - stage_times: JSON of the duration of each stage of the search, e.g. "optimization" and "control"
+        - phases: optimized phases of each configuration, of shape (agents,)
+        - control: compact control of each configuration, of shape (steps, agents), see `control_to_index`
+
+    Parameters:
+        path (str): Directory of the store, created if needed.
+
+    Methods:
+        append(rows): Writes results as a new part.
+        read(columns): Returns columns of all results.
+        keys(): Returns the keys of the configurations that ran successfully.
+        compact(): Merges all parts into one.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def append(self, rows: List[dict]):
+        """
+        Writes results as a new part.
+
+        Parameters:
+            rows (List[dict]): Results, from `_run_config`.
+
+        Returns:
+            None
+        """
+        if not rows:
+            return
+
+        columns = {name: np.array([row[name] for row in rows], dtype=dtype) for name, dtype in _COLUMNS.items()}
+
+        for name, dtype in [("phases", np.float64), ("control", np.int16)]:
+            values = [np.asarray(row[name], dtype=dtype) for row in rows]
+            columns[f"{name}_values"] = np.concatenate([v.reshape(-1) for v in values])
+            columns[f"{name}_offsets"] = np.cumsum([0] + [v.size for v in values])
+        columns["control_steps"] = np.array([np.shape(row["control"])[0] for row in rows], dtype=np.int64)
+
+        self._write(columns)
+
+    def read(self, columns: Optional[List[str]] = None) -> dict:
+        """
+        Returns columns of all results.
+
+        Parameters:
+            columns (Optional[List[str]]): Names of the columns. Defaults to all.
+
+        Returns:
+            dict: Each scalar column as an array, and "phases" and "control" as lists of arrays.
+        """
+        if columns is None:
+            columns = list(_COLUMNS) + ["phases", "control"]
+
+        result = {name: [] for name in columns}
+        for part in self._parts():
+            with np.load(part) as data:
+                for name in columns:
+                    if name in _COLUMNS:
+                        result[name].append(data[name])
+                    else:
+                        values, offsets = data[f"{name}_values"], data[f"{name}_offsets"]
+                        arrays = np.split(values, offsets[1:-1])
+                        if name == "control":
+                            arrays = [a.reshape(steps, n) for a, steps, n in zip(arrays, data["control_steps"], data["n_agents"])]
+                        result[name].extend(arrays)
+
+        return {name: np.concatenate(values) if name in _COLUMNS and values else
+                      (np.array([], dtype=_COLUMNS[name]) if name in _COLUMNS else values) for name, values in result.items()}
+
+    def keys(self) -> set:
+        """
+        Returns the keys of the configurations that ran successfully.
+
+        Returns:
+            set: The keys.
+        """
+        data = self.read(["key", "status"])
+
+        return set(data["key"][data["status"] == "ok"].tolist())
+
+    def compact(self):
+        """
+        Merges all parts into one, keeping the last successful result of each configuration, or its last error if it
+        never succeeded.
+
+        Returns:
+            None
+        """
+        parts = self._parts()
+        if len(parts) < 2:
+            return
+
+        data = self.read()
+        keep = {}
+        for i, (key, status) in enumerate(zip(data["key"], data["status"])):
+            if status == "ok" or key not in keep or data["status"][keep[key]] != "ok":
+                keep[key] = i
+
+        self.append([{name: data[name][i] for name in data} for i in sorted(keep.values())])
+
+        for part in parts:
+            os.remove(part)
+
+    def _write(self, columns: dict):
+        """
+        Writes columns as a new part.
+        """
+        parts = self._parts()
+        index = 1 + max([int(os.path.basename(p)[5:-4]) for p in parts], default=-1)
+        path = os.path.join(self.path, f"part-{index:05d}.npz")
+
+        tmp = os.path.join(self.path, f".part-{index:05d}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **columns)
+        os.replace(tmp, path)
+
+    def _parts(self) -> List[str]:
+        """
+        Returns the paths of the parts, in the order they were written.
+        """
+        return sorted(glob.glob(os.path.join(self.path, "part-*.npz")))
+
+def _config_key(config: dict) -> str:
+    """
+    Returns a key identifying the arguments of `run_experiment` of a configuration.
+    """
+    arguments = {name: config[name] for name in ["obj", "method", "targets", "target_periods", "agents", "agent_periods",
+                                                 "init_phase_guess", "fidelity_schedule"]}
+
+    return hashlib.sha1(json.dumps(arguments, sort_keys=True, default=lambda a: np.asarray(a).tolist()).encode()).hexdigest()
+
+def _init_worker(ephemeris_cache: Optional[str], islands_per_worker: int):
+    """
+    Sets the ephemeris cache of a worker process and starts its pool of pygmo islands, which pygmo can only start from
+    the main thread of a process.
+    """
+    set_ephemeris_cache(ephemeris_cache)
+
+    try:
+        import pygmo as pg
+    except ImportError: # the searches report it
+        return
+
+    pg.mp_island.init_pool(islands_per_worker)
+
+def _warm_ephemerides(configs: List[dict]):
+    """
+    Fits the splines of every target and agent of the configurations into the ephemeris cache.
+    """
+    orbits = {}
+    for config in configs:
+        for ics, periods in [(config["targets"], config["target_periods"]), (config["agents"], config["agent_periods"])]:
+            for ic, period in zip(ics, periods):
+                orbits.setdefault((ic.tobytes(), float(period)), (ic, period))
+
+    if orbits:
+        tg = TargetGenerator([ic for ic, _ in orbits.values()], [period for _, period in orbits.values()])
+        for i in range(tg.num_options):
+            tg.gen_splines(i)
+
+def _run_config(config: dict) -> dict:
+    """
+    Runs a configuration and returns its result as a row of a ResultStore.
+    """
+    from .main import run_experiment
+
+    stage_times = {}
+
+    def on_event(event):
+        if event["event"] == "stage":
+            stage_times[event["name"]] = stage_times.get(event["name"], 0.) + event["duration"]
+
+    progress = Progress(callback=on_event, echo=False)
+    n_agents = len(config["agent_periods"])
+    row = {name: config[name] for name in ["key", "obj", "method", "agent_set", "guess"]}
+    row["n_agents"] = n_agents
+
+    start = perf_counter()
+    try:
+        phases, control, objective = run_experiment(config["obj"], config["method"], config["targets"],
+                                                    config["target_periods"], config["agents"], config["agent_periods"],
+                                                    init_phase_guess=config["init_phase_guess"],
+                                                    fidelity_schedule=config["fidelity_schedule"], progress=progress)
+        row.update(status="ok", error="", objective=objective, phases=phases,
+                   control=control_to_index(control) if np.ndim(control) == 3 else control)
+    except Exception as e:
+        row = _error_row(config, e)
+
+    row.update(evaluations=progress.evaluations, wall_time=perf_counter() - start, stage_times=json.dumps(stage_times))
+
+    return row
+
+def _error_row(config: dict, error: Exception) -> dict:
+    """
+    Returns the row of a configuration that raised, or whose worker died.
+    """
+    n_agents = len(config["agent_periods"])
+    row = {name: config[name] for name in ["key", "obj", "method", "agent_set", "guess"]}
+
+    row.update(n_agents=n_agents, status="error", error=f"{type(error).__name__}: {error}", objective=np.nan,
+               phases=np.full(n_agents, np.nan), control=np.zeros((0, n_agents), dtype=np.int16), evaluations=0,
+               wall_time=np.nan, stage_times="{}")
+
+    return row
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a sweep of experiments and store their results.")
+    parser.add_argument("spec", help="JSON sweep specification, see `sweep_from_spec`")
+    parser.add_argument("--store", required=True, help="directory of the result store")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes, defaults to the number of CPUs")
+    parser.add_argument("--islands-per-worker", type=int, default=1, help="pygmo island processes of each worker")
+    parser.add_argument("--ephemeris-cache", default=DEFAULT_EPHEMERIS_CACHE, help="directory of the shared ephemerides")
+    args = parser.parse_args(argv)
+
+    with open(args.spec) as f:
+        configs = sweep_from_spec(json.load(f))
+
+    run_batch(configs, args.store, n_workers=args.workers, islands_per_worker=args.islands_per_worker,
+              ephemeris_cache=args.ephemeris_cache)
+
+
+if __name__ == "__main__":
+    main()
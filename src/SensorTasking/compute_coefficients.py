@@ -1,16 +1,39 @@
 import numpy as np
-import gurobipy as gp
-from gurobipy import GRB
-
-from .spacenv import SpaceEnv
-
-
-def compute_coefficients(env: SpaceEnv):
+import threading
+from typing import Optional, Iterable, List, Tuple, NamedTuple
+import scipy.sparse as sp
+
+# gurobipy is imported by `_require_gurobi` on the first solve, the information coefficients do not need a solver
+gp = None
+GRB = None
+
+# Gurobi environment of each thread, see `_gurobi_env`
+_gurobi_envs = threading.local()
+
+from .spacenv import SpaceEnv, obs_jacobian
+from .information_filter import measurement_noise
+from .spatial import range_triples
+from .control import control_to_index
+from .instrumentation import Stats, timer
+
+
+def compute_coefficients(env: SpaceEnv,
+                         filename: Optional[str] = None,
+                         block_size: Optional[int] = 64,
+                         max_range: Optional[float] = None,
+                         quad_order: Optional[int] = 1,
+                         stats: Optional[Stats] = None):
     """
     Computes the information coefficients for the linear program.
 
     Parameters:
         env (SpaceEnv): The environment containing observers and targets.
+        filename (Optional[str]): If given, the coefficients are written block by block to a memory-mapped .npy file at
+            this path instead of being held in memory.
+        block_size (int): Number of time steps computed at once. See `iter_coefficients`.
+        max_range (Optional[float]): If given, coefficients of observer-target pairs farther apart are zero. See `iter_coefficients`.
+        quad_order (int): Number of Gauss-Legendre nodes per time step. See `iter_coefficients`.
+        stats (Optional[Stats]): If given, the time spent computing coefficients is added to it. See `iter_coefficients`.
 
     Returns:
         np.ndarray[float]: Information coefficients for each observer and truth at each time step.
@@ -22,39 +45,347 @@ def compute_coefficients(env: SpaceEnv):
         - The function iterates over time steps in the environment and computes the information coefficients
           for each observer-truth pair.
     """
+    shape = (env.maxsteps, env.observers.size, env.truths.size)
+
+    if filename is None:
+        information = np.zeros(shape=shape, dtype=float)
+    else:
+        information = np.lib.format.open_memmap(filename, mode="w+", dtype=float, shape=shape)
+
+    k = 0
+    for block in iter_coefficients(env, block_size=block_size, max_range=max_range, quad_order=quad_order, stats=stats):
+        information[k:k + block.shape[0]] = block
+        k += block.shape[0]
+
+    return information
+
+def iter_coefficients(env: SpaceEnv,
+                      block_size: Optional[int] = 64,
+                      start_step: Optional[int] = 0,
+                      n_steps: Optional[int] = None,
+                      max_range: Optional[float] = None,
+                      quad_order: Optional[int] = 1,
+                      stats: Optional[Stats] = None):
+    """
+    Computes the information coefficients for the linear program in blocks of consecutive time steps.
+
+    Parameters:
+        env (SpaceEnv): The environment containing observers and targets.
+        block_size (int): Maximum number of time steps in each block.
+        start_step (int): First time step to compute. Defaults to 0.
+        n_steps (Optional[int]): Number of time steps to compute. Defaults to all remaining steps up to `env.maxsteps`.
+        max_range (Optional[float]): If given, only observer-target pairs within this range at the middle of a time step
+            are computed, found with a spatial index over the targets. The states, STMs and Jacobians are only evaluated
+            for these pairs, and the coefficients of all other pairs are zero.
+        quad_order (int): Number of Gauss-Legendre nodes at which the information is averaged over each time step.
+            Defaults to 1, a single sample at the middle of the step.
+        stats (Optional[Stats]): If given, the time spent computing each block is added to the "coefficients" stage and
+            the number of time steps to the "coefficient_steps" counter. The time the consumer spends on a block is excluded.
+
+    Yields:
+        np.ndarray[float]: Information coefficients of the next time steps, of shape (steps, observers, truths).
+
+    Notes:
+        - The environment is reset before the first block and stepped as blocks are consumed, so only one block is held
+          in memory at a time.
+        - On a non-uniform time grid, the coefficients of each step are weighted by its duration relative to `env.tstep`,
+          so the solvers and objectives need no knowledge of the grid.
+        - The states and STMs at all nodes of a block are evaluated in batch from the ephemerides. A rule with p nodes
+          integrates polynomials of degree 2p - 1 exactly, so coarser time steps keep their accuracy as p grows.
+    """
 
     env.reset()
+    env.seek(start_step)
 
-    dt = 0.1*env.tstep # observation time is 10 percent of timstep 
+    if n_steps is None:
+        n_steps = env.maxsteps - start_step
 
-    sigma =  3 * np.pi / 180 # observation uncertainty is 3 degrees
-    R_inv = 1 / sigma**2 * np.block([[np.eye(3), np.zeros(shape=(3, 3))], [np.zeros(shape=(3,3)), (0.5 * dt**2)*np.eye(3)]])
+    # observation time is 10 percent of the nominal timestep. The duration of a step on a non-uniform grid only weighs its
+    # coefficients below, so the velocity information is not scaled by it twice. The filter of `monte_carlo` observes
+    # with the same model.
+    R_inv_diag = measurement_noise(0.1*env.tstep)
 
-    information = np.zeros(shape=(env.maxsteps, env.observers.size, env.truths.size), dtype=float)
+    # Phi(tL, t0)^-1 does not change with the time step
+    phi_tL_t0_invs = [np.linalg.inv(truth.eval_stm_spl(truth.period).reshape(6, 6)) for truth in env.truths]
 
-    for k in range(env.maxsteps):
+    # quadrature nodes as fractions of the time step, weights average the information over the step
+    nodes, weights = np.polynomial.legendre.leggauss(quad_order)
+    nodes = (nodes + 1) / 2
+    weights = weights / 2
 
-        out = env.step()
-        Hs = out[-1]
+    for k0 in range(0, n_steps, block_size):
 
-        for j, truth in enumerate(env.truths):
-            phi_tk_t0 = truth.eval_stm_spl( truth.t - truth.tstep / 2)
-            phi_tL_t0 = truth.eval_stm_spl(truth.period)
+        steps = min(block_size, n_steps - k0)
 
-            # Phi(t2, t1) Phi(t1, t0) = Phi(t2, t0)  ===>   Phi(t2, t1) = Phi(t2, t0) * Phi(t1, t0)^-1    ===== > Phi(t1, t2) = Phi(t1, t0) * Phi(t2, t0)^-1
-            phi_tk_tL = phi_tk_t0.reshape(6, 6) @ np.linalg.inv(phi_tL_t0.reshape(6, 6))
+        with timer(stats, "coefficients"):
+            block = np.zeros(shape=(steps, env.observers.size, env.truths.size), dtype=float)
 
-            for i in range(env.observers.size):
-                information[k, i ,j] = np.trace(phi_tk_tL.T @ Hs[i, j].T @ R_inv @ Hs[i, j] @ phi_tk_tL)
+            t_start, durations = env.step_times(start_step + k0, steps)
+            t = (t_start[:, np.newaxis] + nodes * durations[:, np.newaxis]).reshape(-1)
 
-    return information
+            if max_range is None:
+                observer_states, truth_states = env.get_states(t)
+
+                for j, truth in enumerate(env.truths):
+                    # Phi(t2, t1) Phi(t1, t0) = Phi(t2, t0)  ===>   Phi(t2, t1) = Phi(t2, t0) * Phi(t1, t0)^-1    ===== > Phi(t1, t2) = Phi(t1, t0) * Phi(t2, t0)^-1
+                    phi_tk_tL = truth.eval_stm_spl(t).reshape(-1, 6, 6) @ phi_tL_t0_invs[j]
+
+                    # trace(Phi^T H^T R^-1 H Phi) at every node and observer, with R^-1 diagonal
+                    HPhi = obs_jacobian(truth_states[:, np.newaxis, j], observer_states) @ phi_tk_tL[:, np.newaxis]
+                    info = np.einsum('a,niab,niab->ni', R_inv_diag, HPhi, HPhi).reshape(steps, quad_order, -1)
+
+                    block[:, :, j] = np.einsum('q,kqi->ki', weights, info)
+            else:
+                # (step, observer, target) triples in range at the middle of a step, grouped by target
+                observer_mids, truth_mids = env.get_states(t_start + durations / 2)
+                k, i, j = range_triples(observer_mids[..., :3], truth_mids[..., :3], max_range).T
+
+                order = np.argsort(j, kind="stable")
+                k, i, j = k[order], i[order], j[order]
+                targets, starts = np.unique(j, return_index=True)
+
+                observer_states = np.stack([observer.spl(t) for observer in env.observers], axis=1).reshape(steps, quad_order, -1, 6)
+                t = t.reshape(steps, quad_order)
+
+                # the states and STMs of a target are only evaluated at the steps it is in range of an observer, and the
+                # Jacobians only for the triples in range
+                for j, start, stop in zip(targets, starts, np.append(starts[1:], k.size)):
+                    truth = env.truths[j]
+                    steps_j, pair_steps = np.unique(k[start:stop], return_inverse=True)
+                    t_j = t[steps_j].reshape(-1)
+
+                    phi_tk_tL = (truth.eval_stm_spl(t_j).reshape(-1, 6, 6) @ phi_tL_t0_invs[j]).reshape(steps_j.size, quad_order, 6, 6)
+                    truth_states = truth.spl(t_j).reshape(steps_j.size, quad_order, 6)
+
+                    HPhi = obs_jacobian(truth_states[pair_steps], observer_states[k[start:stop], :, i[start:stop]]) @ phi_tk_tL[pair_steps]
+                    info = np.einsum('a,pqab,pqab->pq', R_inv_diag, HPhi, HPhi)
+
+                    block[k[start:stop], i[start:stop], j] = info @ weights
+
+            # a step of a non-uniform grid counts as its number of nominal time steps
+            block *= (durations / env.tstep)[:, np.newaxis, np.newaxis]
+
+        env.seek(start_step + k0 + steps)
+
+        if stats is not None:
+            stats.add("coefficient_steps", steps)
+
+        yield block
+
+def _require_gurobi():
+    """
+    Imports gurobipy, which solves the integer linear programs, or raises an ImportError if it is not installed.
+    """
+    global gp, GRB
+
+    if gp is None:
+        try:
+            import gurobipy
+        except ImportError as e:
+            raise ImportError("gurobipy is required to solve the integer linear program") from e
+
+        gp, GRB = gurobipy, gurobipy.GRB
+
+def _gurobi_env():
+    """
+    Returns the Gurobi environment of this thread, started on the first solve. Models of a thread share it instead of
+    each starting an environment and checking out a license, and a long-lived process keeps it warm.
+    """
+    env = getattr(_gurobi_envs, "env", None)
+
+    if env is None:
+        env = gp.Env(empty=True)
+        env.setParam("OutputFlag",0)
+        env.start()
+        _gurobi_envs.env = env
+
+    return env
+
+def _optimize(m, stats: Optional[Stats] = None):
+    """
+    Optimizes a model and raises a RuntimeError if it was not solved. If `stats` is given, the number of solves, the
+    Gurobi runtime in seconds, the branch-and-bound nodes and the simplex iterations are added to its counters.
+    """
+    m.optimize()
+
+    if stats is not None:
+        stats.add("solves")
+        stats.add("gurobi_runtime", m.Runtime)
+        stats.add("gurobi_nodes", int(m.NodeCount))
+        stats.add("gurobi_iterations", int(m.IterCount))
+
+    if m.status != gp.GRB.OPTIMAL:
+        raise RuntimeError("Model was not solved")
+
+class SparseCoefficients(NamedTuple):
+    """
+    Information coefficients of the candidate (time step, observer, target) triples that survive pruning, in COO form.
+
+    Attributes:
+        coords (np.ndarray[int]): Index of each triple, of shape (pairs, 3), sorted by time step and observer.
+        values (np.ndarray[float]): Information coefficient of each triple, of shape (pairs,).
+        shape (Tuple[int, int, int]): Shape of the dense information tensor, (steps, observers, truths).
+    """
+    coords: np.ndarray
+    values: np.ndarray
+    shape: Tuple[int, int, int]
+
+def prune_coefficients(information: np.ndarray[float],
+                       threshold: Optional[float] = 0.,
+                       top_k: Optional[int] = None) -> SparseCoefficients:
+    """
+    Drops the observer-target pairs that carry negligible information.
+
+    Parameters:
+        information (np.ndarray[float]): Information coefficients for each observer and truth at each time step.
+        threshold (float): Coefficients at or below this value are dropped. Defaults to 0, which only drops the zeros
+            left by range-limited coefficients.
+        top_k (Optional[int]): If given, only the `top_k` largest coefficients of each observer at each time step are kept.
+
+    Returns:
+        SparseCoefficients: The surviving coefficients in COO form.
+
+    Notes:
+        - Dropped triples can never be selected, so for the max objective pruning at threshold 0 is exact.
+    """
+    mask = information > threshold
+
+    if top_k is not None and top_k < information.shape[2]:
+        top = np.argpartition(-information, top_k - 1, axis=2)[:, :, :top_k]
+        in_top = np.zeros_like(mask)
+        np.put_along_axis(in_top, top, True, axis=2)
+        mask &= in_top
+
+    return SparseCoefficients(np.argwhere(mask), information[mask], information.shape)
+
+def _sparse_model(sparse: SparseCoefficients, mip_gap: Optional[float] = None):
+    """
+    Builds a model with one binary variable per surviving triple, where each observer looks at no more than one target
+    at each time step.
+
+    Parameters:
+        sparse (SparseCoefficients): Pruned information coefficients.
+        mip_gap (Optional[float]): Relative MIP optimality gap at which the solver terminates. Defaults to Gurobi's default.
+
+    Returns:
+        Tuple[gp.Model, gp.MVar]: The model and its assignment variables.
+    """
+    _require_gurobi()
+
+    env = _gurobi_env()
+
+    m = gp.Model("sensortask", env=env)
+
+    # Silence model output
+    m.Params.LogToConsole = 0
+
+    if mip_gap is not None:
+        m.Params.MIPGap = mip_gap
+
+    n_pairs = sparse.values.size
+    u = m.addMVar(shape=(n_pairs,), vtype=GRB.BINARY, name="u")
 
-def solve_model_max(information: np.ndarray[float]):
+    # observer i can only look at one target at each timestep, one row per (k, i) with surviving triples
+    _, rows = np.unique(sparse.coords[:, 0] * sparse.shape[1] + sparse.coords[:, 1], return_inverse=True)
+    A = sp.csr_matrix((np.ones(n_pairs), (rows, np.arange(n_pairs))), shape=(rows.max(initial=-1) + 1, n_pairs))
+    m.addConstr(A @ u <= 1, name="row")
+
+    return m, u
+
+def _sparse_control(sparse: SparseCoefficients, selected: np.ndarray[bool]) -> np.ndarray[np.int16]:
+    """
+    Converts the selected triples to the compact control.
+
+    Parameters:
+        sparse (SparseCoefficients): Pruned information coefficients.
+        selected (np.ndarray[bool]): Whether each triple is selected, of shape (pairs,).
+
+    Returns:
+        np.ndarray[np.int16]: Index of the target each observer looks at in each time step (-1 if idle), of shape (steps, observers).
+    """
+    index = np.full(sparse.shape[:2], -1, dtype=np.int16)
+    k, i, j = sparse.coords[selected].T
+    index[k, i] = j
+
+    return index
+
+def solve_model_max_sparse(sparse: SparseCoefficients,
+                           mip_gap: Optional[float] = None,
+                           stats: Optional[Stats] = None) -> Tuple[np.ndarray[int], float]:
+    """
+    Solves the max model over the surviving triples of pruned information coefficients.
+
+    Parameters:
+        sparse (SparseCoefficients): Pruned information coefficients, e.g. from `prune_coefficients`.
+        mip_gap (Optional[float]): Relative MIP optimality gap at which the solver terminates. Defaults to Gurobi's default.
+        stats (Optional[Stats]): If given, the time of the solve, including building the model, is added to the "solve"
+            stage, and the Gurobi runtime, nodes and simplex iterations to its counters.
+
+    Returns:
+        Tuple[np.ndarray[np.int16], float]: A tuple containing the compact control, the index of the target each observer
+        looks at in each time step (-1 if idle) of shape (steps, observers), and the objective value.
+    """
+    with timer(stats, "solve"):
+        m, u = _sparse_model(sparse, mip_gap=mip_gap)
+        m.setObjective(sparse.values @ u, GRB.MAXIMIZE)
+
+        _optimize(m, stats)
+
+        return _sparse_control(sparse, np.rint(u.X) > 0), m.getObjective().getValue()
+
+def solve_model_maxmin_sparse(sparse: SparseCoefficients,
+                              offset: Optional[np.ndarray[float]] = None,
+                              mip_gap: Optional[float] = None,
+                              stats: Optional[Stats] = None) -> Tuple[np.ndarray[int], float]:
+    """
+    Solves the maxmin model over the surviving triples of pruned information coefficients.
+
+    Parameters:
+        sparse (SparseCoefficients): Pruned information coefficients, e.g. from `prune_coefficients`.
+        offset (Optional[np.ndarray[float]]): Information already accumulated by each target. Defaults to zero for every target.
+        mip_gap (Optional[float]): Relative MIP optimality gap at which the solver terminates. Defaults to Gurobi's default.
+        stats (Optional[Stats]): If given, the time of the solve, including building the model, is added to the "solve"
+            stage, and the Gurobi runtime, nodes and simplex iterations to its counters.
+
+    Returns:
+        Tuple[np.ndarray[np.int16], float]: A tuple containing the compact control, the index of the target each observer
+        looks at in each time step (-1 if idle) of shape (steps, observers), and the objective value.
+
+    Notes:
+        - A target without surviving triples bounds the objective by its offset.
+    """
+    with timer(stats, "solve"):
+        m, u = _sparse_model(sparse, mip_gap=mip_gap)
+
+        # Create slack variable
+        t = m.addMVar(shape=(1,), vtype=GRB.CONTINUOUS, name="t")
+        m.setObjective(t, GRB.MAXIMIZE)
+
+        num_targets = sparse.shape[2]
+        if offset is None:
+            offset = np.zeros(num_targets)
+
+        # slack variable must be smaller than information of each target
+        B = sp.csr_matrix((sparse.values, (sparse.coords[:, 2], np.arange(sparse.values.size))), shape=(num_targets, sparse.values.size))
+        m.addConstr(B @ u + offset >= np.ones((num_targets, 1)) @ t, name="target")
+
+        _optimize(m, stats)
+
+        return _sparse_control(sparse, np.rint(u.X) > 0), m.getObjective().getValue()
+
+def solve_model_max(information: np.ndarray[float],
+                    mip_gap: Optional[float] = None,
+                    warm_start: Optional[np.ndarray[int]] = None,
+                    stats: Optional[Stats] = None):
     """
     Solves the optimization model to assign observers to targets based on information coefficients.
 
     Parameters:
         information (np.ndarray[float]): Information coefficients for each observer and truth at each time step.
+        mip_gap (Optional[float]): Relative MIP optimality gap at which the solver terminates. Defaults to Gurobi's default.
+        warm_start (Optional[np.ndarray[int]]): Binary assignment matrix used as the MIP start. Defaults to no MIP start.
+        stats (Optional[Stats]): If given, the time of the solve, including building the model, is added to the "solve"
+            stage, and the Gurobi runtime, nodes and simplex iterations to its counters.
 
     Returns:
         Tuple[np.ndarray[int], float]: A tuple containing the binary assignment matrix and the objective value.
@@ -65,41 +396,55 @@ def solve_model_max(information: np.ndarray[float]):
         - The optimization model maximizes the total information obtained by assigning observers to targets.
         - Each observer is constrained to look at only one target at each time step.
     """
-    env = gp.Env(empty=True)
-    env.setParam("OutputFlag",0)
-    env.start()
+    with timer(stats, "solve"):
+        _require_gurobi()
 
-    m = gp.Model("sensortask", env=env)
+        env = _gurobi_env()
 
-    # Silence model output
-    m.Params.LogToConsole = 0
+        m = gp.Model("sensortask", env=env)
 
-    # Create variables
-    u = m.addMVar(shape=information.shape, vtype=GRB.BINARY, name="u")
+        # Silence model output
+        m.Params.LogToConsole = 0
 
-    # Set objective
-    obj = information.reshape(-1)
-    m.setObjective(obj @ u.reshape(-1), GRB.MAXIMIZE)
+        if mip_gap is not None:
+            m.Params.MIPGap = mip_gap
 
-    # observer i can only look at one target at each timestep
-    m.addConstr(u.sum(axis=2) <= 1, name="row")
+        # Create variables
+        u = m.addMVar(shape=information.shape, vtype=GRB.BINARY, name="u")
 
-    m.optimize()
+        if warm_start is not None:
+            u.Start = warm_start
 
-    if m.status != gp.GRB.OPTIMAL:
-        raise RuntimeError("Model was not solved")
+        # Set objective
+        obj = information.reshape(-1)
+        m.setObjective(obj @ u.reshape(-1), GRB.MAXIMIZE)
 
-    np.rint(u.X, out=u.X)
-    control = u.X.astype(int)
+        # observer i can only look at one target at each timestep
+        m.addConstr(u.sum(axis=2) <= 1, name="row")
 
-    return control , m.getObjective().getValue()
+        _optimize(m, stats)
 
-def solve_model_maxmin(information: np.ndarray[float]):
+        np.rint(u.X, out=u.X)
+        control = u.X.astype(int)
+
+        return control , m.getObjective().getValue()
+
+def solve_model_maxmin(information: np.ndarray[float],
+                       offset: Optional[np.ndarray[float]] = None,
+                       mip_gap: Optional[float] = None,
+                       warm_start: Optional[np.ndarray[int]] = None,
+                       stats: Optional[Stats] = None):
     """
     Solves the optimization model to assign observers to targets based on information coefficients using the maxmin formulation.
 
     Parameters:
         information (np.ndarray[float]): Information coefficients for each observer and truth at each time step.
+        offset (Optional[np.ndarray[float]]): Information already accumulated by each target, e.g. from observers whose
+            control is held fixed. Defaults to zero for every target.
+        mip_gap (Optional[float]): Relative MIP optimality gap at which the solver terminates. Defaults to Gurobi's default.
+        warm_start (Optional[np.ndarray[int]]): Binary assignment matrix used as the MIP start. Defaults to no MIP start.
+        stats (Optional[Stats]): If given, the time of the solve, including building the model, is added to the "solve"
+            stage, and the Gurobi runtime, nodes and simplex iterations to its counters.
 
     Returns:
         Tuple[np.ndarray[int], float]: A tuple containing the binary assignment matrix and the objective value.
@@ -110,36 +455,117 @@ def solve_model_maxmin(information: np.ndarray[float]):
         - The optimization model maximizes the minimum information amongst targets.
         - Each observer is constrained to look at only one target at each time step.
     """
-    env = gp.Env(empty=True)
-    env.setParam("OutputFlag",0)
-    env.start()
+    with timer(stats, "solve"):
+        _require_gurobi()
 
-    m = gp.Model("sensortask", env=env)
+        env = _gurobi_env()
 
-    # Silence model output
-    m.Params.LogToConsole = 0
+        m = gp.Model("sensortask", env=env)
 
-    # Create indicator variables u
-    u = m.addMVar(shape=information.shape, vtype=GRB.BINARY, name="u")
+        # Silence model output
+        m.Params.LogToConsole = 0
 
-    # Create slack variable
-    t = m.addMVar(shape=(1,), vtype=GRB.CONTINUOUS, name="t")
+        if mip_gap is not None:
+            m.Params.MIPGap = mip_gap
 
-    # Set objective
-    m.setObjective(t, GRB.MAXIMIZE)
+        # Create indicator variables u
+        u = m.addMVar(shape=information.shape, vtype=GRB.BINARY, name="u")
 
-    # Constraints
-    m.addConstr(u.sum(axis=2) <= 1, name="row")  # observer i can only look at one target at each timestep
+        if warm_start is not None:
+            u.Start = warm_start
 
-    for j in range(information.shape[2]):     # slack variable must be smaller than information of each target
-        m.addConstr(u[:,:,j].reshape(-1) @ information[:, :, j].reshape(-1) >= t)
+        # Create slack variable
+        t = m.addMVar(shape=(1,), vtype=GRB.CONTINUOUS, name="t")
 
-    m.optimize()
+        # Set objective
+        m.setObjective(t, GRB.MAXIMIZE)
 
-    if m.status != gp.GRB.OPTIMAL:
-        raise RuntimeError("Model was not solved")
-    
-    np.rint(u.X, out=u.X)
-    control = u.X.astype(int)
+        # Constraints
+        m.addConstr(u.sum(axis=2) <= 1, name="row")  # observer i can only look at one target at each timestep
+
+        if offset is None:
+            offset = np.zeros(information.shape[2])
+
+        for j in range(information.shape[2]):     # slack variable must be smaller than information of each target
+            m.addConstr(u[:,:,j].reshape(-1) @ information[:, :, j].reshape(-1) + offset[j] >= t)
 
-    return control, m.getObjective().getValue()
\ No newline at end of file
+        _optimize(m, stats)
+        
+        np.rint(u.X, out=u.X)
+        control = u.X.astype(int)
+
+        return control, m.getObjective().getValue()
+
+def solve_model_max_blocks(blocks: Iterable[np.ndarray[float]],
+                           mip_gap: Optional[float] = None,
+                           stats: Optional[Stats] = None) -> Tuple[np.ndarray[int], float]:
+    """
+    Solves the max model block by block on a stream of information coefficients.
+
+    Parameters:
+        blocks (Iterable[np.ndarray[float]]): Information coefficients of consecutive time steps, e.g. from `iter_coefficients`.
+        mip_gap (Optional[float]): Relative MIP optimality gap at which the solver terminates. Defaults to Gurobi's default.
+        stats (Optional[Stats]): If given, the solve of each block is added to it. See `solve_model_max`.
+
+    Returns:
+        Tuple[np.ndarray[np.int16], float]: A tuple containing the compact control, the index of the target each observer
+        looks at in each time step (-1 if idle) of shape (steps, observers), and the objective value.
+
+    Notes:
+        - The max objective and constraints decouple across time steps, so solving block by block is exact.
+        - Raises a ValueError if the blocks contain no time steps.
+    """
+    controls = []
+    obj = 0.
+
+    for block in blocks:
+        control, block_obj = solve_model_max(block, mip_gap=mip_gap, stats=stats)
+        controls.append(control_to_index(control))
+        obj += block_obj
+
+    _check_steps(controls)
+
+    return np.concatenate(controls), obj
+
+def solve_model_maxmin_blocks(blocks: Iterable[np.ndarray[float]],
+                              mip_gap: Optional[float] = None,
+                              stats: Optional[Stats] = None) -> Tuple[np.ndarray[int], float]:
+    """
+    Solves the maxmin model block by block on a stream of information coefficients.
+
+    Parameters:
+        blocks (Iterable[np.ndarray[float]]): Information coefficients of consecutive time steps, e.g. from `iter_coefficients`.
+        mip_gap (Optional[float]): Relative MIP optimality gap at which the solver terminates. Defaults to Gurobi's default.
+        stats (Optional[Stats]): If given, the solve of each block is added to it. See `solve_model_max`.
+
+    Returns:
+        Tuple[np.ndarray[np.int16], float]: A tuple containing the compact control, the index of the target each observer
+        looks at in each time step (-1 if idle) of shape (steps, observers), and the objective value.
+
+    Notes:
+        - Each block maximizes the minimum information amongst targets, counting the partial per-target sums of all
+          previous blocks. The result is feasible but in general below the maxmin optimum over the whole horizon.
+        - Raises a ValueError if the blocks contain no time steps.
+    """
+    controls = []
+    target_infos = None
+
+    for block in blocks:
+        if target_infos is None:
+            target_infos = np.zeros(block.shape[2])
+
+        control, _ = solve_model_maxmin(block, offset=target_infos, mip_gap=mip_gap, stats=stats)
+        target_infos += np.einsum('kij,kij->j', control, block)
+        controls.append(control_to_index(control))
+
+    _check_steps(controls)
+
+    return np.concatenate(controls), np.min(target_infos)
+
+def _check_steps(controls: List[np.ndarray[int]]):
+    """
+    Raises a ValueError if the compact controls of the solved blocks have no time steps, since there is then neither a
+    control nor an objective to return.
+    """
+    if sum(len(control) for control in controls) == 0:
+        raise ValueError("blocks must contain at least one time step")
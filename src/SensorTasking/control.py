@@ -0,0 +1,69 @@
+import numpy as np
+
+
+def control_to_index(control: np.ndarray[int]) -> np.ndarray[np.int16]:
+    """
+    Converts a binary assignment matrix to its compact form, the index of the target each observer looks at.
+
+    Parameters:
+        control (np.ndarray[int]): Binary assignment matrix of shape (steps, observers, targets).
+
+    Returns:
+        np.ndarray[np.int16]: Target indices of shape (steps, observers), -1 where an observer is idle.
+    """
+    return np.where(control.any(axis=2), control.argmax(axis=2), -1).astype(np.int16)
+
+def index_to_control(index: np.ndarray[np.int16], num_targets: int) -> np.ndarray[int]:
+    """
+    Converts the compact form of a control to a binary assignment matrix.
+
+    Parameters:
+        index (np.ndarray[np.int16]): Target indices of shape (steps, observers), -1 where an observer is idle.
+        num_targets (int): Number of targets.
+
+    Returns:
+        np.ndarray[int]: Binary assignment matrix of shape (steps, observers, targets).
+    """
+    control = np.zeros(shape=(*index.shape, num_targets), dtype=int)
+    k, i = np.nonzero(index >= 0)
+    control[k, i, index[k, i]] = 1
+
+    return control
+
+def target_information(information: np.ndarray[float], index: np.ndarray[np.int16]) -> np.ndarray[float]:
+    """
+    Computes the information each target receives under a control in compact form.
+
+    Parameters:
+        information (np.ndarray[float]): Information coefficients of shape (steps, observers, targets).
+        index (np.ndarray[np.int16]): Target indices of shape (steps, observers), -1 where an observer is idle.
+
+    Returns:
+        np.ndarray[float]: Information received by each target.
+    """
+    observed = index >= 0
+    values = np.take_along_axis(information, np.maximum(index, 0)[..., np.newaxis].astype(np.intp), axis=2)[..., 0]
+
+    return np.bincount(index[observed], weights=values[observed], minlength=information.shape[2])
+
+def index_objective(information: np.ndarray[float], index: np.ndarray[np.int16], opt: str) -> float:
+    """
+    Evaluates the objective of a control in compact form.
+
+    Parameters:
+        information (np.ndarray[float]): Information coefficients of shape (steps, observers, targets).
+        index (np.ndarray[np.int16]): Target indices of shape (steps, observers), -1 where an observer is idle.
+        opt (str): the objective. One of either "max" or "maxmin"
+
+    Returns:
+        float: objective value
+    """
+    target_infos = target_information(information, index)
+
+    match opt:
+        case "max":
+            return np.sum(target_infos)
+        case "maxmin":
+            return np.min(target_infos)
+        case _:
+            raise RuntimeError(f"The optimization objective f{opt} is not supported")
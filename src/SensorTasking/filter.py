@@ -3,7 +3,7 @@
 #         and  https://en.wikipedia.org/wiki/Extended_Kalman_filter
 
 
-# THIS FILE IS DEPRECATED
+# THIS FILE IS DEPRECATED, use information_filter.InformationFilter
 
 import numpy as np
 from .state import Dynamics
@@ -0,0 +1,240 @@
+import numpy as np
+from typing import List, Optional, Tuple, Union
+
+from .spacenv import SpaceEnv, obs_jacobian
+from .state import Spline
+
+
+def measurement(truth_states: np.ndarray[float], observer_states: np.ndarray[float]) -> np.ndarray[float]:
+    """
+    Computes the angles-only measurement, the line-of-sight unit vector and its rate, broadcasting over all leading
+    dimensions. Its Jacobian with respect to the truth state is `obs_jacobian`.
+
+    Parameters:
+        truth_states (np.ndarray[float]): States of the truths, of shape (..., 6).
+        observer_states (np.ndarray[float]): States of the observers, of shape (..., 6).
+
+    Returns:
+        np.ndarray[float]: Measurements of shape (..., 6).
+    """
+    rOT = truth_states[..., :3] - observer_states[..., :3]
+    vOT = truth_states[..., 3:] - observer_states[..., 3:]
+
+    norm_rOT = np.linalg.norm(rOT, axis=-1, keepdims=True)
+    u = rOT / norm_rOT
+    du = (vOT - u * np.sum(u * vOT, axis=-1, keepdims=True)) / norm_rOT
+
+    return np.concatenate((u, du), axis=-1)
+
+def measurement_noise(dt: float) -> np.ndarray[float]:
+    """
+    Returns the diagonal of the inverse measurement noise covariance used for the information coefficients.
+
+    Parameters:
+        dt (float): Observation time, 10 percent of the nominal time step.
+
+    Returns:
+        np.ndarray[float]: Diagonal of R^-1, of shape (6,).
+    """
+    sigma =  3 * np.pi / 180 # observation uncertainty is 3 degrees
+
+    return 1 / sigma**2 * np.array([1., 1., 1., 0.5 * dt**2, 0.5 * dt**2, 0.5 * dt**2])
+
+
+class InformationFilter:
+    """
+    Extended information filter that tracks all targets at once.
+
+    The means and information matrices of all targets are stacked, optionally behind leading batch dimensions, e.g. for
+    Monte Carlo trials. Forecasts use the STM splines of the targets about their reference trajectories instead of
+    integrating the Riccati equation, and all observations of an instant are applied in one batched update.
+
+    Parameters:
+        truths (np.ndarray[Spline]): Reference trajectories and STMs of the M targets, e.g. `SpaceEnv.truths`.
+        x0 (np.ndarray[float]): Initial estimates of shape (..., M, 6).
+        P0 (np.ndarray[float]): Initial covariances of shape (..., M, 6, 6) or (6, 6) for all targets.
+        Q (Optional[Union[float, np.ndarray[float]]]): Process noise spectral density. The covariance grows by Q times the
+            elapsed time in each forecast. Defaults to 1e-9 I.
+
+    Attributes:
+        x (np.ndarray[float]): Current estimates of shape (..., M, 6).
+        Y (np.ndarray[float]): Current information matrices, the inverse covariances, of shape (..., M, 6, 6).
+        P (np.ndarray[float]): Current covariances, kept in step with `Y`, of shape (..., M, 6, 6).
+        t (float): Current time.
+
+    Methods:
+        reset(): Resets the filter to its initial estimates.
+        covariance(): Returns the current covariances.
+        forecast(t): Propagates all estimates to the requested time.
+        update(observer_states, index, dt, z, weight): Applies the observations of one instant.
+        run(env, index, rng): Filters the targets under a tasking plan.
+    """
+    def __init__(self,
+                 truths: np.ndarray[Spline],
+                 x0: np.ndarray[float],
+                 P0: np.ndarray[float],
+                 Q: Optional[Union[float, np.ndarray[float]]] = None) -> None:
+
+        self.truths = truths
+        self.ic = np.array(x0, dtype=float)
+        self.ic_cov = np.broadcast_to(P0, (*self.ic.shape, 6)).copy()
+        self.ic_info = np.linalg.inv(self.ic_cov)
+        self.Q = 1e-9 * np.eye(6) if Q is None else Q * np.eye(6) if np.ndim(Q) == 0 else Q
+
+        self.reset()
+
+    def reset(self):
+        """
+        Resets the filter to its initial estimates at t = 0.
+        """
+        self.x = self.ic.copy()
+        self.Y = self.ic_info.copy()
+        self.P = self.ic_cov.copy()
+        self.t = 0.
+        self._phi_t0_inv = self._stm_inv(self.t)
+
+    def covariance(self) -> np.ndarray[float]:
+        """
+        Returns the current covariances of shape (..., M, 6, 6).
+        """
+        return self.P
+
+    def forecast(self, t: float):
+        """
+        Propagates all estimates and information matrices to the requested time, with P <- Phi P Phi^T + Q dt.
+
+        Parameters:
+            t (float): Time to propagate to.
+        """
+        x_ref = np.array([truth.spl(self.t) for truth in self.truths])
+        x_ref_next = np.array([truth.spl(t) for truth in self.truths])
+
+        # Phi(t, t_prev) = Phi(t, 0) Phi(t_prev, 0)^-1
+        phi = np.array([truth.eval_stm_spl(t).reshape(6, 6) for truth in self.truths]) @ self._phi_t0_inv
+
+        self.x = x_ref_next + (phi @ (self.x - x_ref)[..., np.newaxis])[..., 0]
+
+        P = phi @ self.P @ np.swapaxes(phi, -1, -2) + self.Q * (t - self.t)
+        self.P = 0.5 * (P + np.swapaxes(P, -1, -2))
+        self.Y = np.linalg.inv(self.P)
+
+        self.t = t
+        self._phi_t0_inv = self._stm_inv(t)
+
+    def update(self,
+               observer_states: np.ndarray[float],
+               index: np.ndarray[int],
+               dt: float,
+               z: Optional[np.ndarray[float]] = None,
+               weight: Optional[float] = 1.):
+        """
+        Applies the observations of one instant to all targets at once.
+
+        Parameters:
+            observer_states (np.ndarray[float]): States of the N observers, of shape (N, 6).
+            index (np.ndarray[int]): Index of the target each observer looks at, of shape (N,), -1 where an observer is idle.
+            dt (float): Observation time, see `measurement_noise`.
+            z (Optional[np.ndarray[float]]): Measurements of the observed targets in the order of the observing observers,
+                of shape (..., n_observing, 6). If None, only the information matrices are updated.
+            weight (Optional[float]): Number of observations the update counts as, which scales R^-1. Defaults to 1.
+        """
+        observing = np.flatnonzero(index >= 0)
+        if observing.size == 0:
+            return
+
+        targets = index[observing]
+        R_inv = weight * measurement_noise(dt)
+
+        # H evaluated at the current estimates, of shape (..., n_observing, 6, 6)
+        x_obs = self.x[..., targets, :]
+        H = obs_jacobian(x_obs, observer_states[observing])
+        HtRinv = np.swapaxes(H, -1, -2) * R_inv
+        HtRinvH = HtRinv @ H
+
+        if z is not None:
+            innovation = z - measurement(x_obs, observer_states[observing]) + (H @ x_obs[..., np.newaxis])[..., 0]
+            y_obs = (HtRinv @ innovation[..., np.newaxis])[..., 0]
+            y = (self.Y @ self.x[..., np.newaxis])[..., 0]
+
+        Y = self.Y.copy()
+
+        # several observers may look at the same target, their contributions add up
+        for n, j in enumerate(targets):
+            Y[..., j, :, :] += HtRinvH[..., n, :, :]
+
+            if z is not None:
+                y[..., j, :] += y_obs[..., n, :]
+
+        self.Y = Y
+        self.P = np.linalg.inv(Y)
+
+        if z is not None:
+            self.x = (self.P @ y[..., np.newaxis])[..., 0]
+
+    def run(self,
+            env: SpaceEnv,
+            index: np.ndarray[int],
+            rng: Optional[Union[np.random.Generator, List[np.random.Generator]]] = None) -> Tuple[np.ndarray[float], np.ndarray[float]]:
+        """
+        Filters the targets under a tasking plan. Each observer observes its target at the middle of every time step
+        with the observation model of the information coefficients: the observation time is 10 percent of the nominal
+        time step, and a step of a non-uniform grid counts as its number of nominal time steps.
+
+        Parameters:
+            env (SpaceEnv): The environment. Its truths are the true target trajectories.
+            index (np.ndarray[int]): Compact control of shape (steps, N), -1 where an observer is idle.
+            rng (Optional[Union[np.random.Generator, List[np.random.Generator]]]): Draws the measurement noise. A list holds
+                one generator per trial of estimates of shape (trials, M, 6), each drawing the noise of its trial, so that
+                the noise of a trial does not depend on the other trials filtered with it. If None, only the covariances
+                are propagated.
+
+        Returns:
+            Tuple[np.ndarray[float], np.ndarray[float]]: Estimation errors and covariance diagonals after the update of
+            each step, each of shape (steps, ..., M, 6).
+        """
+        self.reset()
+
+        t_start, durations = env.step_times(0, index.shape[0])
+        t_mid = t_start + durations / 2
+        observer_states, truth_states = env.get_states(t_mid)
+
+        dt = 0.1 * env.tstep
+        weights = durations / env.tstep
+
+        # standard normal noise of all observations of the plan, drawn at once
+        noise = None
+        if rng is not None:
+            n_obs = np.count_nonzero(index >= 0)
+            if isinstance(rng, np.random.Generator):
+                noise = rng.standard_normal(size=(*self.x.shape[:-2], n_obs, 6))
+            else:
+                noise = np.stack([trial_rng.standard_normal(size=(n_obs, 6)) for trial_rng in rng])
+        used = 0
+
+        errors = np.zeros(shape=(index.shape[0], *self.x.shape))
+        variances = np.zeros_like(errors)
+
+        for k in range(index.shape[0]):
+            self.forecast(t_mid[k])
+
+            z = None
+            observing = np.flatnonzero(index[k] >= 0)
+
+            if noise is not None and observing.size > 0:
+                z = measurement(truth_states[k, index[k, observing]], observer_states[k, observing])
+                sigma = 1 / np.sqrt(weights[k] * measurement_noise(dt))
+                z = z + sigma * noise[..., used:used + observing.size, :]
+                used += observing.size
+
+            self.update(observer_states[k], index[k], dt, z=z, weight=weights[k])
+
+            errors[k] = self.x - truth_states[k]
+            variances[k] = np.diagonal(self.covariance(), axis1=-2, axis2=-1)
+
+        return errors, variances
+
+    def _stm_inv(self, t: float) -> np.ndarray[float]:
+        """
+        Returns Phi(t, 0)^-1 of all targets, of shape (M, 6, 6).
+        """
+        return np.linalg.inv(np.array([truth.eval_stm_spl(t).reshape(6, 6) for truth in self.truths]))
@@ -0,0 +1,304 @@
+import glob
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager, nullcontext
+from time import perf_counter, time
+from typing import Optional
+
+
+class Stats:
+    """
+    Accumulates the wall time of the stages of a fitness evaluation and counters such as integrator steps and solver nodes.
+
+    Attributes:
+        timers (dict): Number of calls and total wall time in seconds of each stage.
+        counters (dict): Value of each counter.
+
+    Methods:
+        timer(stage): Returns a context manager that adds the wall time of its body to a stage.
+        add(counter, value): Adds a value to a counter.
+        reset(): Clears all timers and counters.
+        as_dict(): Returns the timers and counters as a dict.
+
+    Notes:
+        - Timers are inclusive, e.g. the time of "propagation" is also counted in "environment" and "fitness".
+        - Instrumented functions take an optional `stats` and skip all bookkeeping when it is None, so disabled
+          instrumentation costs a comparison per call.
+    """
+    def __init__(self):
+        self.timers = {}
+        self.counters = {}
+
+    def timer(self, stage: str):
+        """
+        Returns a context manager that adds the wall time of its body to a stage.
+
+        Parameters:
+            stage (str): Name of the stage.
+
+        Returns:
+            _Timer: The context manager.
+        """
+        return _Timer(self, stage)
+
+    def add(self, counter: str, value: Optional[float] = 1):
+        """
+        Adds a value to a counter.
+
+        Parameters:
+            counter (str): Name of the counter.
+            value (float): Value to add. Defaults to 1.
+
+        Returns:
+            None
+        """
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def reset(self):
+        """
+        Clears all timers and counters.
+
+        Returns:
+            None
+        """
+        self.timers.clear()
+        self.counters.clear()
+
+    def as_dict(self) -> dict:
+        """
+        Returns the timers and counters as a dict.
+
+        Returns:
+            dict: {"timers": {stage: {"calls", "total", "mean"}}, "counters": {counter: value}}, with times in seconds.
+        """
+        timers = {stage: {"calls": calls, "total": total, "mean": total / calls} for stage, (calls, total) in self.timers.items()}
+
+        return {"timers": timers, "counters": dict(self.counters)}
+
+class _Timer:
+    """
+    Context manager that adds the wall time of its body to a stage of a Stats.
+    """
+    __slots__ = ("stats", "stage", "start")
+
+    def __init__(self, stats: Stats, stage: str):
+        self.stats = stats
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        calls, total = self.stats.timers.get(self.stage, (0, 0.))
+        self.stats.timers[self.stage] = (calls + 1, total + perf_counter() - self.start)
+
+class Tracer(Stats):
+    """
+    Stats that also records a span for every timed stage, to be viewed as a timeline.
+
+    Spans are appended as they end to a JSON-lines file per process in a trace directory, so that spans recorded in worker
+    processes, e.g. on the islands of pygmo archipelagos, are kept when the copy of the problem in the worker is discarded.
+    `export_chrome_trace` merges the files into a Chrome trace-event file.
+
+    Parameters:
+        directory (str): Directory the spans are written to.
+        island (Optional[int]): Island the problem is evolved on, added to the arguments of every span. Defaults to None.
+
+    Methods:
+        for_island(island): Returns a Tracer writing to the same directory that tags its spans with an island.
+        record(name, start, duration, **args): Writes a span.
+    """
+    def __init__(self, directory: str, island: Optional[int] = None):
+        super().__init__()
+        self.directory = directory
+        self.island = island
+
+    def timer(self, stage: str):
+        """
+        Returns a context manager that adds the wall time of its body to a stage and records it as a span.
+
+        Parameters:
+            stage (str): Name of the stage.
+
+        Returns:
+            _Span: The context manager.
+        """
+        return _Span(self, stage)
+
+    def for_island(self, island: int) -> "Tracer":
+        """
+        Returns a Tracer writing to the same directory that tags its spans with an island.
+
+        Parameters:
+            island (int): Island id.
+
+        Returns:
+            Tracer: The tracer, with empty timers and counters.
+        """
+        return Tracer(self.directory, island=island)
+
+    def record(self, name: str, start: float, duration: float, **args):
+        """
+        Writes a span as a complete trace event.
+
+        Parameters:
+            name (str): Name of the span.
+            start (float): Start of the span, in seconds since the epoch.
+            duration (float): Duration of the span in seconds.
+            **args: Arguments shown with the span.
+
+        Returns:
+            None
+        """
+        if self.island is not None:
+            args["island"] = self.island
+
+        event = {"name": name, "ph": "X", "ts": start * 1e6, "dur": duration * 1e6,
+                 "pid": os.getpid(), "tid": threading.get_native_id(), "args": args}
+
+        _trace_file(self.directory).write(json.dumps(event) + "\n")
+
+class _Span(_Timer):
+    """
+    Context manager that adds the wall time of its body to a stage of a Tracer and records it as a span.
+    """
+    __slots__ = ("wall_start",)
+
+    def __enter__(self):
+        self.wall_start = time()
+        return super().__enter__()
+
+    def __exit__(self, *exc):
+        super().__exit__(*exc)
+        self.stats.record(self.stage, self.wall_start, time() - self.wall_start)
+
+_NO_TIMER = nullcontext()
+
+# directory of the active `trace` context, and the open trace files of this process
+_trace_directory = None
+_trace_files = {}
+
+def timer(stats: Optional[Stats], stage: str):
+    """
+    Returns a context manager that times a stage, or does nothing if `stats` is None.
+
+    Parameters:
+        stats (Optional[Stats]): Statistics the time is added to.
+        stage (str): Name of the stage.
+
+    Returns:
+        A context manager.
+    """
+    return _NO_TIMER if stats is None else stats.timer(stage)
+
+def _trace_file(directory: str):
+    """
+    Returns the trace file of this process in a trace directory, opened on first use.
+    """
+    key = (directory, os.getpid())
+
+    if key not in _trace_files:
+        _trace_files[key] = open(os.path.join(directory, f"{os.getpid()}.jsonl"), "a", buffering=1)
+
+    return _trace_files[key]
+
+def current_tracer() -> Optional[Tracer]:
+    """
+    Returns a Tracer writing to the directory of the active `trace` context, or None outside of one.
+
+    Returns:
+        Optional[Tracer]: The tracer.
+    """
+    return None if _trace_directory is None else Tracer(_trace_directory)
+
+def span(name: str, **args):
+    """
+    Returns a context manager that records a span in the active `trace` context, or does nothing outside of one.
+
+    Parameters:
+        name (str): Name of the span.
+        **args: Arguments shown with the span.
+
+    Returns:
+        A context manager.
+    """
+    if _trace_directory is None:
+        return _NO_TIMER
+
+    return _record_span(Tracer(_trace_directory), name, args)
+
+@contextmanager
+def _record_span(tracer: Tracer, name: str, args: dict):
+    """
+    Records the body of the context as a span.
+    """
+    start = time()
+    try:
+        yield
+    finally:
+        tracer.record(name, start, time() - start, **args)
+
+@contextmanager
+def trace(path: str):
+    """
+    Traces every problem created in the context, and writes the spans to a Chrome trace-event file on exit. Open it in
+    chrome://tracing or https://ui.perfetto.dev to view the timeline.
+
+    Parameters:
+        path (str): Path of the trace file.
+
+    Yields:
+        str: The temporary directory the spans are written to until the context exits.
+
+    Notes:
+        - Problems created in the context record propagation, spline fitting, environment generation, coefficients,
+          aggregation, pruning, solves and fitness evaluations, tagged with their process, thread and pygmo island.
+        - Worker processes write their own files, so the spans of problems copied to islands are kept.
+    """
+    global _trace_directory
+
+    previous = _trace_directory
+    _trace_directory = tempfile.mkdtemp(prefix="sensortasking-trace-")
+    directory = _trace_directory
+
+    try:
+        with span("trace"):
+            yield directory
+    finally:
+        _trace_directory = previous
+        export_chrome_trace(directory, path)
+        shutil.rmtree(directory, ignore_errors=True)
+
+def export_chrome_trace(directory: str, path: str):
+    """
+    Merges the spans written to a trace directory into a Chrome trace-event file.
+
+    Parameters:
+        directory (str): The trace directory.
+        path (str): Path of the trace file.
+
+    Returns:
+        int: The number of spans.
+    """
+    for (trace_dir, pid), f in list(_trace_files.items()):
+        if trace_dir == directory:
+            f.close()
+            del _trace_files[(trace_dir, pid)]
+
+    events = []
+    for filename in sorted(glob.glob(os.path.join(directory, "*.jsonl"))):
+        with open(filename) as f:
+            events.extend(json.loads(line) for line in f if line.strip())
+
+    # name each process, the process exporting the trace is the main process
+    names = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+              "args": {"name": "main" if pid == os.getpid() else f"worker {pid}"}} for pid in sorted({e["pid"] for e in events})]
+
+    with open(path, "w") as f:
+        json.dump({"traceEvents": names + sorted(events, key=lambda e: e["ts"]), "displayTimeUnit": "ms"}, f)
+
+    return len(events)
@@ -1,7 +1,9 @@
 from .ssa_problem import SSA_Problem
-from .search_methods import greedy_search, search, sga_search
+from .instrumentation import span
+from .progress import Progress
+from .search_methods import greedy_search, lazy_greedy_search, search, sga_search, island_sga_search
 from numpy.typing import ArrayLike
-from typing import Optional
+from typing import Optional, List
 import numpy as np
 
 def run_experiment(obj: str,
@@ -10,18 +12,22 @@ def run_experiment(obj: str,
                    target_periods: ArrayLike,
                    agents: ArrayLike,
                    agent_periods: ArrayLike,
-                   init_phase_guess: Optional[np.ndarray[float]] = None):
+                   init_phase_guess: Optional[np.ndarray[float]] = None,
+                   fidelity_schedule: Optional[List[dict]] = None,
+                   progress: Optional[Progress] = None):
     """
     Runs the experiment with given parameters
 
     Parameters:
         obj (str): The objective, either "maxmin" or "max"
-        method (str) : The solver method, either "greedy", "exhaustive", or "ga"
+        method (str) : The solver method, either "greedy", "lazy_greedy", "exhaustive", "ga", or "island_ga"
         targets (ArrayLike) : target initial conditions
         target_periods (ArrayLike) : target periods
         agents (ArrayLike): agent initial conditions
         agent_periods (ArrayLike) : agent periods
         init_phase_guess (Optional[np.ndarray[float]]) : initial guesses for optimizer
+        fidelity_schedule (Optional[List[dict]]) : coarse fidelities used to screen candidates before full resolution
+        progress (Optional[Progress]) : receives the progress events of the search and its result. Defaults to printing them.
 
     Returns:
         np.ndarray[float]: Array containing optimized phases for alignment.
@@ -33,28 +39,35 @@ def run_experiment(obj: str,
     match method.lower():
         case "greedy":
             search_method = greedy_search
+        case "lazy_greedy":
+            search_method = lazy_greedy_search
         case "exhaustive":
             search_method = search
         case "ga":
             search_method = sga_search
+        case "island_ga":
+            search_method = island_sga_search
         case _ :
-            raise ValueError("method must be one of 'greedy', 'exhaustive', or 'ga'")
+            raise ValueError("method must be one of 'greedy', 'lazy_greedy', 'exhaustive', 'ga', or 'island_ga'")
 
     obj = obj.lower()
     if obj not in ["maxmin", "max"]:
         raise ValueError("method must be one of 'maxmin' or 'max'")
 
-    phases, control, objective = search_method(targets,
-                                              target_periods,
-                                              agents,
-                                              agent_periods,
-                                              init_phase_guess = init_phase_guess,
-                                              opt = obj)
-
-    print("search method: ", method)
-    print(f"obj type: ", obj)
-    print("log10 obj ", np.log10(objective))
-    print("phases ", phases)
+    if progress is None:
+        progress = Progress()
+
+    with span("run_experiment", method=method, opt=obj):
+        phases, control, objective = search_method(targets,
+                                                  target_periods,
+                                                  agents,
+                                                  agent_periods,
+                                                  init_phase_guess = init_phase_guess,
+                                                  opt = obj,
+                                                  fidelity_schedule = fidelity_schedule,
+                                                  progress = progress)
+
+    progress.emit("result", method=method, opt=obj, objective=objective, phases=phases)
 
 
     return phases, control, objective
\ No newline at end of file
@@ -0,0 +1,99 @@
+import numpy as np
+from numpy.typing import ArrayLike
+from typing import List, Optional, Union
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from .control import control_to_index
+from .information_filter import InformationFilter
+from .spacenv import SpaceEnv
+from .ssa_problem import SSA_Problem
+
+
+def monte_carlo(p: SSA_Problem,
+                x: ArrayLike,
+                control: np.ndarray[int],
+                n_trials: Optional[int] = 1000,
+                P0: Optional[np.ndarray[float]] = None,
+                Q: Optional[Union[float, np.ndarray[float]]] = None,
+                n_workers: Optional[int] = None,
+                trials_per_task: Optional[int] = 250,
+                seed: Optional[int] = 0) -> dict:
+    """
+    Validates a tasking plan by running the information filter on many noisy realizations.
+
+    Each trial draws an initial estimation error from N(0, P0) for every target and noisy measurements for every
+    observation of the plan. Trials are filtered in vectorized batches of `trials_per_task`, spread across processes.
+
+    Parameters:
+        p (SSA_Problem): The problem instance.
+        x (ArrayLike): Phases of the observers.
+        control (np.ndarray[int]): The plan, a binary assignment matrix of shape (steps, observers, targets) or its
+            compact form of shape (steps, observers), e.g. from any of the search methods.
+        n_trials (int): Number of trials. Defaults to 1000.
+        P0 (Optional[np.ndarray[float]]): Initial covariance of every target, of shape (6, 6). Defaults to the covariance
+            of the target generator.
+        Q (Optional[Union[float, np.ndarray[float]]]): Process noise spectral density. See `InformationFilter`.
+        n_workers (Optional[int]): Number of worker processes. Defaults to the number of CPUs. 1 runs in this process.
+        trials_per_task (int): Number of trials filtered together by a worker. Defaults to 250.
+        seed (int): Seed of the random streams of the trials. Defaults to 0.
+
+    Returns:
+        dict: Statistics per time step and target, each of shape (steps, targets), after the update of the step
+            - "position_rmse", "velocity_rmse": root mean square estimation errors
+            - "position_sigma", "velocity_sigma": root mean predicted variances, to compare with the errors
+            and "n_trials".
+
+    Notes:
+        - Each trial has its own random stream spawned from `seed`, which draws its initial estimate and measurement
+          noise, so results do not depend on `n_workers` or `trials_per_task` beyond floating point rounding.
+    """
+    index = control_to_index(control) if control.ndim == 3 else control
+
+    p._gen_env(x)
+
+    if P0 is None:
+        P0 = p.tg.default_covariance()
+
+    if n_workers is None:
+        n_workers = os.cpu_count()
+
+    streams = np.random.SeedSequence(seed).spawn(n_trials)
+    tasks = [(p.env, index, P0, Q, streams[start:start + trials_per_task]) for start in range(0, n_trials, trials_per_task)]
+
+    if n_workers == 1:
+        results = [_run_trials(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(_run_trials, *zip(*tasks)))
+
+    # sums over trials of the squared errors and of the variances, each of shape (steps, targets, 6)
+    squared_errors = sum(result[0] for result in results)
+    variances = sum(result[1] for result in results)
+
+    return {"position_rmse": np.sqrt(squared_errors[..., :3].sum(axis=-1) / n_trials),
+            "velocity_rmse": np.sqrt(squared_errors[..., 3:].sum(axis=-1) / n_trials),
+            "position_sigma": np.sqrt(variances[..., :3].sum(axis=-1) / n_trials),
+            "velocity_sigma": np.sqrt(variances[..., 3:].sum(axis=-1) / n_trials),
+            "n_trials": n_trials}
+
+def _run_trials(env: SpaceEnv,
+                index: np.ndarray[int],
+                P0: np.ndarray[float],
+                Q: Optional[Union[float, np.ndarray[float]]],
+                seeds: List[np.random.SeedSequence]):
+    """
+    Filters a batch of trials, one per random stream in `seeds`. See `monte_carlo`.
+
+    Returns:
+        Tuple[np.ndarray[float], np.ndarray[float]]: Sums over the trials of the squared estimation errors and of the
+        variances, each of shape (steps, targets, 6).
+    """
+    rngs = [np.random.default_rng(seed) for seed in seeds]
+
+    truth0 = np.array([truth.spl(0) for truth in env.truths])
+    x0 = truth0 + np.stack([rng.multivariate_normal(np.zeros(6), P0, size=truth0.shape[0]) for rng in rngs])
+
+    errors, variances = InformationFilter(env.truths, x0, P0, Q=Q).run(env, index, rng=rngs)
+
+    return np.sum(errors**2, axis=1), np.sum(variances, axis=1)
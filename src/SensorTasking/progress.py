@@ -0,0 +1,177 @@
+import json
+import numpy as np
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from .instrumentation import span
+
+
+class Progress:
+    """
+    Emits structured progress events of a search, to a callback, a JSON-lines file and/or stdout.
+
+    Each event is a dict with the keys "event" (its type) and "elapsed" (seconds since the Progress was created), and
+    the fields of its type:
+        - "start": method, opt, n_agents, n_targets
+        - "stage": name, duration in seconds, e.g. of "screening", "optimization" and "control"
+        - "progress": evaluations, evaluations_per_second, best (best objective so far), and optional fields of the search,
+          e.g. generation or observer
+        - "island": island, status, best, evaluations
+        - "population": size, of a genetic algorithm
+        - "archipelago": n_islands
+        - "finish": evaluations, objective, phases
+        - "result": method, opt, objective, phases, emitted by `run_experiment`
+        - "batch": n_configs, n_pending, n_workers, and "config": done, total, obj, method, agent_set, guess, status,
+          objective, wall_time, emitted by `batch.run_batch`
+
+    Parameters:
+        callback (Optional[Callable[[dict], None]]): Called with every event.
+        path (Optional[str]): If given, every event is appended to this file as a line of JSON.
+        echo (bool): Whether to print the start, finish and result of a search, and the sizes of populations and
+            archipelagos. Defaults to True.
+
+    Attributes:
+        start_time (float): Time the Progress was created, from `time.time()`.
+        evaluations (int): Number of fitness evaluations in the last "progress" event.
+        best (float): Best objective in the last "progress" event.
+
+    Methods:
+        emit(event, **fields): Emits an event.
+        update(evaluations, best, **fields): Emits a "progress" event with the evaluation throughput.
+        stage(name): Context manager that emits a "stage" event with the duration of its body.
+        close(): Closes the JSON-lines file.
+    """
+    def __init__(self,
+                 callback: Optional[Callable[[dict], None]] = None,
+                 path: Optional[str] = None,
+                 echo: Optional[bool] = True):
+        self.callback = callback
+        self.echo = echo
+        self.file = None if path is None else open(path, "a", buffering=1)
+
+        self.start_time = time.time()
+        self.evaluations = 0
+        self.best = None
+
+    def emit(self, event: str, **fields):
+        """
+        Emits an event.
+
+        Parameters:
+            event (str): Type of the event.
+            **fields: Fields of the event. NumPy arrays and scalars are converted to lists and numbers.
+
+        Returns:
+            dict: The event.
+        """
+        record = {"event": event, "elapsed": time.time() - self.start_time, **fields}
+
+        if self.callback is not None:
+            self.callback(record)
+
+        if self.file is not None:
+            self.file.write(json.dumps(record, default=_to_json) + "\n")
+
+        if self.echo:
+            message = _format(record)
+            if message is not None:
+                print(message)
+
+        return record
+
+    def update(self, evaluations: int, best: Optional[float] = None, **fields):
+        """
+        Emits a "progress" event. The throughput is averaged since the Progress was created.
+
+        Parameters:
+            evaluations (int): Total number of fitness evaluations so far.
+            best (Optional[float]): Best objective so far. Defaults to the best of the previous events.
+            **fields: Additional fields of the event.
+
+        Returns:
+            dict: The event.
+        """
+        self.evaluations = int(evaluations)
+        if best is not None:
+            self.best = float(best)
+
+        elapsed = time.time() - self.start_time
+        rate = self.evaluations / elapsed if elapsed > 0 else None
+
+        return self.emit("progress", evaluations=self.evaluations, evaluations_per_second=rate, best=self.best, **fields)
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Context manager that emits a "stage" event with the duration of its body. Inside `instrumentation.trace`, the
+        stage is also recorded as a span.
+
+        Parameters:
+            name (str): Name of the stage.
+        """
+        start = time.time()
+        try:
+            with span(name):
+                yield
+        finally:
+            self.emit("stage", name=name, duration=time.time() - start)
+
+    def close(self):
+        """
+        Closes the JSON-lines file.
+
+        Returns:
+            None
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def read_events(path: str) -> list:
+    """
+    Reads the events written to a JSON-lines file by a Progress.
+
+    Parameters:
+        path (str): Path of the file.
+
+    Returns:
+        list: The events, in the order they were emitted.
+    """
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def _to_json(value):
+    """
+    Converts NumPy arrays and scalars, which json cannot serialize, to lists and numbers.
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _format(record: dict) -> Optional[str]:
+    """
+    Formats the events that searches used to print, or returns None for all other events.
+    """
+    match record["event"]:
+        case "start":
+            return "Beginning Optimization...\n"
+        case "finish":
+            return f"Finished in {record['elapsed']} sec."
+        case "population":
+            return f"population size : {record['size']}"
+        case "archipelago":
+            return f"number of islands : {record['n_islands']}"
+        case "batch":
+            return f"configurations : {record['n_configs']}, pending : {record['n_pending']}, workers : {record['n_workers']}"
+        case "config":
+            return (f"[{record['done']}/{record['total']}] {record['obj']} {record['method']} {record['agent_set']} "
+                    f"guess {record['guess']} : {record['status']}, obj {record['objective']}, {record['wall_time']:.1f} sec.")
+        case "result":
+            return (f"search method:  {record['method']}\nobj type:  {record['opt']}\n"
+                    f"log10 obj  {np.log10(record['objective'])}\nphases  {record['phases']}")
+
+    return None
@@ -0,0 +1,58 @@
+import numpy as np
+from numpy.typing import ArrayLike
+from typing import Optional, Iterator, Tuple
+
+from .compute_coefficients import iter_coefficients
+from .ssa_problem import SSA_Problem
+
+
+def receding_horizon(p: SSA_Problem,
+                     x: ArrayLike,
+                     window: int,
+                     shift: int,
+                     n_windows: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray[int], float]]:
+    """
+    Re-tasks the observers of a problem over a rolling window of time steps.
+
+    Each window is solved with the solver of the problem. The window is then advanced by `shift` steps: the information
+    coefficients of the overlapping steps are reused, only those of the new steps are computed, and the control of the
+    overlapping steps is used as the MIP start of the next window.
+
+    Parameters:
+        p (SSA_Problem): The problem instance. Its environment is used to compute the information coefficients.
+        x (ArrayLike): Phases of the observers, held fixed for all windows.
+        window (int): Number of time steps in each window.
+        shift (int): Number of time steps the window is advanced by.
+        n_windows (Optional[int]): Number of windows to solve. Re-tasks indefinitely if None.
+
+    Yields:
+        Tuple[int, np.ndarray[int], float]: First time step of the window, control over the window, and objective value.
+
+    Notes:
+        - The ephemerides of all observers and targets are generated once. Periodic splines extrapolate to any window.
+        - Only the first `shift` steps of each yielded control are executed before the next window replaces them.
+    """
+    if not 0 < shift <= window:
+        raise ValueError(f"`shift` must be between 1 and `window`. Received shift={shift}, window={window}")
+
+    p._gen_env(x)
+
+    information = next(iter_coefficients(p.env, block_size=window, n_steps=window, quad_order=p.quad_order))
+    warm_start = None
+    k0 = 0
+    n = 0
+
+    while n_windows is None or n < n_windows:
+
+        control, obj = p.solve_func(information, mip_gap=p.mip_gap, warm_start=warm_start)
+
+        yield k0, control, obj
+
+        # shift the window, computing coefficients for the new steps only
+        new_information = next(iter_coefficients(p.env, block_size=shift, start_step=k0 + window, n_steps=shift, quad_order=p.quad_order))
+        information = np.concatenate((information[shift:], new_information))
+
+        warm_start = np.concatenate((control[shift:], np.zeros_like(control[:shift])))
+
+        k0 += shift
+        n += 1
@@ -1,8 +1,16 @@
 import pygmo as pg
 import numpy as np
-from typing import Optional, Union, List
+from typing import Optional, Union, List, Tuple, Callable
+from contextlib import contextmanager
+import hashlib
+import heapq
+import json
+import os
+import pickle
 import time
 
+from .instrumentation import Tracer
+from .progress import Progress, _to_json
 from .ssa_problem import Greedy_SSA_Problem, SSA_Problem
 
 
@@ -11,7 +19,13 @@ def greedy_search(targets: np.ndarray[float],
                   agents: np.ndarray[float],
                   agent_periods: np.ndarray[float],
                   init_phase_guess: Optional[np.ndarray[float]] = None,
-                  opt: Optional[str] = "max") -> np.ndarray[float]:
+                  opt: Optional[str] = "max",
+                  fidelity_schedule: Optional[List[dict]] = None,
+                  phase_tol: Optional[float] = None,
+                  max_fevals: Optional[int] = None,
+                  max_time: Optional[float] = None,
+                  checkpoint: Optional[str] = None,
+                  progress: Optional[Progress] = None) -> np.ndarray[float]:
     """
     Perform greedy search optimization for the phases of all observers.
 
@@ -26,6 +40,16 @@ def greedy_search(targets: np.ndarray[float],
         agent_periods (np.ndarray[float]): Periods of agents.
         init_phase_guess (np.ndarray[float]) : Initial guesses as a 2D numpy array. Each column contains a set of initial conditions for an observer
         opt (str): the type of inner loop optimization to run. One of either "max" or "maxmin"
+        fidelity_schedule (Optional[List[dict]]): coarse fidelities at which initial guesses are screened before full resolution. See `_screen_candidates`.
+        phase_tol (Optional[float]): if given, islands that converge to within this phase distance of a better island are
+            terminated and reseeded in unexplored regions. See `_run_multistart`.
+        max_fevals (Optional[int]): budget of fitness evaluations across all islands, per observer. See `_run_multistart`.
+        max_time (Optional[float]): wall-clock budget in seconds. Observers not yet optimized when it runs out are placed at
+            their first initial guess.
+        checkpoint (Optional[str]): path of a checkpoint file. The phases and controls of the observers optimized so far are
+            saved after each observer optimized within the budget, and the search resumes from the file if it exists. A
+            checkpoint written for other problem or search arguments raises a ValueError.
+        progress (Optional[Progress]): receives the progress events of the search. Defaults to printing the start and finish.
 
     Returns:
         np.ndarray[float]: Array containing optimized phases for alignment.
@@ -50,51 +74,71 @@ def greedy_search(targets: np.ndarray[float],
         raise ValueError("init_phase_guess must be a 2d numpy array with number of columns equal to number of agents")
 
 
-    # Initialize instance of problem with first agent
+    if progress is None:
+        progress = Progress()
+
+    key = _checkpoint_key(targets=targets, target_periods=target_periods, agents=agents, agent_periods=agent_periods,
+                          init_phase_guess=init_phase_guess, opt=opt, fidelity_schedule=fidelity_schedule, phase_tol=phase_tol)
+    state = _load_checkpoint(checkpoint, method="greedy", key=key)
+    start = 0 if state is None else len(state["phases"])
+
+    # Initialize instance of problem with first agent that is not yet optimized
+    first = min(start, n_agents - 1)
     p = Greedy_SSA_Problem(targets=targets,
                            target_periods=target_periods,
-                           agents=[agents[0]],
-                           agent_periods=[agent_periods[0]],
+                           agents=[agents[first]],
+                           agent_periods=[agent_periods[first]],
                            opt=opt)
-    print("Beginning Optimization...\n")
-    start_time = time.time()
-    
-    pg_problem = pg.problem(p)
-    algo = pg.algorithm(pg.scipy_optimize(method="L-BFGS-B"))
-
-    initial_conditions = init_phase_guess[:, 0]
 
-    champion = _run_multiple_ics(initial_conditions=initial_conditions,
-                                 pg_problem=pg_problem,
-                                 algo=algo)
+    if state is not None:
+        p.opt_phases = state["phases"]
+        p.opt_controls = state["controls"]
 
-    # Optimize phase of first observer
-    p.opt_phases.append(champion[0])
-    control, _ = p.get_control_obj([p.opt_phases[0]])
-    p.opt_controls.append(control)
+    progress.emit("start", method="greedy", opt=opt, n_agents=n_agents, n_targets=len(target_periods))
+    start_time = time.time()
 
     # Iteratively add agents to problem instance and optimize
-    for i in range(1, n_agents):
+    for i in range(start, n_agents):
 
-        p.remove_agent(index=0)
-        p.add_agent(agents[i], agent_periods[i])
+        if i > start:
+            p.remove_agent(index=0)
+            p.add_agent(agents[i], agent_periods[i])
 
         pg_problem = pg.problem(p)
         algo = pg.algorithm(pg.scipy_optimize(method="L-BFGS-B"))
 
         initial_conditions = init_phase_guess[:, i]
-        champion = _run_multiple_ics(initial_conditions=initial_conditions,
-                                     pg_problem=pg_problem,
-                                     algo=algo)
 
+        time_left = None if max_time is None else max_time - (time.time() - start_time)
+
+        if time_left is not None and time_left <= 0:
+            # out of time, keep the first initial guess
+            champion = initial_conditions[:1]
+        else:
+            if fidelity_schedule is not None:
+                with progress.stage("screening"):
+                    initial_conditions = _screen_candidates(p, initial_conditions.reshape(-1, 1), fidelity_schedule)[:, 0]
+
+            with progress.stage("optimization"):
+                champion = _run_multiple_ics(initial_conditions=initial_conditions,
+                                             pg_problem=pg_problem,
+                                             algo=algo,
+                                             phase_tol=phase_tol,
+                                             max_fevals=max_fevals,
+                                             max_time=time_left,
+                                             progress=progress,
+                                             observer=i)
 
         p.opt_phases.append(champion[0])
         control, _ = p.get_control_obj([p.opt_phases[i]])
         p.opt_controls.append(control)
-            
 
-    end_time = time.time()
-    print(f"Finished in {end_time-start_time} sec.")
+        # only observers whose optimization finished within the budget are checkpointed
+        if checkpoint is not None and (max_time is None or time.time() - start_time <= max_time):
+            _save_checkpoint(checkpoint, {"method": "greedy",
+                                          "key": key,
+                                          "phases": p.opt_phases,
+                                          "controls": p.opt_controls})
 
     control = np.zeros(shape=(p.env.maxsteps, n_agents, p.env.truths.size), dtype=int)
 
@@ -109,14 +153,147 @@ def greedy_search(targets: np.ndarray[float],
     
     objective = p_.get_obj(x=p.opt_phases, u=control)
 
+    progress.emit("finish", evaluations=progress.evaluations, objective=objective, phases=p.opt_phases)
+
     return p.opt_phases, control, objective
 
+def lazy_greedy_search(targets: np.ndarray[float],
+                       target_periods: np.ndarray[float],
+                       agents: np.ndarray[float],
+                       agent_periods: np.ndarray[float],
+                       init_phase_guess: Optional[np.ndarray[float]] = None,
+                       opt: Optional[str] = "max",
+                       fidelity_schedule: Optional[List[dict]] = None,
+                       progress: Optional[Progress] = None) -> np.ndarray[float]:
+    """
+    Perform sequential greedy optimization for the phases of all observers, conditioning on already placed observers.
+
+    The information slice of every observer is computed once for each candidate phase and kept in memory. At each round
+    the (observer, phase) pair with the largest marginal gain over the observers placed so far is committed, together with
+    its control. Marginal gains are kept in a priority queue and only re-evaluated when they reach the top of the queue
+    (lazy greedy). Re-evaluating a gain solves the inner problem over the new observer's slice only, with the control of
+    the committed observers held fixed.
+
+    Parameters:
+        targets (np.ndarray[float]): Initial conditions of targets. Each row is an initial condition.
+        target_periods (np.ndarray[float]): Periods of targets.
+        agents (np.ndarray[float]): Initial conditions of agents. Each row is an initial condition.
+        agent_periods (np.ndarray[float]): Periods of agents.
+        init_phase_guess (np.ndarray[float]) : Candidate phases as a 2D numpy array. Each column contains the candidate phases of an observer
+        opt (str): the type of inner loop optimization to run. One of either "max" or "maxmin"
+        fidelity_schedule (Optional[List[dict]]): coarse fidelities at which candidate phases are screened before full resolution. See `_screen_candidates`.
+        progress (Optional[Progress]): receives the progress events of the search, where evaluations count the marginal
+            gains solved. Defaults to printing the start and finish.
+
+    Returns:
+        np.ndarray[float]: Array containing optimized phases for alignment.
+        np.ndarray[int]: Array containing control for all observers.
+        float: Objective value
+
+    Notes:
+        - The "max" objective is modular in the observers, so gains computed in the first round never go stale.
+        - The "maxmin" objective is not submodular, so stale gains are used as a heuristic upper bound.
+    """
+    n_agents = agent_periods.size
+
+    if init_phase_guess is None:
+        ics = np.linspace(0., 1, 10).reshape(-1, 1)
+        init_phase_guess = np.tile(ics, (1, n_agents))
+
+    if isinstance(init_phase_guess, (float, int)):
+        ics = np.array([init_phase_guess])
+        init_phase_guess = np.tile(ics, (1, n_agents))
+
+    if not (init_phase_guess.ndim == 2 and init_phase_guess.shape[1] == n_agents):
+        raise ValueError("init_phase_guess must be a 2d numpy array with number of columns equal to number of agents")
+
+    if progress is None:
+        progress = Progress()
+
+    p = SSA_Problem(targets=targets,
+                    target_periods=target_periods,
+                    agents=agents,
+                    agent_periods=agent_periods,
+                    opt=opt)
+    progress.emit("start", method="lazy_greedy", opt=opt, n_agents=n_agents, n_targets=len(target_periods))
+
+    num_targets = p.env.truths.size
+
+    candidates = [init_phase_guess[:, i] for i in range(n_agents)]
+
+    if fidelity_schedule is not None:
+        with progress.stage("screening"):
+            for i in range(n_agents):
+                # score each candidate by the gain of the observer placed alone
+                score = lambda x: -_marginal_gain(p, p.get_info_slice(index=i, phase=x[0]), np.zeros(num_targets))[0]
+                candidates[i] = _screen_candidates(p, candidates[i].reshape(-1, 1), fidelity_schedule, score=score)[:, 0]
+
+    # information slices of each (observer, candidate phase) pair
+    slices = {}
+    with progress.stage("coefficients"):
+        for i in range(n_agents):
+            for l, phase in enumerate(candidates[i]):
+                slices[i, l] = p.get_info_slice(index=i, phase=phase)
+
+    target_infos = np.zeros(num_targets)
+    controls = {}
+    queue = []
+
+    for (i, l), info_slice in slices.items():
+        gain, controls[i, l] = _marginal_gain(p, info_slice, target_infos)
+        queue.append((-gain, i, l, 0))
+
+    n_gains = len(queue)
+
+    heapq.heapify(queue)
+
+    opt_phases = np.zeros(n_agents)
+    information = np.zeros(shape=(p.maxsteps, n_agents, num_targets))
+    control = np.zeros(shape=(p.maxsteps, n_agents, num_targets), dtype=int)
+    placed = set()
+    n_round = 0
+
+    while len(placed) < n_agents:
+        _, i, l, evaluated_round = heapq.heappop(queue)
+
+        if i in placed:
+            continue
+
+        if opt == "maxmin" and evaluated_round != n_round:
+            gain, controls[i, l] = _marginal_gain(p, slices[i, l], target_infos)
+            heapq.heappush(queue, (-gain, i, l, n_round))
+            n_gains += 1
+            continue
+
+        # gain is up to date and no other candidate can beat it, commit the observer
+        opt_phases[i] = candidates[i][l]
+        information[:, i, :] = slices[i, l]
+        control[:, i, :] = controls[i, l][:, 0, :]
+        target_infos += np.einsum('kj,kj->j', control[:, i, :], information[:, i, :])
+
+        placed.add(i)
+        n_round += 1
+
+        progress.update(evaluations=n_gains, best=_lazy_objective(opt, information, control, target_infos), observer=i)
+
+    objective = _lazy_objective(opt, information, control, target_infos)
+
+    progress.emit("finish", evaluations=n_gains, objective=objective, phases=opt_phases)
+
+    return opt_phases, control, objective
+
 def search(targets: np.ndarray[float],
            target_periods: np.ndarray[float],
            agents: np.ndarray[float],
            agent_periods: np.ndarray[float],
            init_phase_guess: Optional[np.ndarray[float]] = None,
-           opt: Optional[str] = "max") -> np.ndarray[float]:
+           opt: Optional[str] = "max",
+           fidelity_schedule: Optional[List[dict]] = None,
+           phase_tol: Optional[float] = None,
+           max_fevals: Optional[int] = None,
+           max_time: Optional[float] = None,
+           checkpoint: Optional[str] = None,
+           progress: Optional[Progress] = None) -> np.ndarray[float]:
     """
     Perform search optimization for the phases of all observers.
 
@@ -129,6 +306,14 @@ def search(targets: np.ndarray[float],
         agent_periods (np.ndarray[float]): Periods of agents.
         init_phase_guess (np.ndarray[float]): Initial phase guess as a 2d numpy array. Each row is an initial condition.
         opt (str): the type of optimization to run. One of either "max" or "maxmin"
+        fidelity_schedule (Optional[List[dict]]): coarse fidelities at which initial guesses are screened before full resolution. See `_screen_candidates`.
+        phase_tol (Optional[float]): if given, islands that converge to within this phase distance of a better island are
+            terminated and reseeded in unexplored regions. See `_run_multistart`.
+        max_fevals (Optional[int]): global budget of fitness evaluations across all islands. See `_run_multistart`.
+        max_time (Optional[float]): wall-clock budget in seconds. The best solution found when it runs out is returned.
+        checkpoint (Optional[str]): path of a checkpoint file. The state of all islands is saved periodically, and the search
+            resumes from the file if it exists, without screening the initial guesses again. See `_run_multistart`.
+        progress (Optional[Progress]): receives the progress events of the search. Defaults to printing the start and finish.
 
     Returns:
         np.ndarray[float]: Array containing optimized phases for alignment.
@@ -155,27 +340,44 @@ def search(targets: np.ndarray[float],
         raise ValueError("init_phase_guess must be a 2d numpy array with number of columns equal to number of agents")
 
 
+    if progress is None:
+        progress = Progress()
+
+    key = _checkpoint_key(targets=targets, target_periods=target_periods, agents=agents, agent_periods=agent_periods,
+                          init_phase_guess=init_phase_guess, opt=opt, fidelity_schedule=fidelity_schedule, phase_tol=phase_tol)
+    resuming = _load_checkpoint(checkpoint, method="multistart", key=key) is not None
+
     # Initialize instance of problem with first agent
     p = SSA_Problem(targets=targets,
                     target_periods=target_periods,
                     agents=agents,
                     agent_periods=agent_periods,
                     opt=opt)
-    print("Beginning Optimization...\n")
+    progress.emit("start", method="exhaustive", opt=opt, n_agents=n_agents, n_targets=len(target_periods))
 
-    start_time = time.time()
+    # a resumed search continues its islands, so the initial guesses are not screened again
+    if fidelity_schedule is not None and not resuming:
+        with progress.stage("screening"):
+            init_phase_guess = _screen_candidates(p, init_phase_guess, fidelity_schedule)
 
     pg_problem = pg.problem(p)
     algo = pg.algorithm(pg.scipy_optimize(method="L-BFGS-B"))
 
-    opt_phases = _run_multiple_ics(initial_conditions=init_phase_guess,
-                                   pg_problem=pg_problem,
-                                   algo=algo)
+    with progress.stage("optimization"):
+        opt_phases = _run_multiple_ics(initial_conditions=init_phase_guess,
+                                       pg_problem=pg_problem,
+                                       algo=algo,
+                                       phase_tol=phase_tol,
+                                       max_fevals=max_fevals,
+                                       max_time=max_time,
+                                       checkpoint=checkpoint,
+                                       checkpoint_key=key,
+                                       progress=progress)
 
-    end_time = time.time()
-    print(f"Finished in {end_time-start_time} sec.")
+    with progress.stage("control"):
+        control, obj = p.get_control_obj(opt_phases)
 
-    control, obj = p.get_control_obj(opt_phases)
+    progress.emit("finish", evaluations=progress.evaluations, objective=obj, phases=opt_phases)
 
     return opt_phases, control, obj
 
@@ -184,7 +386,11 @@ def sga_search(targets: np.ndarray[float],
            agents: np.ndarray[float],
            agent_periods: np.ndarray[float],
            init_phase_guess: Optional[np.ndarray[float]] = None,
-           opt: Optional[str] = "max") -> np.ndarray[float]:
+           opt: Optional[str] = "max",
+           fidelity_schedule: Optional[List[dict]] = None,
+           max_time: Optional[float] = None,
+           checkpoint: Optional[str] = None,
+           progress: Optional[Progress] = None) -> np.ndarray[float]:
     """
     Perform search optimization for the phases of all observers using a simple genetic algorithm
 
@@ -197,6 +403,12 @@ def sga_search(targets: np.ndarray[float],
         agent_periods (np.ndarray[float]): Periods of agents.
         init_phase_guess (np.ndarray[float]): Initial phase guess as a list of lists. Each list is an initial condition.
         opt (str): the type of optimization to run. One of either "max" or "maxmin"
+        fidelity_schedule (Optional[List[dict]]): coarse fidelities at which the population is evolved before full resolution.
+            After each level only the fittest fraction of the population is promoted. See `_screen_candidates`.
+        max_time (Optional[float]): wall-clock budget in seconds. The champion of the population when it runs out is returned.
+        checkpoint (Optional[str]): path of a checkpoint file. The population is saved every few generations, and the search
+            resumes from the file if it exists. A checkpoint written for other problem or search arguments raises a ValueError.
+        progress (Optional[Progress]): receives the progress events of the search. Defaults to printing the start and finish.
 
     Returns:
         np.ndarray[float]: Array containing optimized phases for alignment.
@@ -219,41 +431,258 @@ def sga_search(targets: np.ndarray[float],
         raise ValueError("init_phase_guess must be a 2d numpy array with number of columns equal to number of agents")
 
 
+    if progress is None:
+        progress = Progress()
+
+    key = _checkpoint_key(targets=targets, target_periods=target_periods, agents=agents, agent_periods=agent_periods,
+                          init_phase_guess=init_phase_guess, opt=opt, fidelity_schedule=fidelity_schedule)
+    state = _load_checkpoint(checkpoint, method="sga", key=key)
+
     # Initialize instance of problem with first agent
     p = SSA_Problem(targets=targets,
                     target_periods=target_periods,
                     agents=agents,
                     agent_periods=agent_periods,
                     opt=opt)
-    print("Beginning Optimization...\n")
+    progress.emit("start", method="ga", opt=opt, n_agents=n_agents, n_targets=len(target_periods))
 
     start_time = time.time()
 
+    n_gen = 100
+
+    # evolve in short increments when the run may be interrupted
+    gen_per_round = 10 if (max_time is not None or checkpoint is not None) else n_gen
+    algo = pg.algorithm(pg.sga(gen=gen_per_round))
+
+    # evolve at each coarse fidelity and promote the fittest fraction of the population
+    for level in (fidelity_schedule if state is None else None) or []:
+        with progress.stage("screening"), _fidelity(p, level):
+            pop = pg.population(pg.problem(p))
+            for ic in init_phase_guess:
+                pop.push_back(ic)
+            for _ in range(0, n_gen, gen_per_round):
+                pop = algo.evolve(pop)
+
+        n_keep = max(2, int(np.ceil(level.get("keep", 0.5) * len(pop.get_x()))))
+        init_phase_guess = pop.get_x()[np.argsort(pop.get_f()[:, 0])[:n_keep]]
+
     pg_problem = pg.problem(p)
-    algo = pg.algorithm(pg.sga(gen=100))
 
     pop = pg.population(pg_problem)
-    for ic in init_phase_guess:
-        if isinstance(ic, float):
-            ic = [ic]
-        pop.push_back(ic)
 
-    print("population size :", pop.get_ID().size)
+    if state is None:
+        gens_done = 0
+        for ic in init_phase_guess:
+            if isinstance(ic, float):
+                ic = [ic]
+            pop.push_back(ic)
+    else:
+        gens_done = state["gen"]
+        for x, f in zip(state["x"], state["f"]):
+            pop.push_back(x, f)
+
+    progress.emit("population", size=pop.get_ID().size)
+
+    while gens_done < n_gen:
+        pop = algo.evolve(pop)
+        gens_done += gen_per_round
+
+        progress.update(evaluations=pop.problem.get_fevals(), best=-pop.champion_f[0], generation=gens_done)
 
-    pop = algo.evolve(pop)
+        if checkpoint is not None:
+            _save_checkpoint(checkpoint, {"method": "sga",
+                                          "key": key,
+                                          "gen": gens_done,
+                                          "x": pop.get_x(),
+                                          "f": pop.get_f()})
+
+        if max_time is not None and time.time() - start_time > max_time:
+            break
 
     opt_phases = pop.champion_x
 
-    end_time = time.time()
-    print(f"Finished in {end_time-start_time} sec.")
+    with progress.stage("control"):
+        control, obj = p.get_control_obj(opt_phases)
 
-    control, obj = p.get_control_obj(opt_phases)
+    progress.emit("finish", evaluations=progress.evaluations, objective=obj, phases=opt_phases)
+
+    return opt_phases, control, obj
+
+def island_sga_search(targets: np.ndarray[float],
+                      target_periods: np.ndarray[float],
+                      agents: np.ndarray[float],
+                      agent_periods: np.ndarray[float],
+                      init_phase_guess: Optional[np.ndarray[float]] = None,
+                      opt: Optional[str] = "max",
+                      fidelity_schedule: Optional[List[dict]] = None,
+                      n_islands: Optional[int] = None,
+                      pop_size: Optional[int] = 10,
+                      gen: Optional[int] = 100,
+                      migration_interval: Optional[int] = 10,
+                      topology: Optional[str] = "ring",
+                      seed: Optional[int] = 0,
+                      max_time: Optional[float] = None,
+                      max_fevals: Optional[int] = None,
+                      checkpoint: Optional[str] = None,
+                      progress: Optional[Progress] = None) -> np.ndarray[float]:
+    """
+    Perform search optimization for the phases of all observers using an island model of simple genetic algorithms.
+
+    Each island evolves its own population with a simple genetic algorithm from pygmo in a separate worker process.
+    Islands exchange their best individuals along the edges of the chosen topology every `migration_interval`
+    generations.
+
+    Parameters:
+        targets (np.ndarray[float]): Initial conditions of targets. Each row is an initial condition.
+        target_periods (np.ndarray[float]): Periods of targets.
+        agents (np.ndarray[float]): Initial conditions of agents. Each row is an initial condition.
+        agent_periods (np.ndarray[float]): Periods of agents.
+        init_phase_guess (np.ndarray[float]): Initial phase guess as a 2d numpy array. Each row is an initial condition.
+            Rows are distributed across islands in round-robin order.
+        opt (str): the type of optimization to run. One of either "max" or "maxmin"
+        fidelity_schedule (Optional[List[dict]]): coarse fidelities at which initial guesses are screened before full resolution. See `_screen_candidates`.
+        n_islands (Optional[int]): number of islands. Defaults to the number of cores.
+        pop_size (int): number of individuals on each island. Islands are filled up with random individuals.
+        gen (int): number of generations evolved on each island.
+        migration_interval (int): number of generations between migrations.
+        topology (str): migration topology. One of "ring", "fully_connected" or "unconnected".
+        seed (int): seed from which the seeds of all populations and algorithms are derived.
+        max_time (Optional[float]): wall-clock budget in seconds. Checked between migrations.
+        max_fevals (Optional[int]): budget of fitness evaluations summed over all islands. Checked between migrations.
+        checkpoint (Optional[str]): path of a checkpoint file. The populations of all islands are saved after every migration,
+            and the search resumes from the file if it exists, without screening the initial guesses again. A checkpoint
+            written for other problem or search arguments raises a ValueError.
+        progress (Optional[Progress]): receives the progress events of the search. Defaults to printing the start and finish.
+
+    Returns:
+        np.ndarray[float]: Array containing optimized phases for alignment.
+        np.ndarray[int]: Array containing control for all observers.
+        float: Objective value
+
+    """
+
+    n_agents = agent_periods.size
+
+    if init_phase_guess is None:
+        ics = np.linspace(0., 1, 10).reshape(-1, 1)
+        init_phase_guess = np.tile(ics, (1, n_agents))
+
+    if isinstance(init_phase_guess, (float, int)):
+        ics = np.array([init_phase_guess])
+        init_phase_guess = np.tile(ics, (1, n_agents))
+
+    if not (init_phase_guess.ndim == 2 and init_phase_guess.shape[1] == n_agents):
+        raise ValueError("init_phase_guess must be a 2d numpy array with number of columns equal to number of agents")
+
+    if n_islands is None:
+        n_islands = os.cpu_count()
+
+    match topology:
+        case "ring":
+            topo = pg.ring()
+        case "fully_connected":
+            topo = pg.fully_connected()
+        case "unconnected":
+            topo = pg.unconnected()
+        case _:
+            raise ValueError(f"`topology` must be one of `ring`, `fully_connected` or `unconnected`. Received {topology}")
+
+    if progress is None:
+        progress = Progress()
+
+    key = _checkpoint_key(targets=targets, target_periods=target_periods, agents=agents, agent_periods=agent_periods,
+                          init_phase_guess=init_phase_guess, opt=opt, fidelity_schedule=fidelity_schedule,
+                          pop_size=pop_size, migration_interval=migration_interval, topology=topology, seed=seed)
+    state = _load_checkpoint(checkpoint, method="island_sga", key=key)
+
+    p = SSA_Problem(targets=targets,
+                    target_periods=target_periods,
+                    agents=agents,
+                    agent_periods=agent_periods,
+                    opt=opt)
+    progress.emit("start", method="island_ga", opt=opt, n_agents=n_agents, n_targets=len(target_periods))
+
+    start_time = time.time()
+
+    if fidelity_schedule is not None and state is None:
+        with progress.stage("screening"):
+            init_phase_guess = _screen_candidates(p, init_phase_guess, fidelity_schedule)
+
+    pg_problem = pg.problem(p)
+    archi = pg.archipelago(t=topo, seed=seed)
+
+    if state is None:
+        epochs_done = 0
+        fevals_done = 0
+    else:
+        epochs_done = state["epoch"]
+        fevals_done = state["fevals"]
+        n_islands = len(state["pops"])
+
+    for i in range(n_islands):
+        algo = pg.algorithm(pg.sga(gen=migration_interval, seed=seed + i + epochs_done * n_islands))
+
+        if state is None:
+            ics = init_phase_guess[i::n_islands]
+            pop = _island_population(pg_problem, i, size=max(0, pop_size - len(ics)), seed=seed + i)
+            for ic in ics:
+                pop.push_back(ic)
+        else:
+            pop = _island_population(pg_problem, i)
+            for x, f in zip(*state["pops"][i]):
+                pop.push_back(x, f)
+
+        archi.push_back(udi=pg.mp_island(), algo=algo, pop=pop)
+
+    progress.emit("archipelago", n_islands=n_islands)
+
+    n_epochs = int(np.ceil(gen / migration_interval))
+
+    for epoch in range(epochs_done, n_epochs):
+        archi.evolve()
+        archi.wait_check()
+
+        fevals = fevals_done + sum(isl.get_population().problem.get_fevals() for isl in archi)
+
+        for i, isl in enumerate(archi):
+            pop = isl.get_population()
+            progress.emit("island", island=i, status=isl.status.name, best=-float(pop.champion_f[0]), evaluations=pop.problem.get_fevals())
+
+        progress.update(evaluations=fevals, best=-min(f[0] for f in archi.get_champions_f()), epoch=epoch + 1)
+
+        if checkpoint is not None:
+            _save_checkpoint(checkpoint, {"method": "island_sga",
+                                          "key": key,
+                                          "epoch": epoch + 1,
+                                          "fevals": fevals,
+                                          "pops": [(isl.get_population().get_x(), isl.get_population().get_f()) for isl in archi]})
+
+        if max_time is not None and time.time() - start_time > max_time:
+            break
+
+        if max_fevals is not None and fevals > max_fevals:
+            break
+
+    champions_f = [item[0] for item in archi.get_champions_f()]
+    opt_phases = archi.get_champions_x()[np.argmin(champions_f)]
+
+    with progress.stage("control"):
+        control, obj = p.get_control_obj(opt_phases)
+
+    progress.emit("finish", evaluations=progress.evaluations, objective=obj, phases=opt_phases)
 
     return opt_phases, control, obj
 
 def _run_multiple_ics(initial_conditions: np.ndarray[float],
                      pg_problem: pg.problem,
-                     algo: pg.algorithm) -> List:
+                     algo: pg.algorithm,
+                     phase_tol: Optional[float] = None,
+                     max_fevals: Optional[int] = None,
+                     max_time: Optional[float] = None,
+                     checkpoint: Optional[str] = None,
+                     checkpoint_key: Optional[str] = None,
+                     progress: Optional[Progress] = None,
+                     **fields) -> List:
     """
     Run separate optimization problems in parallel for each initial conditions in a a given set. Return the best solution
 
@@ -261,20 +690,39 @@ def _run_multiple_ics(initial_conditions: np.ndarray[float],
         initial_conditions (np.ndarray): a set of initial conditions to try. Can be 1d array (for greedy optimization) or 2d (for regular search)
         pg_problem (pygmo.problem): an Pygmo problem instance
         algo (pg.algorithm): a Pygmo algorithm instance
+        phase_tol (Optional[float]): if given, the runs are controlled by `_run_multistart` and deduplicated with this tolerance
+        max_fevals (Optional[int]): if given, the runs are controlled by `_run_multistart` with this evaluation budget
+        max_time (Optional[float]): if given, the runs are controlled by `_run_multistart` with this wall-clock budget
+        checkpoint (Optional[str]): if given, the runs are controlled by `_run_multistart` and checkpointed to this path
+        checkpoint_key (Optional[str]): identifies the problem and search of the checkpoint. See `_checkpoint_key`.
+        progress (Optional[Progress]): receives an "island" event per run and a "progress" event once they finish. The
+            evaluations are added to those of previous "progress" events.
+        **fields: additional fields of the "progress" events, e.g. the observer optimized by a greedy search
 
     Returns:
         champion (np.ndarray): the best candidate out of all the optimization runs
     
     """
+    if any(arg is not None for arg in (phase_tol, max_fevals, max_time, checkpoint)):
+        return _run_multistart(initial_conditions=initial_conditions,
+                               pg_problem=pg_problem,
+                               phase_tol=phase_tol,
+                               max_fevals=max_fevals,
+                               max_time=max_time,
+                               checkpoint=checkpoint,
+                               checkpoint_key=checkpoint_key,
+                               progress=progress,
+                               **fields)
+
     # Create the archipelago with n_islands islands
     archi = pg.archipelago()
 
     # Create and add each island with its corresponding initial condition
-    for ic in initial_conditions:
+    for i, ic in enumerate(initial_conditions):
         # Create a population with the current initial condition
         if isinstance(ic, float):
             ic = [ic]
-        pop = pg.population(pg_problem)
+        pop = _island_population(pg_problem, i)
         pop.push_back(ic)
 
         # Add the island to the archipelago
@@ -288,6 +736,404 @@ def _run_multiple_ics(initial_conditions: np.ndarray[float],
     champions_f = [-item[0] for item in champions_f]
     champ_idx = np.argmax(champions_f)
 
+    if progress is not None:
+        fevals = [isl.get_population().problem.get_fevals() for isl in archi]
+        for i, (f, n) in enumerate(zip(champions_f, fevals)):
+            progress.emit("island", island=i, status="finished", best=float(f), evaluations=n)
+
+        progress.update(evaluations=progress.evaluations + sum(fevals), best=champions_f[champ_idx], **fields)
+
     champion = champions_x[champ_idx]
 
-    return champion
\ No newline at end of file
+    return champion
+
+def _run_multistart(initial_conditions: np.ndarray[float],
+                    pg_problem: pg.problem,
+                    phase_tol: Optional[float] = None,
+                    max_fevals: Optional[int] = None,
+                    max_time: Optional[float] = None,
+                    checkpoint: Optional[str] = None,
+                    checkpoint_key: Optional[str] = None,
+                    iters_per_round: Optional[int] = 5,
+                    ftol: Optional[float] = 1e-6,
+                    max_restarts: Optional[int] = None,
+                    seed: Optional[int] = 0,
+                    progress: Optional[Progress] = None,
+                    **fields) -> np.ndarray[float]:
+    """
+    Run L-BFGS-B from each initial condition in short increments and return the best solution.
+
+    After every increment, an island is terminated if its champion stopped improving, or if it lies within `phase_tol` of
+    the champion of a better island. The slot of an island terminated as a duplicate is reseeded with the phase that is
+    farthest from every phase visited so far.
+
+    Args:
+        initial_conditions (np.ndarray): a set of initial conditions to try. Can be 1d array (for greedy optimization) or 2d (for regular search)
+        pg_problem (pygmo.problem): an Pygmo problem instance
+        phase_tol (Optional[float]): phase distance below which two islands are considered to be in the same basin. Phases
+            are compared on the unit circle, using the largest difference over all observers. No deduplication if None.
+        max_fevals (Optional[int]): budget of fitness evaluations summed over all islands. All islands are terminated once
+            it is exceeded. Checked between increments.
+        max_time (Optional[float]): wall-clock budget in seconds. The runs stop once it is exceeded, but the islands are kept
+            alive in the checkpoint. Checked between increments.
+        checkpoint (Optional[str]): path of a checkpoint file. The champions of all islands are saved after every increment,
+            and the runs resume from the file if it exists.
+        checkpoint_key (Optional[str]): identifies the problem and search of the checkpoint. A checkpoint with another key
+            raises a ValueError. See `_checkpoint_key`.
+        iters_per_round (int): number of L-BFGS-B iterations in each increment
+        ftol (float): relative improvement of the champion fitness below which an island is considered converged
+        max_restarts (Optional[int]): maximum number of reseeded islands. Defaults to the number of initial conditions.
+        seed (int): seed for the random sampling of unexplored phases
+        progress (Optional[Progress]): receives an "island" event per island and a "progress" event after every increment.
+            The status of an island is one of "active", "converged", "redundant" or "out_of_budget", and reseeded islands
+            get new ids. The evaluations are added to those of previous "progress" events.
+        **fields: additional fields of the "progress" events, e.g. the observer optimized by a greedy search
+
+    Returns:
+        champion (np.ndarray): the best candidate out of all the optimization runs
+    """
+    start_time = time.time()
+
+    algo = pg.algorithm(pg.scipy_optimize(method="L-BFGS-B", options={"maxiter": iters_per_round}))
+    rng = np.random.default_rng(seed)
+
+    initial_conditions = np.asarray(initial_conditions, dtype=float).reshape(len(initial_conditions), -1)
+
+    if max_restarts is None:
+        max_restarts = len(initial_conditions)
+
+    def make_island(ic, island):
+        pop = _island_population(pg_problem, island)
+        pop.push_back(ic)
+        return pg.island(algo=algo, pop=pop)
+
+    state = _load_checkpoint(checkpoint, method="multistart", key=checkpoint_key)
+    base_fevals = 0 if progress is None else progress.evaluations
+
+    if state is None:
+        islands = [make_island(ic, k) for k, ic in enumerate(initial_conditions)]
+        prev_f = np.full(len(islands), np.inf)
+        visited = list(initial_conditions)
+
+        champions_x = []
+        champions_f = []
+        retired_fevals = 0
+        n_restarts = 0
+    else:
+        islands = [make_island(x, k) for k, x in enumerate(state["xs"])]
+        prev_f = state["prev_f"]
+        visited = state["visited"]
+
+        champions_x = state["champions_x"]
+        champions_f = state["champions_f"]
+        retired_fevals = state["fevals"]
+        n_restarts = state["n_restarts"]
+        rng.bit_generator.state = state["rng"]
+
+    ids = list(range(len(islands)))
+    next_id = len(islands)
+
+    while islands:
+        for isl in islands:
+            isl.evolve()
+        for isl in islands:
+            isl.wait_check()
+
+        pops = [isl.get_population() for isl in islands]
+        xs = np.array([pop.champion_x for pop in pops])
+        fs = np.array([pop.champion_f[0] for pop in pops])
+        visited.extend(xs)
+
+        converged = prev_f - fs <= ftol * np.abs(fs)
+
+        # an island is redundant if its champion lies in the basin of a better island
+        redundant = np.zeros(len(islands), dtype=bool)
+        if phase_tol is not None:
+            order = np.argsort(fs)
+            for n, a in enumerate(order):
+                if redundant[a]:
+                    continue
+                for b in order[n+1:]:
+                    if not redundant[b] and _phase_distance(xs[a], xs[b]) < phase_tol:
+                        redundant[b] = True
+
+        fevals = retired_fevals + sum(pop.problem.get_fevals() for pop in pops)
+        out_of_budget = max_fevals is not None and fevals >= max_fevals
+        out_of_time = max_time is not None and time.time() - start_time > max_time
+
+        if progress is not None:
+            for k in range(len(islands)):
+                status = "out_of_budget" if out_of_budget else "redundant" if redundant[k] else "converged" if converged[k] else "active"
+                progress.emit("island", island=ids[k], status=status, best=-float(fs[k]), evaluations=pops[k].problem.get_fevals())
+
+            progress.update(evaluations=base_fevals + fevals, best=-min(np.min(fs), np.min(champions_f, initial=np.inf)), **fields)
+
+        active_islands = []
+        active_f = []
+        active_ids = []
+        for k, isl in enumerate(islands):
+            if not (converged[k] or redundant[k] or out_of_budget):
+                active_islands.append(isl)
+                active_f.append(fs[k])
+                active_ids.append(ids[k])
+                continue
+
+            champions_x.append(xs[k])
+            champions_f.append(fs[k])
+            retired_fevals += pops[k].problem.get_fevals()
+
+            if redundant[k] and not out_of_budget and n_restarts < max_restarts:
+                ic = _unexplored_phase(np.array(visited), rng)
+                visited.append(ic)
+                active_islands.append(make_island(ic, next_id))
+                active_f.append(np.inf)
+                active_ids.append(next_id)
+                next_id += 1
+                n_restarts += 1
+
+        islands = active_islands
+        prev_f = np.array(active_f)
+        ids = active_ids
+
+        if checkpoint is not None:
+            _save_checkpoint(checkpoint, {"method": "multistart",
+                                          "key": checkpoint_key,
+                                          "xs": [isl.get_population().champion_x for isl in islands],
+                                          "prev_f": prev_f,
+                                          "visited": visited,
+                                          "champions_x": champions_x,
+                                          "champions_f": champions_f,
+                                          "fevals": retired_fevals + sum(isl.get_population().problem.get_fevals() for isl in islands),
+                                          "n_restarts": n_restarts,
+                                          "rng": rng.bit_generator.state})
+
+        if out_of_time:
+            # active islands stay in the checkpoint, so that a resumed run continues them
+            champions_x.extend(isl.get_population().champion_x for isl in islands)
+            champions_f.extend(isl.get_population().champion_f[0] for isl in islands)
+            break
+
+    champion = champions_x[np.argmin(champions_f)]
+
+    return champion
+
+def _island_population(pg_problem: pg.problem, island: int, **kwargs) -> pg.population:
+    """
+    Create a population on a copy of a problem. If the problem is traced, the spans of the copy are tagged with the island.
+
+    Args:
+        pg_problem (pygmo.problem): a Pygmo problem instance
+        island (int): id of the island the population is evolved on
+        **kwargs: keyword arguments of pygmo.population, e.g. size and seed
+
+    Returns:
+        pygmo.population: the population
+    """
+    udp = pg_problem.extract(object)
+    tracer = getattr(udp, "stats", None)
+
+    if not isinstance(tracer, Tracer):
+        return pg.population(pg_problem, **kwargs)
+
+    udp._set_stats(tracer.for_island(island))
+    try:
+        return pg.population(pg_problem, **kwargs)
+    finally:
+        udp._set_stats(tracer)
+
+def _save_checkpoint(checkpoint: str, state: dict):
+    """
+    Serialize the state of a search to a checkpoint file. The file is replaced atomically, so an interrupted write never
+    corrupts an existing checkpoint.
+
+    Args:
+        checkpoint (str): path of the checkpoint file
+        state (dict): state of the search. Must contain the keys "method" identifying the search that wrote it, and "key"
+            identifying its problem and search arguments.
+    """
+    tmp = checkpoint + ".tmp"
+
+    with open(tmp, "wb") as f:
+        pickle.dump(state, f)
+
+    os.replace(tmp, checkpoint)
+
+def _load_checkpoint(checkpoint: Optional[str], method: str, key: Optional[str] = None) -> Optional[dict]:
+    """
+    Load the state of a search from a checkpoint file.
+
+    Args:
+        checkpoint (Optional[str]): path of the checkpoint file
+        method (str): identifier of the search resuming from the checkpoint
+        key (Optional[str]): identifier of the problem and search arguments of the search resuming from the checkpoint.
+            See `_checkpoint_key`.
+
+    Returns:
+        Optional[dict]: the state of the search, or None if there is no checkpoint to resume from
+
+    Raises:
+        ValueError: If the checkpoint was written by a different search, or for a different problem or search arguments.
+    """
+    if checkpoint is None or not os.path.exists(checkpoint):
+        return None
+
+    with open(checkpoint, "rb") as f:
+        state = pickle.load(f)
+
+    if state["method"] != method:
+        raise ValueError(f"checkpoint {checkpoint} was written by `{state['method']}`, cannot resume `{method}` from it")
+
+    if state.get("key") != key:
+        raise ValueError(f"checkpoint {checkpoint} was written for other targets, agents or search arguments, cannot resume from it")
+
+    return state
+
+def _checkpoint_key(**arguments) -> str:
+    """
+    Hash the arguments that define a search, which are stored in its checkpoints. Budgets such as `max_time` are left out,
+    so that a search may be resumed with a new budget.
+
+    Args:
+        **arguments: problem and search arguments, e.g. the targets, agents, objective and initial guesses
+
+    Returns:
+        str: hexadecimal digest of the arguments
+    """
+    return hashlib.sha1(json.dumps(arguments, sort_keys=True, default=_to_json).encode()).hexdigest()
+
+def _phase_distance(x: np.ndarray[float], y: np.ndarray[float]) -> float:
+    """
+    Distance between two phase vectors on the unit circle, taking the largest difference over all observers.
+
+    Args:
+        x (np.ndarray[float]): phase vector, or array of phase vectors along the last axis
+        y (np.ndarray[float]): phase vector
+
+    Returns:
+        float: the distance
+    """
+    d = np.abs(x - y) % 1
+    return np.max(np.minimum(d, 1 - d), axis=-1)
+
+def _unexplored_phase(visited: np.ndarray[float], rng: np.random.Generator, n_samples: Optional[int] = 256) -> np.ndarray[float]:
+    """
+    Sample the phase vector farthest from all visited phase vectors, out of a set of random samples.
+
+    Args:
+        visited (np.ndarray[float]): visited phase vectors, one per row
+        rng (np.random.Generator): random number generator
+        n_samples (int): number of random samples to choose from
+
+    Returns:
+        np.ndarray[float]: the phase vector
+    """
+    samples = rng.random(size=(n_samples, visited.shape[1]))
+    dists = _phase_distance(samples[:, np.newaxis, :], visited[np.newaxis, :, :])
+
+    return samples[np.argmax(np.min(dists, axis=1))]
+
+def _screen_candidates(p: SSA_Problem,
+                       candidates: np.ndarray[float],
+                       fidelity_schedule: List[dict],
+                       score: Optional[Callable[[np.ndarray], float]] = None) -> np.ndarray[float]:
+    """
+    Score candidates on a schedule of coarse fidelities and promote only the fittest fraction to the next level.
+
+    Each level of the schedule is a dict with the keys
+        - "tstep" (float): timestep of the coarse time grid
+        - "n_points" (int, optional): number of ephemeris samples per period. Defaults to the full resolution value.
+        - "mip_gap" (float, optional): relative optimality gap of the solver. Defaults to the full resolution value.
+        - "quad_order" (int, optional): Gauss-Legendre nodes per time step. Defaults to the full resolution value.
+        - "keep" (float, optional): fraction of candidates promoted to the next level. Defaults to 0.5.
+
+    Args:
+        p (SSA_Problem): the problem instance. It is returned to its original fidelity before this function returns.
+        candidates (np.ndarray[float]): candidate decision vectors, one per row
+        fidelity_schedule (List[dict]): the coarse fidelity levels, from coarsest to finest
+        score (Optional[Callable]): function returning the fitness of a candidate at the current fidelity, lower is better.
+            Defaults to `p.fitness`.
+
+    Returns:
+        np.ndarray[float]: the promoted candidates, best first
+    """
+    if score is None:
+        score = lambda x: p.fitness(x)[0]
+
+    for level in fidelity_schedule:
+        with _fidelity(p, level):
+            f = np.array([score(x) for x in candidates])
+
+        n_keep = max(1, int(np.ceil(level.get("keep", 0.5) * len(candidates))))
+        candidates = candidates[np.argsort(f)[:n_keep]]
+
+    return candidates
+
+@contextmanager
+def _fidelity(p: SSA_Problem, level: dict):
+    """
+    Temporarily evaluate a problem at the fidelity of a level of a fidelity schedule. See `_screen_candidates`.
+
+    Args:
+        p (SSA_Problem): the problem instance
+        level (dict): the fidelity level
+    """
+    tstep, n_points, mip_gap, quad_order = p.tstep, p.tg.n_points, p.mip_gap, p.quad_order
+
+    p.set_fidelity(tstep=level["tstep"],
+                   n_points=level.get("n_points", n_points),
+                   mip_gap=level.get("mip_gap", mip_gap),
+                   quad_order=level.get("quad_order", quad_order))
+    try:
+        yield p
+    finally:
+        p.set_fidelity(tstep=tstep, n_points=n_points, mip_gap=mip_gap, quad_order=quad_order)
+
+def _marginal_gain(p: SSA_Problem,
+                   info_slice: np.ndarray[float],
+                   target_infos: np.ndarray[float]) -> Tuple[float, np.ndarray[int]]:
+    """
+    Compute the marginal gain of adding an observer to the observers placed so far, keeping their control fixed.
+
+    Args:
+        p (SSA_Problem): the problem instance, used for its objective and solver
+        info_slice (np.ndarray[float]): information coefficients of the new observer, of shape (maxsteps, num_targets)
+        target_infos (np.ndarray[float]): information accumulated by each target from the observers placed so far
+
+    Returns:
+        gain (float): increase in objective value from adding the observer
+        control (np.ndarray[int]): control of the new observer, of shape (maxsteps, 1, num_targets)
+    """
+    information = info_slice[:, np.newaxis, :]
+
+    match p.opt:
+        case "max":
+            control, gain = p.solve_func(information, mip_gap=p.mip_gap)
+        case "maxmin":
+            control, obj = p.solve_func(information, offset=target_infos, mip_gap=p.mip_gap)
+            gain = obj - np.min(target_infos)
+        case _:
+            raise RuntimeError(f"The optimization objective f{p.opt} is not supported")
+
+    return gain, control
+
+def _lazy_objective(opt: str,
+                    information: np.ndarray[float],
+                    control: np.ndarray[int],
+                    target_infos: np.ndarray[float]) -> float:
+    """
+    Compute the objective of the observers committed so far by a lazy greedy search.
+
+    Args:
+        opt (str): the objective, "max" or "maxmin"
+        information (np.ndarray[float]): information coefficients of the committed observers, zero for all others
+        control (np.ndarray[int]): control of the committed observers, zero for all others
+        target_infos (np.ndarray[float]): information accumulated by each target from the committed observers
+
+    Returns:
+        float: the objective value
+    """
+    match opt:
+        case "max":
+            return information.reshape(-1) @ control.reshape(-1)
+        case "maxmin":
+            return np.min(target_infos)
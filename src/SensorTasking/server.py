@@ -0,0 +1,435 @@
+import argparse
+import asyncio
+import builtins
+import hashlib
+import json
+import os
+import socket
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, List, Optional
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from .progress import Progress, _to_json
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "sensortasking.sock")
+
+# longest request or response line, e.g. the control of a long horizon
+_LINE_LIMIT = 2**28
+
+
+class Server:
+    """
+    Long-lived asyncio service that keeps problems, integrators and solver environments warm between requests.
+
+    Requests and responses are lines of JSON. A request is {"id": int, "op": str, "args": dict}. The server answers with
+    any number of streamed events {"id", "event", ...}, e.g. the progress events of a search, followed by
+    {"id", "event": "done", "result"} or {"id", "event": "error", "type", "message"}.
+
+    Operations:
+        - "ping": Returns the pid, uptime, number of requests served and number of cached problems.
+        - "scenario": Builds an SSA_Problem, or a Greedy_SSA_Problem with `greedy`, from the arguments of its
+          constructor and returns its key. Scenarios with the same arguments share one problem.
+        - "evaluate": Evaluates the fitness of the phases of a scenario, streaming a "fitness" event per phase vector.
+        - "run_experiment": Runs `run_experiment`, streaming its progress events, and returns the phases, control and
+          objective.
+        - "shutdown": Stops the server.
+
+    Parameters:
+        max_problems (Optional[int]): Number of problems kept, the least recently used is dropped first. Defaults to 16.
+
+    Notes:
+        - Requests of a connection are served in order, connections are served concurrently. Computations run one at a
+          time on a single worker thread, which owns the Gurobi environment and the integrators it copies from.
+        - Searches still evolve their islands in worker processes. The pool of worker processes is started with the
+          server, since pygmo can only start it from the main thread.
+    """
+    def __init__(self, max_problems: Optional[int] = 16):
+        self.max_problems = max_problems
+        self.problems = OrderedDict()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.start_time = time.time()
+        self.requests = 0
+
+        self._stop = None
+        self._writers = set()
+
+    async def serve(self, path: Optional[str] = None, host: Optional[str] = "127.0.0.1", port: Optional[int] = None):
+        """
+        Serves requests on a Unix socket, or on a local TCP port if `port` is given, until a "shutdown" request.
+
+        Parameters:
+            path (Optional[str]): Path of the Unix socket. Defaults to `DEFAULT_SOCKET`.
+            host (Optional[str]): Host of the TCP socket. Defaults to "127.0.0.1".
+            port (Optional[int]): Port of the TCP socket.
+
+        Returns:
+            None
+        """
+        self._stop = asyncio.Event()
+        pool = _init_island_pool()
+
+        if port is None:
+            path = DEFAULT_SOCKET if path is None else path
+            if os.path.exists(path):
+                os.remove(path)
+            server = await asyncio.start_unix_server(self._handle, path=path, limit=_LINE_LIMIT)
+        else:
+            server = await asyncio.start_server(self._handle, host, port, limit=_LINE_LIMIT)
+
+        try:
+            async with server:
+                await self._stop.wait()
+
+                # end the connections that are still open, so that their handlers return
+                for writer in list(self._writers):
+                    writer.close()
+                    await writer.wait_closed()
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            if pool:
+                import pygmo as pg
+                pg.mp_island.shutdown_pool()
+            if port is None and os.path.exists(path):
+                os.remove(path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Serves the requests of a connection in order.
+        """
+        self._writers.add(writer)
+
+        try:
+            while line := await reader.readline():
+                await self._dispatch(line, writer)
+        except ConnectionError:
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _dispatch(self, line: bytes, writer: asyncio.StreamWriter):
+        """
+        Parses a request, runs its operation and writes its events and result. A malformed request is answered with an
+        error, with a null id if it could not be parsed.
+        """
+        rid = None
+
+        async def send(message: dict):
+            # waiting for the client to read each message bounds what the server buffers for a slow client
+            writer.write((json.dumps({"id": rid, **message}, default=_to_json) + "\n").encode())
+            await writer.drain()
+
+        self.requests += 1
+
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a request must be a JSON object")
+            rid = request.get("id")
+
+            operation = getattr(self, f"_op_{request.get('op')}", None)
+            if operation is None:
+                raise ValueError(f"unknown operation {request.get('op')!r}")
+
+            result = await operation(send, **request.get("args", {}))
+            await send({"event": "done", "result": result})
+        except ConnectionError:
+            raise
+        except Exception as e:
+            await send({"event": "error", "type": type(e).__name__, "message": str(e)})
+
+    async def _run(self, func: Callable, *args):
+        """
+        Runs a computation on the worker thread.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def _threadsafe(self, send: Callable[[dict], Awaitable[None]]) -> Callable[[dict], None]:
+        """
+        Returns a function that sends a message from the worker thread, and waits until it is written.
+        """
+        loop = asyncio.get_running_loop()
+
+        return lambda message: asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    async def _op_ping(self, send):
+        return {"pid": os.getpid(), "uptime": time.time() - self.start_time, "requests": self.requests,
+                "problems": len(self.problems)}
+
+    async def _op_scenario(self, send, greedy: Optional[bool] = False, **kwargs):
+        from .ssa_problem import Greedy_SSA_Problem, SSA_Problem
+
+        key = hashlib.sha1(json.dumps({"greedy": greedy, **kwargs}, sort_keys=True, default=_to_json).encode()).hexdigest()
+
+        cached = key in self.problems
+        if cached:
+            self.problems.move_to_end(key)
+        else:
+            self.problems[key] = await self._run(lambda: (Greedy_SSA_Problem if greedy else SSA_Problem)(**kwargs))
+            if len(self.problems) > self.max_problems:
+                self.problems.popitem(last=False)
+
+        return {"scenario": key, "cached": cached}
+
+    async def _op_evaluate(self, send, scenario: str, phases: List[List[float]]):
+        if scenario not in self.problems:
+            raise ValueError(f"unknown scenario {scenario}, it may have been dropped from the cache")
+
+        problem = self.problems[scenario]
+        self.problems.move_to_end(scenario)
+        send_threadsafe = self._threadsafe(send)
+
+        def evaluate():
+            fitnesses = []
+            for i, x in enumerate(phases):
+                fitnesses.append(problem.fitness(np.asarray(x, dtype=float)))
+                send_threadsafe({"event": "fitness", "index": i, "fitness": fitnesses[-1]})
+            return fitnesses
+
+        return await self._run(evaluate)
+
+    async def _op_run_experiment(self, send, **kwargs):
+        from .main import run_experiment
+
+        # arrays arrive as lists
+        for name in ["targets", "target_periods", "agents", "agent_periods", "init_phase_guess"]:
+            if kwargs.get(name) is not None:
+                kwargs[name] = np.asarray(kwargs[name], dtype=float)
+
+        progress = Progress(callback=self._threadsafe(send), echo=False)
+        phases, control, objective = await self._run(lambda: run_experiment(**kwargs, progress=progress))
+
+        return {"phases": phases, "control": control, "objective": objective}
+
+    async def _op_shutdown(self, send):
+        asyncio.get_running_loop().call_soon(self._stop.set)
+
+def _init_island_pool() -> bool:
+    """
+    Starts the process pool of pygmo islands, or returns False if pygmo, which only the searches need, is not installed.
+    """
+    try:
+        import pygmo as pg
+    except ImportError:
+        return False
+
+    pg.mp_island.init_pool()
+
+    return True
+
+class Client:
+    """
+    Blocking client of a `Server`, whose methods mirror `run_experiment` and the problems it evaluates.
+
+    Parameters:
+        path (Optional[str]): Path of the Unix socket. Defaults to `DEFAULT_SOCKET`.
+        host (Optional[str]): Host of the TCP socket. Defaults to "127.0.0.1".
+        port (Optional[int]): Port of the TCP socket. If given, connects over TCP rather than the Unix socket.
+        timeout (Optional[float]): Timeout of the socket in seconds. Defaults to None, no timeout.
+
+    Methods:
+        request(op, callback, **args): Sends a request and returns its result, passing streamed events to a callback.
+        ping(): Returns the status of the server.
+        scenario(...): Builds or looks up a problem on the server and returns its key.
+        evaluate(scenario, phases, callback): Evaluates the fitness of phases on a scenario.
+        run_experiment(...): Runs `run_experiment` on the server.
+        shutdown(): Stops the server.
+        close(): Closes the connection.
+    """
+    def __init__(self,
+                 path: Optional[str] = None,
+                 host: Optional[str] = "127.0.0.1",
+                 port: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        if port is None:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.settimeout(timeout)
+            self.socket.connect(DEFAULT_SOCKET if path is None else path)
+        else:
+            self.socket = socket.create_connection((host, port), timeout=timeout)
+
+        self.file = self.socket.makefile("rb")
+        self.next_id = 0
+
+    def request(self, op: str, callback: Optional[Callable[[dict], None]] = None, **args):
+        """
+        Sends a request and waits for its result.
+
+        Parameters:
+            op (str): The operation, see `Server`.
+            callback (Optional[Callable[[dict], None]]): Called with every event streamed before the result.
+            **args: Arguments of the operation.
+
+        Returns:
+            The result of the operation.
+
+        Raises:
+            Exception: The error raised by the operation on the server, as a built-in exception of the same type if
+                there is one and a RuntimeError otherwise.
+        """
+        rid = self.next_id
+        self.next_id += 1
+        self.socket.sendall((json.dumps({"id": rid, "op": op, "args": args}, default=_to_json) + "\n").encode())
+
+        while line := self.file.readline():
+            message = json.loads(line)
+            message.pop("id")
+
+            match message["event"]:
+                case "done":
+                    return message["result"]
+                case "error":
+                    error = getattr(builtins, message["type"], None)
+                    if not (isinstance(error, type) and issubclass(error, Exception)):
+                        error = RuntimeError
+                    raise error(message["message"])
+                case _ if callback is not None:
+                    callback(message)
+
+        raise ConnectionError("server closed the connection")
+
+    def ping(self) -> dict:
+        """
+        Returns the status of the server.
+
+        Returns:
+            dict: pid, uptime in seconds, number of requests served and number of cached problems.
+        """
+        return self.request("ping")
+
+    def scenario(self,
+                 targets: ArrayLike,
+                 target_periods: ArrayLike,
+                 agents: ArrayLike,
+                 agent_periods: ArrayLike,
+                 opt: Optional[str] = "max",
+                 tstep: Optional[float] = 0.015,
+                 n_points: Optional[int] = 500,
+                 block_size: Optional[int] = None,
+                 horizon: Optional[float] = None,
+                 greedy: Optional[bool] = False) -> str:
+        """
+        Builds an SSA_Problem on the server, or looks up one built with the same arguments.
+
+        Parameters:
+            targets, target_periods, agents, agent_periods, opt, tstep, n_points, block_size, horizon: Arguments of
+                `SSA_Problem`.
+            greedy (Optional[bool]): Whether to build a Greedy_SSA_Problem. Defaults to False.
+
+        Returns:
+            str: Key of the scenario.
+        """
+        return self.request("scenario", targets=targets, target_periods=target_periods, agents=agents,
+                            agent_periods=agent_periods, opt=opt, tstep=tstep, n_points=n_points, block_size=block_size,
+                            horizon=horizon, greedy=greedy)["scenario"]
+
+    def evaluate(self, scenario: str, phases: ArrayLike, callback: Optional[Callable[[dict], None]] = None) -> np.ndarray:
+        """
+        Evaluates the fitness of phase vectors on a scenario.
+
+        Parameters:
+            scenario (str): Key of the scenario, from `scenario`.
+            phases (ArrayLike): A phase vector, or an array of them of shape (n, agents).
+            callback (Optional[Callable[[dict], None]]): Called with a "fitness" event as each phase vector is evaluated.
+
+        Returns:
+            np.ndarray[float]: The fitness of each phase vector, of shape (n, 1), or (1,) for a single phase vector.
+        """
+        phases = np.asarray(phases, dtype=float)
+        fitnesses = np.array(self.request("evaluate", callback=callback, scenario=scenario, phases=np.atleast_2d(phases)))
+
+        return fitnesses[0] if phases.ndim == 1 else fitnesses
+
+    def run_experiment(self,
+                       obj: str,
+                       method: str,
+                       targets: ArrayLike,
+                       target_periods: ArrayLike,
+                       agents: ArrayLike,
+                       agent_periods: ArrayLike,
+                       init_phase_guess: Optional[np.ndarray[float]] = None,
+                       fidelity_schedule: Optional[List[dict]] = None,
+                       progress: Optional[Progress] = None):
+        """
+        Runs `run_experiment` on the server.
+
+        Parameters:
+            obj, method, targets, target_periods, agents, agent_periods, init_phase_guess, fidelity_schedule: Arguments
+                of `run_experiment`.
+            progress (Optional[Progress]): receives the progress events streamed by the server. Defaults to printing them.
+
+        Returns:
+            np.ndarray[float]: Array containing optimized phases for alignment.
+            np.ndarray[int]: Array containing control for all observers.
+            float: Objective value
+        """
+        if progress is None:
+            progress = Progress()
+
+        result = self.request("run_experiment", callback=lambda event: progress.emit(**event), obj=obj, method=method,
+                              targets=targets, target_periods=target_periods, agents=agents, agent_periods=agent_periods,
+                              init_phase_guess=init_phase_guess, fidelity_schedule=fidelity_schedule)
+
+        return np.array(result["phases"]), np.array(result["control"]), result["objective"]
+
+    def shutdown(self):
+        """
+        Stops the server.
+
+        Returns:
+            None
+        """
+        self.request("shutdown")
+
+    def close(self):
+        """
+        Closes the connection.
+
+        Returns:
+            None
+        """
+        self.file.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def serve(path: Optional[str] = None,
+          host: Optional[str] = "127.0.0.1",
+          port: Optional[int] = None,
+          max_problems: Optional[int] = 16):
+    """
+    Runs a `Server` until it receives a "shutdown" request.
+
+    Parameters:
+        path (Optional[str]): Path of the Unix socket. Defaults to `DEFAULT_SOCKET`.
+        host (Optional[str]): Host of the TCP socket. Defaults to "127.0.0.1".
+        port (Optional[int]): Port of the TCP socket. If given, serves over TCP rather than the Unix socket.
+        max_problems (Optional[int]): Number of problems kept. Defaults to 16.
+
+    Returns:
+        None
+    """
+    asyncio.run(Server(max_problems=max_problems).serve(path=path, host=host, port=port))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve warm problems, integrators and solver environments.")
+    parser.add_argument("--socket", default=None, help=f"path of the Unix socket, defaults to {DEFAULT_SOCKET}")
+    parser.add_argument("--host", default="127.0.0.1", help="host of the TCP socket")
+    parser.add_argument("--port", type=int, default=None, help="serve over TCP on this port rather than a Unix socket")
+    parser.add_argument("--max-problems", type=int, default=16, help="number of problems kept in memory")
+    args = parser.parse_args(argv)
+
+    serve(path=args.socket, host=args.host, port=args.port, max_problems=args.max_problems)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,8 @@
 import numpy as np
+import itertools
+from typing import Optional
+
+from .spatial import range_pairs
 from .state import Spline
 
 class SpaceEnv:
@@ -9,20 +13,26 @@ class SpaceEnv:
         M (int): Number of targets.
         N (int): Number of agents.
         maxsteps (int): Maximum number of steps.
-        tstep (float): Time step.
+        tstep (float): Time step, or the nominal time step of a non-uniform time grid.
+        times (np.ndarray): Boundaries of the time steps of a non-uniform time grid, of shape (maxsteps + 1,). None for a uniform grid.
         elapsed_steps (int): Number of steps elapsed.
         observers (np.ndarray): Array of observers.
         truths (np.ndarray): Array of truths/targets.
 
     Methods:
-        __init__(agents, targets, maxsteps, tstep): Initializes the SpaceEnv with agents, targets, maximum steps, and time step.
+        __init__(agents, targets, maxsteps, tstep, times): Initializes the SpaceEnv with agents, targets, maximum steps, and time step.
         reset(): Resets the environment to its initial state.
-        step(): Advances the environment by one step and returns termination status and observation Jacobians.
-        _get_obs_jacobian(truth, observer): Computes the observation Jacobian between a truth and an observer.
+        set_times(times): Uses a non-uniform time grid, or a uniform one if None.
+        step_times(start_step, steps): Returns the start times and durations of a range of time steps.
+        step(max_range): Advances the environment by one step and returns termination status and observation Jacobians.
+        candidate_pairs(max_range): Finds the observer-target pairs within a range of each other.
+        _get_obs_jacobian(truth, observer, t): Computes the observation Jacobian between a truth and an observer.
         reset_new_agents(agents): Adds agents to environment and resets the environment.
+        seek(step): Moves the environment to the given time step.
+        get_states(t): Evaluates the states of all observers and truths at the given times.
 
     """
-    def __init__(self, agents:np.ndarray[dict], targets: np.ndarray[dict], maxsteps: int, tstep: float):
+    def __init__(self, agents:np.ndarray[dict], targets: np.ndarray[dict], maxsteps: int, tstep: float, times: Optional[np.ndarray[float]] = None):
         """
         Initializes the SpaceEnv with agents, targets, maximum steps, and time step.
 
@@ -31,6 +41,8 @@ class SpaceEnv:
             targets (np.ndarray): Array containing information about targets.
             maxsteps (int): Maximum number of steps.
             tstep (float): Time step.
+            times (Optional[np.ndarray[float]]): Boundaries of the time steps of a non-uniform time grid. Overrides
+                `maxsteps` if given. Defaults to a uniform grid.
 
         """
         self.M  = targets.size
@@ -43,6 +55,8 @@ class SpaceEnv:
         self.observers = np.array( [Spline( tstep=tstep, spl=agents[i]["spline"], stm_spl = agents[i]["stm_spline"], period=agents[i]["period"]) for i in range(self.N)] )
         self.truths = np.array( [Spline( tstep=tstep, spl=targets[i]["spline"], stm_spl = targets[i]["stm_spline"], period=targets[i]["period"]) for i in range(self.M)] )
 
+        self.set_times(times)
+
     def reset(self):
         """
         Resets the environment to its initial state.
@@ -61,59 +75,160 @@ class SpaceEnv:
 
         return
     
-    def step(self):
+    def set_times(self, times: Optional[np.ndarray[float]]):
         """
-        Advances the environment by one step and returns termination status and observation Jacobians.
+        Uses a non-uniform time grid, or a uniform grid with the time step `tstep` if None.
+
+        Parameters:
+            times (Optional[np.ndarray[float]]): Boundaries of the time steps, of shape (steps + 1,), starting at 0.
 
         Returns:
-            Tuple[bool, np.ndarray]: A tuple containing termination status and observation Jacobians.
+            None
+
+        """
+        self.times = times
+
+        if times is not None:
+            self.maxsteps = times.size - 1
+
+        return
+
+    def step_times(self, start_step: int, steps: int):
+        """
+        Returns the start times and durations of a range of time steps.
+
+        Parameters:
+            start_step (int): Index of the first time step.
+            steps (int): Number of time steps.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Start times and durations of the time steps, each of shape (steps,).
+
+        """
+        if self.times is None:
+            return (start_step + np.arange(steps)) * self.tstep, np.full(steps, self.tstep)
+
+        if start_step + steps > self.maxsteps:
+            raise ValueError(f"Time steps {start_step} to {start_step + steps} exceed the time grid of {self.maxsteps} steps")
+
+        bounds = self.times[start_step:start_step + steps + 1]
 
+        return bounds[:-1], np.diff(bounds)
+
+    def seek(self, step: int):
         """
+        Moves the environment to the given time step without stepping through the intermediate steps.
+
+        Parameters:
+            step (int): Number of elapsed steps to move to.
 
-        self.elapsed_steps += 1
+        Returns:
+            None
+
+        """
+        self.elapsed_steps = step
+        t = step * self.tstep if self.times is None else self.times[step]
 
         for observer in self.observers:
-            observer.propagate(steps=1)
+            observer.set_time(t)
 
         for truth in self.truths:
-            truth.propagate(steps=1)
+            truth.set_time(t)
+
+        return
+
+    def get_states(self, t: np.ndarray[float]):
+        """
+        Evaluates the states of all observers and truths at the given times, without changing the environment.
+
+        Parameters:
+            t (np.ndarray[float]): Times at which to evaluate the states.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: States of the observers, of shape (times, N, 6), and of the truths, of shape (times, M, 6).
+
+        """
+        observer_states = np.stack([observer.spl(t) for observer in self.observers], axis=1)
+        truth_states = np.stack([truth.spl(t) for truth in self.truths], axis=1)
+
+        return observer_states, truth_states
+
+    def step(self, max_range: Optional[float] = None):
+        """
+        Advances the environment by one step and returns termination status and observation Jacobians.
+
+        Parameters:
+            max_range (Optional[float]): If given, Jacobians are only computed for observer-target pairs within this range
+                at the middle of the step. All other entries are None.
+
+        Returns:
+            Tuple[bool, np.ndarray]: A tuple containing termination status and observation Jacobians.
+
+        """
+
+        t_start, duration = self.step_times(self.elapsed_steps, 1)
+        t_mid = t_start[0] + duration[0] / 2
+
+        if self.times is None:
+            self.elapsed_steps += 1
+
+            for observer in self.observers:
+                observer.propagate(steps=1)
+
+            for truth in self.truths:
+                truth.propagate(steps=1)
+        else:
+            self.seek(self.elapsed_steps + 1)
 
         H = np.ndarray(shape = (self.observers.size, self.truths.size), dtype=object)
 
-        for i in range(self.observers.size):
-            for j in range(self.truths.size):
-                H[i, j] = self._get_obs_jacobian(self.truths[j], self.observers[i])
+        if max_range is None:
+            pairs = itertools.product(range(self.observers.size), range(self.truths.size))
+        else:
+            pairs = self.candidate_pairs(max_range, t=t_mid)
+
+        for i, j in pairs:
+            H[i, j] = self._get_obs_jacobian(self.truths[j], self.observers[i], t=t_mid)
 
         
         terminated = ((self.elapsed_steps == self.maxsteps))
 
         return  terminated, H
     
-    def _get_obs_jacobian(self, truth: Spline, observer: Spline):
+    def candidate_pairs(self, max_range: float, t: Optional[float] = None):
+        """
+        Finds the observer-target pairs within a range of each other at the middle of the current step.
+
+        Parameters:
+            max_range (float): Maximum observer-target range.
+            t (Optional[float]): Time at which the ranges are evaluated. Defaults to the middle of the current uniform step.
+
+        Returns:
+            np.ndarray[int]: Candidate pairs of shape (pairs, 2). Each row holds the observer index and the target index.
+
+        """
+        observer_positions = np.array([observer.spl(observer.t - observer.tstep/2 if t is None else t)[:3] for observer in self.observers])
+        truth_positions = np.array([truth.spl(truth.t - truth.tstep/2 if t is None else t)[:3] for truth in self.truths])
+
+        return range_pairs(observer_positions, truth_positions, max_range)
+
+    def _get_obs_jacobian(self, truth: Spline, observer: Spline, t: Optional[float] = None):
         """
         Computes the observation Jacobian between a truth and an observer.
 
         Parameters:
             truth (Spline): Spline object representing the truth.
             observer (Spline): Spline object representing the observer.
+            t (Optional[float]): Time at which the Jacobian is evaluated. Defaults to the middle of the current uniform step.
 
         Returns:
             np.ndarray: Observation Jacobian matrix.
 
         """
-        truthx = truth.spl(truth.t - truth.tstep/2)
-        observerx = observer.spl(observer.t - observer.tstep/2)
-
-        rOT = truthx[:3] - observerx[:3]
-        vOT = truthx[3:] - observerx[3:]
-
-        norm_rOT = np.linalg.norm(rOT)
-
-        H11 = 1 / norm_rOT * np.eye(3) - np.outer(rOT, rOT) / norm_rOT**3
-        H22 = H11
-        H21 = - 1/norm_rOT**3 * np.outer(vOT, rOT) - 1/norm_rOT**3 * (np.outer(rOT, vOT) + np.dot(rOT, vOT)*np.eye(3)) + 3/ norm_rOT**5 * (np.dot(rOT, vOT)*np.outer(rOT, rOT))
+        truthx = truth.spl(truth.t - truth.tstep/2 if t is None else t)
+        observerx = observer.spl(observer.t - observer.tstep/2 if t is None else t)
 
-        return np.block([[H11, np.zeros(shape=(3,3))], [H21, H22]])
+        return obs_jacobian(truthx, observerx)
     
     def reset_new_agents(self, agents_info: np.ndarray[dict]):
         """
@@ -133,4 +248,34 @@ class SpaceEnv:
         return
 
 
+def obs_jacobian(truth_states: np.ndarray[float], observer_states: np.ndarray[float]) -> np.ndarray[float]:
+    """
+    Computes the observation Jacobians between truths and observers, broadcasting over all leading dimensions.
+
+    Parameters:
+        truth_states (np.ndarray[float]): States of the truths, of shape (..., 6).
+        observer_states (np.ndarray[float]): States of the observers, of shape (..., 6).
+
+    Returns:
+        np.ndarray[float]: Observation Jacobian matrices, of shape (..., 6, 6).
+
+    """
+    rOT = truth_states[..., :3] - observer_states[..., :3]
+    vOT = truth_states[..., 3:] - observer_states[..., 3:]
+
+    norm_rOT = np.linalg.norm(rOT, axis=-1)[..., np.newaxis, np.newaxis]
+    rOT_vOT = np.sum(rOT * vOT, axis=-1)[..., np.newaxis, np.newaxis]
+
+    outer_rr = rOT[..., :, np.newaxis] * rOT[..., np.newaxis, :]
+    outer_rv = rOT[..., :, np.newaxis] * vOT[..., np.newaxis, :]
+    outer_vr = vOT[..., :, np.newaxis] * rOT[..., np.newaxis, :]
+
+    H11 = 1 / norm_rOT * np.eye(3) - outer_rr / norm_rOT**3
+    H21 = - 1/norm_rOT**3 * outer_vr - 1/norm_rOT**3 * (outer_rv + rOT_vOT*np.eye(3)) + 3/ norm_rOT**5 * (rOT_vOT*outer_rr)
+
+    H = np.zeros(shape=(*H11.shape[:-2], 6, 6))
+    H[..., :3, :3] = H11
+    H[..., 3:, :3] = H21
+    H[..., 3:, 3:] = H11
 
+    return H
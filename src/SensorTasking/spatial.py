@@ -0,0 +1,95 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+# below this many targets, brute force distance computations are faster than building a tree
+_BRUTE_FORCE_TARGETS = 64
+
+
+def nearest_targets(observer_positions: np.ndarray[float], target_positions: np.ndarray[float]) -> np.ndarray[int]:
+    """
+    Finds the target closest to each observer at each time step.
+
+    Parameters:
+        observer_positions (np.ndarray[float]): Observer positions of shape (steps, N, 3).
+        target_positions (np.ndarray[float]): Target positions of shape (steps, M, 3).
+
+    Returns:
+        np.ndarray[int]: Index of the closest target, of shape (steps, N).
+
+    Notes:
+        - For large catalogs a KD-tree is built over the target positions of each time step, so the cost grows as
+          (N + M) log M per step instead of N * M.
+    """
+    if target_positions.shape[1] <= _BRUTE_FORCE_TARGETS:
+        ranges = np.linalg.norm(observer_positions[:, :, np.newaxis, :] - target_positions[:, np.newaxis, :, :], axis=-1)
+        return np.argmin(ranges, axis=2)
+
+    index = np.zeros(shape=observer_positions.shape[:2], dtype=int)
+
+    for k in range(target_positions.shape[0]):
+        _, index[k] = cKDTree(target_positions[k]).query(observer_positions[k])
+
+    return index
+
+def range_pairs(observer_positions: np.ndarray[float], target_positions: np.ndarray[float], max_range: float) -> np.ndarray[int]:
+    """
+    Finds all observer-target pairs within a range of each other at a single time step.
+
+    Parameters:
+        observer_positions (np.ndarray[float]): Observer positions of shape (N, 3).
+        target_positions (np.ndarray[float]): Target positions of shape (M, 3).
+        max_range (float): Maximum observer-target range.
+
+    Returns:
+        np.ndarray[int]: Candidate pairs of shape (pairs, 2). Each row holds the observer index and the target index.
+    """
+    if target_positions.shape[0] <= _BRUTE_FORCE_TARGETS:
+        ranges = np.linalg.norm(observer_positions[:, np.newaxis, :] - target_positions[np.newaxis, :, :], axis=-1)
+        return np.argwhere(ranges <= max_range)
+
+    neighbors = cKDTree(target_positions).query_ball_point(observer_positions, r=max_range)
+
+    i = np.repeat(np.arange(len(neighbors)), [len(js) for js in neighbors])
+    j = np.concatenate([np.sort(js) for js in neighbors]).astype(int) if len(i) else np.zeros(0, dtype=int)
+
+    return np.column_stack((i, j))
+
+def range_triples(observer_positions: np.ndarray[float], target_positions: np.ndarray[float], max_range: float) -> np.ndarray[int]:
+    """
+    Finds all observer-target pairs within a range of each other at each of several time steps.
+
+    Parameters:
+        observer_positions (np.ndarray[float]): Observer positions of shape (steps, N, 3).
+        target_positions (np.ndarray[float]): Target positions of shape (steps, M, 3).
+        max_range (float): Maximum observer-target range.
+
+    Returns:
+        np.ndarray[int]: Candidate triples of shape (triples, 3). Each row holds the time step, the observer index and the
+        target index.
+
+    Notes:
+        - For large catalogs a single KD-tree is built over the targets of all time steps, with the time step as a fourth
+          coordinate spaced farther apart than `max_range`, so that only pairs of the same time step are in range.
+    """
+    steps, n_targets = target_positions.shape[:2]
+
+    if n_targets <= _BRUTE_FORCE_TARGETS or not np.isfinite(max_range):
+        ranges = np.linalg.norm(observer_positions[:, :, np.newaxis, :] - target_positions[:, np.newaxis, :, :], axis=-1)
+        return np.argwhere(ranges <= max_range)
+
+    gap = 2 * max_range + 1.
+    step_coordinate = gap * np.arange(steps, dtype=float)
+
+    def stamped(positions):
+        stamps = np.broadcast_to(step_coordinate[:, np.newaxis, np.newaxis], (*positions.shape[:2], 1))
+        return np.concatenate((positions, stamps), axis=2).reshape(-1, 4)
+
+    neighbors = cKDTree(stamped(target_positions)).query_ball_point(stamped(observer_positions), r=max_range)
+
+    # observers and targets are flattened step by step
+    flat_observers = np.repeat(np.arange(len(neighbors)), [len(js) for js in neighbors])
+    flat_targets = np.concatenate([np.sort(js) for js in neighbors]).astype(int) if len(flat_observers) else np.zeros(0, dtype=int)
+
+    k, i = np.divmod(flat_observers, observer_positions.shape[1])
+
+    return np.column_stack((k, i, flat_targets % n_targets))
@@ -2,9 +2,14 @@ import numpy as np
 from numpy.typing import ArrayLike
 from typing import Optional, Tuple, List
 
-from .compute_coefficients import compute_coefficients, solve_model_max, solve_model_maxmin
+from .aggregation import aggregate_steps, expand_control
+from .compute_coefficients import compute_coefficients, iter_coefficients, prune_coefficients, solve_model_max, solve_model_maxmin, solve_model_max_blocks, solve_model_maxmin_blocks, solve_model_max_sparse, solve_model_maxmin_sparse
+from .control import index_objective, index_to_control
+from .instrumentation import Stats, Tracer, current_tracer, timer
 from .spacenv import SpaceEnv
+from .spatial import nearest_targets
 from .state import Spline
+from .time_grid import adaptive_time_grid, geometry_rates
 from data_util.target_generation import TargetGenerator
 
 
@@ -18,22 +23,48 @@ class SSA_Problem():
         agents (ArrayLike): A array of agent initial conditions.
         agent_periods (ArrayLike): A array of agent periods.
         opt (str): the type of optimization to run. One of either "max" or "maxmin"
+        tstep (float): Timestep for numerical propagation. Defaults to 0.015.
+        n_points (int): Number of ephemeris samples per period used to fit splines. Defaults to 500.
+        block_size (Optional[int]): If given, `fitness` streams the information coefficients in blocks of this many time
+            steps and solves block by block, so memory does not grow with the horizon. Defaults to None.
+        horizon (Optional[float]): Simulation time. May span several revolutions of every orbit. Defaults to the shortest
+            period amongst all targets and observers.
     
     Attributes:
         ag (TargetGenerator): A generator/propagator for agent initial conditions.
         tg (TargetGenerator): A generator/propagator for target intial conditions.
         num_agents (int): Number of agents.
         tstep (float): Timestep for numerical propagation.
-        period (float): Shortest period of amongst all targets and observers. This is the simulation time.
+        period (float): Shortest period of amongst all targets and observers, or the horizon if given. This is the simulation time.
+        horizon (float): Simulation time requested by the user, None if the shortest period is used.
         maxsteps (int) : Maximum number of timesteps for simulation.
+        max_step_ratio (float): longest step of the adaptive time grid as a multiple of `tstep`. None for a uniform grid.
         env (SpaceEnv): Space environment object where targets and observers are propagated.
         min_target_period (ndarray): minimum period amongst all target orbits. Excludes agent orbits!
         solve_func (callable): a callable object that solves the integer linear program.
+        mip_gap (float): relative optimality gap passed to `solve_func`. None uses the solver default.
+        quad_order (int): number of Gauss-Legendre nodes per time step used to compute the information coefficients.
+        solve_blocks_func (callable): a callable object that solves the integer linear program block by block.
+        solve_sparse_func (callable): a callable object that solves the integer linear program over pruned coefficients.
+        threshold (float): information coefficients at or below this value are pruned. None disables pruning.
+        top_k (int): number of targets kept per observer and time step when pruning. None keeps all.
+        max_range (float): observer-target pairs farther apart are not computed. None computes all pairs.
+        max_segment (int): maximum number of time steps merged into a super-step. None disables aggregation.
+        segment_depth (int): number of top-ranked targets that must agree for time steps to be merged. None compares all.
+        stats (Stats): timers and counters of the stages of fitness evaluations. None when instrumentation is disabled.
+            Problems created inside `instrumentation.trace` record spans with a Tracer.
     
     Methods:
         fitness(x): This method evaluates the fitness of a decision vector 'x'.
         myopic_fitness(x): Evaluates fitness of decision vector assuming closest-target observation policy. 
         get_bounds(self): This method returns the bounds of the optimization problem. The bounds are [0, 1].
+        get_info_slice(index, phase): Computes the information coefficients of a single agent at the given phase.
+        set_fidelity(tstep, n_points, mip_gap, quad_order): Changes the time grid, ephemeris sampling, solver tolerance and quadrature.
+        set_pruning(threshold, top_k, max_range): Restricts the integer linear program to observer-target pairs that matter.
+        set_aggregation(max_segment, depth): Merges time steps with a stable ranking of targets into super-steps.
+        set_time_grid(max_ratio): Uses a non-uniform time grid with longer steps where the geometry changes slowly.
+        set_instrumentation(enabled, trace_dir): Times the stages of fitness evaluations and counts integrator steps and solver work.
+        get_stats(): Returns the timers and counters accumulated since instrumentation was enabled.
         _closest_target(observer): Returns the index of the closest target to given observer.
         get_bounds(): Returns the bounds of the decision vector.
         _gen_env(x): Updates the environment given the decision vector and resets environment to initial state.
@@ -43,33 +74,52 @@ class SSA_Problem():
                  target_periods: ArrayLike, 
                  agents: ArrayLike,
                  agent_periods: ArrayLike,
-                 opt: Optional[str] = "max") -> None:
-        
-        self.tg = TargetGenerator(targets, periods=target_periods)
+                 opt: Optional[str] = "max",
+                 tstep: Optional[float] = 0.015,
+                 n_points: Optional[int] = 500,
+                 block_size: Optional[int] = None,
+                 horizon: Optional[float] = None) -> None:
+
+        self.stats = current_tracer()
+        self.tg = TargetGenerator(targets, periods=target_periods, n_points=n_points, stats=self.stats)
         targets = np.array([self.tg.gen_phased_ics(catalog_ID=i, num_targets=1, gen_P=False)[0] for i in range(self.tg.num_options)])
 
-        self.ag = TargetGenerator(agents, periods = agent_periods)
+        self.ag = TargetGenerator(agents, periods = agent_periods, n_points=n_points, stats=self.stats)
         self.num_agents = len(agent_periods)
 
 
         tmp_agents = self.ag.gen_phased_ics_from([0.0] * self.num_agents)
         
-        self.tstep = 0.015
-        self.period = np.min([np.min(agent_periods), np.min(target_periods)])
+        self.tstep = tstep
+        self.mip_gap = None
+        self.quad_order = 1
+        self.threshold = None
+        self.top_k = None
+        self.max_range = None
+        self.max_segment = None
+        self.segment_depth = None
+        self.horizon = horizon
+        self.period = np.min([np.min(agent_periods), np.min(target_periods)]) if horizon is None else horizon
         self.maxsteps = int(np.floor(self.period/self.tstep))
 
         self.env = SpaceEnv(tmp_agents, targets, self.maxsteps, self.tstep)
         self.min_target_period = np.min(target_periods)
+        self.max_step_ratio = None
 
         match opt:
             case "max":
                 self.solve_func = solve_model_max
+                self.solve_blocks_func = solve_model_max_blocks
+                self.solve_sparse_func = solve_model_max_sparse
             case "maxmin":
                 self.solve_func = solve_model_maxmin
+                self.solve_blocks_func = solve_model_maxmin_blocks
+                self.solve_sparse_func = solve_model_maxmin_sparse
             case _:
                 raise ValueError(f"`opt` must a str and one of `max` or `maxmin`. Received {opt} of type {type(opt)} ")
 
         self.opt = opt
+        self.block_size = block_size
         
     def remove_agent(self, index:int = 0):
         """
@@ -82,13 +132,16 @@ class SSA_Problem():
         self.ag.remove_from_catalog(index)
         self.num_agents = self.ag.num_options
 
-        if self.ag.periods.size == 0:
+        if self.horizon is not None:
+            self.period = self.horizon
+        elif self.ag.periods.size == 0:
             self.period = self.min_target_period
         else:
             self.period = np.min([np.min(self.ag.periods), self.min_target_period])
 
         self.maxsteps = int(np.floor(self.period/self.tstep))
         self._gen_env(x=[0.0]*self.num_agents)
+        self._update_time_grid()
 
     def add_agent(self,
                   agent_ic: np.ndarray[float],
@@ -103,10 +156,155 @@ class SSA_Problem():
         self.ag.add_to_catalog(agent_ic, agent_period)
         self.num_agents = self.ag.num_options
 
-        self.period = np.min([agent_period, self.period])
+        if self.horizon is None:
+            self.period = np.min([agent_period, self.period])
         self.maxsteps = int(np.floor(self.period/self.tstep))
 
         self._gen_env(x=[0.0]*self.num_agents)
+        self._update_time_grid()
+
+    def set_fidelity(self,
+                     tstep: float,
+                     n_points: Optional[int] = None,
+                     mip_gap: Optional[float] = None,
+                     quad_order: Optional[int] = None):
+        """
+        Changes the fidelity at which decision vectors are evaluated. Regenerates the target ephemerides and resets the
+        Space Environment to initial state.
+
+        Parameters:
+            tstep (float): Timestep for numerical propagation.
+            n_points (Optional[int]): Number of ephemeris samples per period. Unchanged if None.
+            mip_gap (Optional[float]): Relative optimality gap passed to the solver. None uses the solver default.
+            quad_order (Optional[int]): Number of Gauss-Legendre nodes per time step. Unchanged if None.
+        """
+        self.tstep = tstep
+        self.maxsteps = int(np.floor(self.period/self.tstep))
+        self.mip_gap = mip_gap
+
+        if quad_order is not None:
+            self.quad_order = quad_order
+
+        if n_points is not None:
+            self.tg.n_points = n_points
+            self.ag.n_points = n_points
+
+        targets = np.array([self.tg.gen_phased_ics(catalog_ID=i, num_targets=1, gen_P=False)[0] for i in range(self.tg.num_options)])
+        tmp_agents = self.ag.gen_phased_ics_from([0.0] * self.num_agents)
+
+        self.env = SpaceEnv(tmp_agents, targets, self.maxsteps, self.tstep)
+        self._update_time_grid()
+
+    def set_time_grid(self, max_ratio: Optional[float] = 8.):
+        """
+        Uses a non-uniform time grid. Steps are `tstep` long where the targets move fastest in angle about the Moon, and
+        grow up to `max_ratio` times longer where they move slowly, e.g. near apolune. Call `set_time_grid(None)` to return
+        to the uniform grid.
+
+        Parameters:
+            max_ratio (Optional[float]): Longest time step as a multiple of `tstep`. Defaults to 8.
+
+        Notes:
+            - The grid only depends on the targets, so it is the same for every decision vector.
+            - The information coefficients of each step are weighted by its duration relative to `tstep`.
+        """
+        self.max_step_ratio = max_ratio
+        self._update_time_grid()
+
+    def _update_time_grid(self):
+        """
+        Regenerates the time grid of the Space Environment after the time step or simulation time changed.
+        """
+        self.maxsteps = int(np.floor(self.period/self.tstep))
+
+        if self.max_step_ratio is None:
+            self.env.set_times(None)
+            self.env.maxsteps = self.maxsteps
+            return
+
+        # sample the geometry several times per shortest step
+        t = np.linspace(0, self.period, 4 * int(np.ceil(self.period / self.tstep)) + 1)
+        truth_states = np.stack([truth.spl(t) for truth in self.env.truths], axis=1)
+
+        times = adaptive_time_grid(t, geometry_rates(truth_states, self.tg.mu), self.tstep, max_ratio=self.max_step_ratio)
+
+        self.env.set_times(times)
+        self.maxsteps = self.env.maxsteps
+
+    def set_pruning(self,
+                    threshold: Optional[float] = 0.,
+                    top_k: Optional[int] = None,
+                    max_range: Optional[float] = None):
+        """
+        Restricts the integer linear program to the observer-target pairs that carry information. Pruned pairs get no
+        variables, so the model size tracks the surviving pairs. Call with no pruning arguments to keep only nonzero
+        coefficients, and `set_pruning(None)` to disable pruning.
+
+        Parameters:
+            threshold (Optional[float]): Information coefficients at or below this value are pruned. Defaults to 0.
+            top_k (Optional[int]): If given, only the `top_k` most informative targets of each observer at each time step are kept.
+            max_range (Optional[float]): If given, observer-target pairs farther apart are not computed at all.
+        """
+        self.threshold = threshold
+        self.top_k = top_k
+        self.max_range = max_range
+
+        if threshold is None and (top_k is not None or max_range is not None):
+            self.threshold = 0.
+
+    def set_aggregation(self,
+                        max_segment: Optional[int] = 8,
+                        depth: Optional[int] = None):
+        """
+        Merges runs of consecutive time steps with a stable ranking of targets into super-steps before solving, so the
+        integer linear program has fewer variables. Controls are expanded back to every time step. Call
+        `set_aggregation(None)` to disable aggregation.
+
+        Parameters:
+            max_segment (Optional[int]): Maximum number of time steps in a super-step. Defaults to 8.
+            depth (Optional[int]): Number of top-ranked targets that must agree for time steps to be merged. None compares all.
+        """
+        self.max_segment = max_segment
+        self.segment_depth = depth
+
+    def set_instrumentation(self, enabled: Optional[bool] = True, trace_dir: Optional[str] = None):
+        """
+        Starts timing the stages of fitness evaluations, i.e. propagation, spline fitting, environment generation,
+        coefficients, aggregation, pruning and solves, and counting integrator steps and Gurobi runtime, nodes and simplex
+        iterations. Enabling discards previous statistics. Call `set_instrumentation(False)` to disable it.
+
+        Parameters:
+            enabled (Optional[bool]): Whether to instrument fitness evaluations. Defaults to True.
+            trace_dir (Optional[str]): If given, every timed stage is also written as a span to this directory. See
+                `instrumentation.Tracer`.
+
+        Notes:
+            - pygmo evaluates copies of the problem on islands, whose statistics are not merged into this problem.
+        """
+        if not enabled:
+            self._set_stats(None)
+        elif trace_dir is None:
+            self._set_stats(Stats())
+        else:
+            self._set_stats(Tracer(trace_dir))
+
+    def _set_stats(self, stats: Optional[Stats]):
+        """
+        Records the stages of fitness evaluations, including those of the target generators, in `stats`.
+        """
+        self.stats = stats
+        self.tg.stats = stats
+        self.ag.stats = stats
+
+    def get_stats(self) -> dict:
+        """
+        Returns the timers and counters accumulated since instrumentation was enabled.
+
+        Returns:
+            dict: {"timers": {stage: {"calls", "total", "mean"}}, "counters": {counter: value}}, with times in seconds.
+            Both are empty if instrumentation is disabled.
+        """
+        return Stats().as_dict() if self.stats is None else self.stats.as_dict()
 
     def get_control_obj(self, x: ArrayLike) -> Tuple[np.ndarray, float]:
         """
@@ -121,25 +319,64 @@ class SSA_Problem():
         """
 
         self._gen_env(x)
-        information = compute_coefficients(self.env)
-        control, obj = self.solve_func(information)
+        information = compute_coefficients(self.env, max_range=self.max_range, quad_order=self.quad_order, stats=self.stats)
+
+        if self.max_segment is not None:
+            with timer(self.stats, "aggregation"):
+                information, segments = aggregate_steps(information, max_length=self.max_segment, depth=self.segment_depth)
+
+        if self.threshold is None:
+            control, obj = self.solve_func(information, mip_gap=self.mip_gap, stats=self.stats)
+        else:
+            with timer(self.stats, "pruning"):
+                sparse = prune_coefficients(information, threshold=self.threshold, top_k=self.top_k)
+
+            index, obj = self.solve_sparse_func(sparse, mip_gap=self.mip_gap, stats=self.stats)
+            control = index_to_control(index, self.env.truths.size)
+
+        if self.max_segment is not None:
+            control = expand_control(control, segments)
 
         return control, obj
     
+    def get_info_slice(self, index: int, phase: float) -> np.ndarray[float]:
+        """
+        Computes the information coefficients of a single agent at the given phase, independent of all other agents.
+
+        Args:
+            index (int): index of the agent in the catalog of agents
+            phase (float): phase of the agent
+
+        Returns:
+            np.ndarray[float]: information coefficients of shape (maxsteps, num_targets)
+
+        Notes:
+            - The environment is left containing only the requested agent. Call `_gen_env` to restore all agents.
+        """
+
+        agent_info = np.array([self.ag.gen_phased_ic(index, phase)])
+        self.env.reset_new_agents(agents_info=agent_info)
+        information = compute_coefficients(self.env, quad_order=self.quad_order, stats=self.stats)
+
+        return information[:, 0, :]
+
     def get_obj(self, x: ArrayLike, u:np.ndarray[int]):
         """
         Generate the environment of the current decision vector and return the objective associated with the given control
 
         Args:
             x (ArrayLike): Decision vector
-            u (np.ndarray[float]): control tensor
+            u (np.ndarray[float]): control tensor, or its compact form of target indices of shape (maxsteps, num_agents)
 
         Returns:
             float: objective value
         """
 
         self._gen_env(x)
-        information = compute_coefficients(self.env)
+        information = compute_coefficients(self.env, quad_order=self.quad_order, stats=self.stats)
+
+        if u.ndim == 2:
+            return index_objective(information, u, self.opt)
 
         match self.opt:
             case "max":
@@ -168,7 +405,13 @@ class SSA_Problem():
             list: Negative objective value.
         """
 
-        _, objective = self.get_control_obj(x)
+        with timer(self.stats, "fitness"):
+            if self.block_size is None:
+                _, objective = self.get_control_obj(x)
+            else:
+                self._gen_env(x)
+                blocks = iter_coefficients(self.env, block_size=self.block_size, max_range=self.max_range, quad_order=self.quad_order, stats=self.stats)
+                _, objective = self.solve_blocks_func(blocks, mip_gap=self.mip_gap, stats=self.stats)
 
         return [-objective]
     
@@ -181,34 +424,21 @@ class SSA_Problem():
 
         Returns:
             tuple: A tuple containing negative objective value, control matrix.
+
+        Notes:
+            - Each observer looks at the target closest to it at the start of each time step.
         """
         self._gen_env(x)
-        information = compute_coefficients(self.env)
-
-        # self.env.reset()
+        information = compute_coefficients(self.env, quad_order=self.quad_order, stats=self.stats)
 
-        u = np.zeros_like(information, dtype=int)
+        t, _ = self.env.step_times(0, self.env.maxsteps)
+        observer_states, truth_states = self.env.get_states(t)
 
-        dists = np.zeros_like(information)
+        index = nearest_targets(observer_states[:, :, :3], truth_states[:, :, :3]).astype(np.int16)
 
-        for k in range(u.shape[0]):
-            
-            for i, observer in enumerate(self.env.observers):
-                j = self._closest_target(observer)
-                u[k, i, j] = 1
-                dists[k, i, :] = np.array([np.linalg.norm(observer.x[:3] - target.x[:3]) for target in self.env.truths])
-                # print(self.env.observers[0].x[:3], self.env.truths[0].x[:3])  Used for debugging, can delete
+        obj = index_objective(information, index, self.opt)
+        u = index_to_control(index, self.env.truths.size)
 
-            out = self.env.step()
-
-        if self.opt == "max":
-            obj = u.reshape(-1) @ information.reshape(-1)
-        elif self.opt == "maxmin":
-            obj = np.min(np.einsum('ijk,ijk->k', u, information))
-        else:
-            raise NotImplementedError
-        
-    
         return [-obj], u
 
     def _closest_target(self, observer: Spline):
@@ -222,8 +452,8 @@ class SSA_Problem():
             int: Index of the closest target.
         """
 
-        dists = np.array([np.linalg.norm(observer.x[:3] - target.x[:3]) for target in self.env.truths])
-        return np.argmin(dists)
+        target_positions = np.array([target.x[:3] for target in self.env.truths])
+        return nearest_targets(observer.x[np.newaxis, np.newaxis, :3], target_positions[np.newaxis])[0, 0]
 
     
     def get_bounds(self):
@@ -243,8 +473,9 @@ class SSA_Problem():
             x (ArrayLike): Current state.
 
         """
-        agents_info = self.ag.gen_phased_ics_from(x)
-        self.env.reset_new_agents(agents_info=agents_info)
+        with timer(self.stats, "environment"):
+            agents_info = self.ag.gen_phased_ics_from(x)
+            self.env.reset_new_agents(agents_info=agents_info)
 
 
 class Greedy_SSA_Problem(SSA_Problem):
@@ -257,6 +488,10 @@ class Greedy_SSA_Problem(SSA_Problem):
         agents (ArrayLike): A array of agent initial conditions.
         agent_periods (ArrayLike): A array of agent periods.
         opt (str): the type of optimization to run. One of either "max" or "maxmin"
+        tstep (float): Timestep for numerical propagation. Defaults to 0.015.
+        n_points (int): Number of ephemeris samples per period used to fit splines. Defaults to 500.
+        block_size (Optional[int]): If given, `fitness` solves block by block on streamed coefficients. Defaults to None.
+        horizon (Optional[float]): Simulation time. Defaults to the shortest period amongst all targets and observers.
 
     
     Attributes:
@@ -267,8 +502,8 @@ class Greedy_SSA_Problem(SSA_Problem):
         fitness(self, x): This method evaluates the fitness of a given solution 'x'.
         get_bounds(self): This method returns the bounds of the optimization problem. The bounds are [0, 1].
     """
-    def __init__(self, targets, target_periods,  agents , agent_periods, opt: Optional[str] = "max" ) -> None:
-        super().__init__(targets=targets, target_periods=target_periods, agents=agents, agent_periods=agent_periods, opt=opt)
+    def __init__(self, targets, target_periods,  agents , agent_periods, opt: Optional[str] = "max", tstep: Optional[float] = 0.015, n_points: Optional[int] = 500, block_size: Optional[int] = None, horizon: Optional[float] = None) -> None:
+        super().__init__(targets=targets, target_periods=target_periods, agents=agents, agent_periods=agent_periods, opt=opt, tstep=tstep, n_points=n_points, block_size=block_size, horizon=horizon)
 
         self.opt_phases = []
         self.opt_controls = []
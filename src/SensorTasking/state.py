@@ -2,7 +2,7 @@ from abc import ABC, abstractmethod
 from scipy.integrate import ode
 from scipy.interpolate import BSpline
 import numpy as np
-from typing import Optional, Callable, List
+from typing import Optional, Callable, List, Union
 
 
 class State(ABC):
@@ -149,12 +149,14 @@ class Spline(State):
         period (float): Period of the spline.
         spl (BSpline): Spline function.
         stm_spl (BSpline): Spline function for state transition matrix.
+        monodromy (np.ndarray): State transition matrix over one period, from the start of the STM history.
 
     Methods:
         __init__(tstep, spl, stm_spl, period): Initializes the Spline state.
         propagate(steps): Propagates the state forward by the specified number of steps.
         reset(): Resets the state to its initial condition.
         eval_stm_spl(t): Evaluates the spline function for the state transition matrix.
+        set_time(t): Moves the state to the requested time.
 
     """
     def __init__(self, tstep: float, spl: BSpline, stm_spl: BSpline, period: float):
@@ -162,6 +164,9 @@ class Spline(State):
         self.period = period
         self.spl = spl
         self.stm_spl = stm_spl
+        # the STM history of a phased orbit starts at Phi(phase * T, 0) instead of the identity, so the monodromy is
+        # conjugated by it
+        self.monodromy = np.linalg.solve(stm_spl(0).reshape(6, 6), stm_spl(period).reshape(6, 6))
 
         x0 = spl(0)
     
@@ -190,27 +195,55 @@ class Spline(State):
         self.x = self.ic
         self.t = 0
 
-    def eval_stm_spl(self, t: float):
+    def set_time(self, t: float):
+        """
+        Moves the state to the requested time.
+
+        Parameters:
+            t (float): time to move to.
+
+        Returns:
+            np.ndarray: The state at the requested time.
+
+        """
+        self.t = t
+        self.x = self.spl(self.t)
+        return self.x
+
+    def eval_stm_spl(self, t: Union[float, np.ndarray[float]]):
         """
         Evaluates the state transition matrix (STM) at the requested time.
 
         Parameters:
-            t (float): time at which to evaluate the STM.
+            t (Union[float, np.ndarray[float]]): time, or array of times, at which to evaluate the STM.
 
         Returns:
-            np.ndarray: The evaluated STM as a flattened array.
-        
-        Raises:
-            ValueError: If the requested time exceeds the period.
+            np.ndarray: The evaluated STM as a flattened array, of shape (36,) or (times, 36) for an array of times.
 
         Notes:
             - The returned STM will be a flattened ndarray. Use np.reshape to arrange elements into a proper matrix.
+            - The STM spline is only fitted over one period. Beyond it, the STM is extended with the monodromy matrix M
+              of the periodic orbit, Phi(t + nT) = Phi(t) M^n, where M = Phi(0)^-1 Phi(T) since the history of a phased
+              orbit starts at Phi(0) = Phi(phase * T, 0).
 
         """
-        if t > self.period:
-            raise ValueError("requested eval time exceeds the propagated time for STM")
-        else:
-            return self.stm_spl(t)
+        if np.ndim(t) == 0:
+            if t <= self.period:
+                return self.stm_spl(t)
+
+            n = int(t // self.period)
+            phi = self.stm_spl(t - n * self.period).reshape(6, 6) @ np.linalg.matrix_power(self.monodromy, n)
+
+            return phi.flatten()
+
+        t = np.asarray(t)
+        n = np.where(t <= self.period, 0, t // self.period).astype(int)
+        phi = self.stm_spl(t - n * self.period).reshape(-1, 6, 6)
+
+        for revs in np.unique(n[n > 0]):
+            phi[n == revs] = phi[n == revs] @ np.linalg.matrix_power(self.monodromy, revs)
+
+        return phi.reshape(-1, 36)
 
 
 class Analytic(State):
@@ -0,0 +1,50 @@
+import numpy as np
+
+
+def geometry_rates(states: np.ndarray[float], mu: float) -> np.ndarray[float]:
+    """
+    Computes how fast the geometry of a set of objects changes, as the largest angular rate of any object about the Moon.
+
+    Parameters:
+        states (np.ndarray[float]): States of the objects in the rotating frame, of shape (times, objects, 6).
+        mu (float): mass ratio of the CR3BP system.
+
+    Returns:
+        np.ndarray[float]: Rate of change of the geometry at each time, of shape (times,).
+
+    Notes:
+        - Objects move fastest in angle near perilune and slowest near apolune, which is where the line-of-sight and
+          hence the information coefficients change fastest and slowest.
+    """
+    r = states[..., :3] - np.array([1 - mu, 0., 0.])
+    v = states[..., 3:]
+
+    angular_rates = np.linalg.norm(np.cross(r, v), axis=-1) / np.sum(r * r, axis=-1)
+
+    return np.max(angular_rates, axis=-1)
+
+def adaptive_time_grid(t: np.ndarray[float], rates: np.ndarray[float], tstep: float, max_ratio: float = 8.) -> np.ndarray[float]:
+    """
+    Places time step boundaries so that the geometry changes by the same amount over every step.
+
+    Where the geometry changes fastest the steps are `tstep` long, elsewhere they grow in inverse proportion to the rate
+    of change, up to `max_ratio` times `tstep`.
+
+    Parameters:
+        t (np.ndarray[float]): Finely sampled times, starting at 0 and ending at the horizon.
+        rates (np.ndarray[float]): Rate of change of the geometry at each time, e.g. from `geometry_rates`.
+        tstep (float): Shortest time step.
+        max_ratio (float): Longest time step as a multiple of `tstep`. Defaults to 8. A ratio of 1 gives the uniform grid.
+
+    Returns:
+        np.ndarray[float]: Boundaries of the time steps, starting at 0. As with a uniform grid, the time after the last
+        whole step is dropped.
+    """
+    max_rate = np.max(rates)
+    rates = np.maximum(rates, max_rate / max_ratio)
+
+    # geometry change accumulated since t = 0, each step covers an equal share
+    change = np.concatenate(([0.], np.cumsum((rates[1:] + rates[:-1]) / 2 * np.diff(t))))
+    n_steps = int(np.floor(change[-1] / (max_rate * tstep)))
+
+    return np.interp(np.arange(n_steps + 1) * max_rate * tstep, change, t)
@@ -0,0 +1,232 @@
+import numpy as np
+import os
+from typing import Optional, Sequence, Tuple
+
+from .cr3bp import build_taylor_cr3bp, cr3bp
+from .scenarios import ORBITS
+
+MU = 1.215058560962404e-02  # earth-moon mass ratio
+
+_MAX_HALVINGS = 4
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "sensortasking")
+
+# part of the file names of cached catalogs, bumped when the same arguments draw a different catalog
+_CATALOG_VERSION = 2
+
+# Families of orbits symmetric about the xz-plane, continued from a seed orbit by stepping one component of the initial
+# condition. The other `free` components and the half period are corrected so that the orbit crosses the xz-plane
+# perpendicularly, y = vx = 0, and vz = 0 for spatial orbits.
+FAMILIES = {
+    "l1_lyapunov": {"seed": "l1_lyapunov", "parameter": 0, "step": -2e-3, "free": [4], "constraints": [1, 3]},
+    "l2_lyapunov": {"seed": "l2_lyapunov", "parameter": 0, "step": -2e-3, "free": [4], "constraints": [1, 3]},
+    "l2_halo": {"seed": "l2_halo", "parameter": 2, "step": -2e-3, "free": [0, 4], "constraints": [1, 3, 5]},
+    "dro": {"seed": "dro_5_03", "parameter": 0, "step": -4e-3, "free": [4], "constraints": [1, 3]},
+}
+
+
+def correct_orbit(ta,
+                  ic: np.ndarray[float],
+                  half_period: float,
+                  free: Sequence[int],
+                  constraints: Sequence[int],
+                  tol: Optional[float] = 1e-11,
+                  max_iter: Optional[int] = 20) -> Tuple[Optional[np.ndarray[float]], Optional[float]]:
+    """
+    Corrects an initial condition on the xz-plane to a periodic orbit with single shooting to the next plane crossing.
+
+    Parameters:
+        ta (hy.taylor_adaptive): Taylor integrator of the CR3BP with STM, see `build_taylor_cr3bp`.
+        ic (np.ndarray[float]): Initial guess of the initial condition.
+        half_period (float): Initial guess of the half period.
+        free (Sequence[int]): Components of the initial condition that are corrected.
+        constraints (Sequence[int]): Components of the state that must vanish at the half period.
+        tol (float): Tolerance on the constraints. Defaults to 1e-11.
+        max_iter (int): Maximum number of Newton iterations. Defaults to 20.
+
+    Returns:
+        Tuple[Optional[np.ndarray[float]], Optional[float]]: The corrected initial condition and period, or (None, None)
+        if the correction did not converge.
+
+    """
+    x = np.array(ic, dtype=float)
+    tau = half_period
+
+    for _ in range(max_iter):
+        ta.time = 0.
+        ta.state[:] = np.hstack((x, np.eye(6).flatten()))
+        ta.propagate_until(tau)
+
+        xf = ta.state[:6]
+        phi = ta.state[6:].reshape(6, 6)
+        g = xf[constraints]
+
+        if np.linalg.norm(g) < tol:
+            return x, 2 * tau
+
+        # sensitivities of the constraints to the free components and to the half period
+        J = np.column_stack((phi[np.ix_(constraints, free)], cr3bp(tau, xf, MU)[constraints]))
+        delta = np.linalg.lstsq(J, -g, rcond=None)[0]
+
+        x[free] += delta[:-1]
+        tau += delta[-1]
+
+        if not (np.all(np.isfinite(x)) and 0 < tau < 10 * half_period):
+            break
+
+    return None, None
+
+def is_periodic(ta, ic: np.ndarray[float], period: float, tol: Optional[float] = 1e-6) -> bool:
+    """
+    Checks that an initial condition returns to itself after one period.
+
+    Parameters:
+        ta (hy.taylor_adaptive): Taylor integrator of the CR3BP with STM, see `build_taylor_cr3bp`.
+        ic (np.ndarray[float]): Initial condition.
+        period (float): Period.
+        tol (float): Tolerance on the distance between the initial and final states. Defaults to 1e-6.
+
+    Returns:
+        bool: Whether the orbit is periodic.
+
+    """
+    ta.time = 0.
+    ta.state[:] = np.hstack((ic, np.eye(6).flatten()))
+    ta.propagate_until(period)
+
+    return np.linalg.norm(ta.state[:6] - ic) < tol
+
+def gen_family(name: str, n_members: Optional[int] = 50) -> Tuple[np.ndarray[float], np.ndarray[float]]:
+    """
+    Generates members of a family of periodic orbits by natural parameter continuation from its seed orbit.
+
+    Parameters:
+        name (str): Name of the family, one of the keys of FAMILIES.
+        n_members (int): Maximum number of members. Defaults to 50.
+
+    Returns:
+        Tuple[np.ndarray[float], np.ndarray[float]]: Initial conditions of shape (members, 6) and periods. Fewer than
+        `n_members` are returned if the correction fails to converge even with a reduced continuation step.
+
+    """
+    family = FAMILIES[name]
+    ta, _, _ = build_taylor_cr3bp(MU, stm=True)
+
+    seed_ic, seed_period = ORBITS[family["seed"]]
+    x, period = correct_orbit(ta, seed_ic, seed_period / 2, family["free"], family["constraints"])
+
+    ics, periods = [], []
+    step = family["step"]
+
+    while x is not None and is_periodic(ta, x, period) and len(ics) < n_members:
+        ics.append(x)
+        periods.append(period)
+
+        # the step is halved until the correction converges, and the continuation ends once it is too small
+        for _ in range(_MAX_HALVINGS):
+            guess = ics[-1].copy()
+            guess[family["parameter"]] += step
+            x, period = correct_orbit(ta, guess, periods[-1] / 2, family["free"], family["constraints"])
+
+            if x is not None and is_periodic(ta, x, period):
+                break
+
+            step /= 2
+
+    return np.array(ics).reshape(-1, 6), np.array(periods)
+
+def generate_catalog(size: int,
+                     families: Optional[Sequence[str]] = tuple(FAMILIES),
+                     n_members: Optional[int] = 50,
+                     seed: Optional[int] = 0,
+                     cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> Tuple[np.ndarray[float], np.ndarray[float]]:
+    """
+    Generates a reproducible catalog of periodic orbits, e.g. to test scaling to many targets.
+
+    Each entry is a distinct member of one of the families, drawn at random without replacement, started at a random
+    phase along the orbit. Its initial condition is therefore generally off the xz-plane. The catalog and the families are
+    cached.
+
+    Parameters:
+        size (int): Number of orbits in the catalog.
+        families (Sequence[str]): Families the orbits are drawn from. Defaults to all of FAMILIES.
+        n_members (int): Number of members of each family. Defaults to 50.
+        seed (int): Seed of the random draws. Defaults to 0.
+        cache_dir (Optional[str]): Directory of the cache. Defaults to ~/.cache/sensortasking. None disables caching.
+
+    Returns:
+        Tuple[np.ndarray[float], np.ndarray[float]]: Initial conditions of shape (size, 6) and periods, as taken by
+        TargetGenerator and SSA_Problem.
+
+    Raises:
+        ValueError: If `size` exceeds the number of members of the families.
+
+    """
+    filename = f"catalog_v{_CATALOG_VERSION}_{size}_{'-'.join(families)}_{n_members}_{seed}.npz"
+    cached = _load_cache(cache_dir, filename)
+    if cached is not None:
+        return cached["ics"], cached["periods"]
+
+    tables = []
+    for name in families:
+        table = _load_cache(cache_dir, f"family_{name}_{n_members}.npz")
+        if table is None:
+            ics, periods = gen_family(name, n_members)
+            _save_cache(cache_dir, f"family_{name}_{n_members}.npz", ics=ics, periods=periods)
+        else:
+            ics, periods = table["ics"], table["periods"]
+
+        tables.append((ics, periods))
+
+    # members of all families are numbered consecutively and drawn without replacement
+    sizes = np.array([periods.size for _, periods in tables])
+    if size > sizes.sum():
+        raise ValueError(f"A catalog of {size} orbits exceeds the {sizes.sum()} members of the families {list(families)}")
+
+    rng = np.random.default_rng(seed)
+    draws = rng.choice(sizes.sum(), size=size, replace=False)
+    family_ids = np.searchsorted(np.cumsum(sizes), draws, side="right")
+    members = draws - (np.cumsum(sizes) - sizes)[family_ids]
+    phases = rng.random(size)
+
+    ta, _, _ = build_taylor_cr3bp(MU, stm=False)
+    ics = np.zeros(shape=(size, 6))
+    periods = np.zeros(size)
+
+    for i, (f, member, phase) in enumerate(zip(family_ids, members, phases)):
+        periods[i] = tables[f][1][member]
+
+        ta.time = 0.
+        ta.state[:] = tables[f][0][member]
+        ta.propagate_until(phase * periods[i])
+        ics[i] = ta.state
+
+    _save_cache(cache_dir, filename, ics=ics, periods=periods)
+
+    return ics, periods
+
+def _load_cache(cache_dir: Optional[str], filename: str):
+    """
+    Loads arrays from the cache, or returns None if caching is disabled or the file is not cached.
+    """
+    if cache_dir is None or not os.path.exists(os.path.join(cache_dir, filename)):
+        return None
+
+    with np.load(os.path.join(cache_dir, filename)) as data:
+        return {name: data[name] for name in data.files}
+
+def _save_cache(cache_dir: Optional[str], filename: str, **arrays):
+    """
+    Saves arrays to the cache, unless caching is disabled.
+    """
+    if cache_dir is None:
+        return
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, filename)
+
+    # written under a temporary name, so that other processes never read a partial file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
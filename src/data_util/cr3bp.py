@@ -1,5 +1,8 @@
+import copy
 import numpy as np
-import heyoka as hy
+
+# integrators built in this process by (mu, stm), copied by `build_taylor_cr3bp`
+_TAYLOR_CACHE = {}
 
 def cr3bp(t, s, mu):
     """
@@ -82,19 +85,37 @@ def jac_cr3bp(t, s, mu):
     
     return A
 
-def build_taylor_cr3bp(mu, stm=False):
+def build_taylor_cr3bp(mu, stm=False, cached=True):
     """Build Taylor integrator for CR3BP equations of motion.
     If STM option is `True`, the state-vector is length-42 (6 states, 6x6 STM, row-by-row). 
     Args:
         mu (float): CR3BP gravitational parameter
         stm (bool): whether to include STM, default is False
+        cached (bool): whether to return a copy of an integrator built earlier in this process, default is True.
+            Building takes tens of milliseconds even when heyoka has cached the compiled code, copying a few.
         
     Returns:
         ta (hy.taylor_adaptive): taylor integrator for CR3BP
         r1 (float): distance from m1
         r2 (float): distance from m2
     """
+    if not cached:
+        return _build_taylor_cr3bp(mu, stm)
+
+    key = (float(mu), bool(stm))
+    if key not in _TAYLOR_CACHE:
+        _TAYLOR_CACHE[key] = _build_taylor_cr3bp(mu, stm)
+
+    ta, r1, r2 = _TAYLOR_CACHE[key]
+
+    return copy.deepcopy(ta), r1, r2
+
+def _build_taylor_cr3bp(mu, stm):
+    """Builds the integrator of `build_taylor_cr3bp`.
+    """
     # parameters
+    import heyoka as hy # only the integrators need heyoka, the equations of motion are NumPy
+
     mu_param = hy.par[0]
 
     # Variables
@@ -0,0 +1,60 @@
+import numpy as np
+
+# Periodic orbits of the Earth-Moon CR3BP used in the experiments, with their periods in nondimensional time units.
+ORBITS = {
+    # L2 Halo orbit
+    "l2_halo": (np.array([1.1540242813087864, 0.0, -0.1384196144071876, 4.06530060663289e-15, -0.21493019200956867, 8.48098638414804e-15]), 3.225),
+    # L1 Lyapunov
+    "l1_lyapunov": (np.array([0.8027692908754149, 0.0, 0.0, -1.1309830924549648e-14, 0.33765564334938736, 0.0]), 3.225),
+    # 1:1 L2 Lyapunov
+    "l2_lyapunov_1_1": (np.array([0.9982702689023665, 0.0, 0.0, -2.5322340091977996e-14, 1.5325475708886613, 0.0]), 6.45),
+    # 1:1 L1 Lyapunov
+    "l1_lyapunov_1_1": (np.array([0.65457084231188, 0.0, 0.0, 3.887957091335523e-13, 0.7413347560791179, 0.0]), 6.45),
+    # 2:1 Resonant
+    "resonant_2_1": (np.array([0.9519486347314083, 0.0, 0.0, 0.0, -0.952445273435512, 0.0]), 6.45),
+    # 3:1 Resonant
+    "resonant_3_1": (np.array([0.13603399956670137, 0.0, 0.0, 1.9130717669166003e-12, 3.202418276067991, 0.0]), 6.45),
+    # DRO
+    "dro_6_15": (np.array([3.86808653812329E-01, 6.8407409893399E-24, -5.60033463922659E-24, 1.09155528781707E-12, 1.60446309748097E+00, 1.32939502714562E-23]), 6.15436531128442),
+    # DRO
+    "dro_5_03": (np.array([6.8355909882592514E-1, 1.9414482129110789E-23, -4.7191016718963267E-25, -1.6753163837408492E-13, 7.2752642654283473E-1, 1.1511771211953919E-26]), 5.0298610501976651),
+    # L2 Lyapunov
+    "l2_lyapunov": (np.array([1.0636292377522296E+0, -3.1952388095755208E-28, 9.6105846729337803E-36, 4.8862169349265717E-15, 4.6223063293086447E-1, -9.4408653291941199E-34]), 3.7132531304869154),
+    # L1 Axial
+    "l1_axial": (np.array([8.6820930401836149E-1, 5.5027367208688037E-28, -4.4974818793315218E-14, 5.2267698022197043E-14, 5.8641302242843835E-2, -4.5352796623152170E-1]), 4.0644559461513419),
+    # butterfly
+    "butterfly": (np.array([9.0453898750573813E-1, -3.0042855182227924E-26, 1.4388186844294218E-1, -8.5656563732450135E-15, -4.9801575824700677E-2, -1.9332247649544646E-14]), 3.7265552310265724),
+}
+
+# Target and observer orbits of the experiments
+SCENARIOS = {
+    "4agent": {"targets": ["l2_halo", "l1_lyapunov", "l2_lyapunov"],
+               "agents": ["dro_6_15", "dro_5_03", "l1_axial", "butterfly"]},
+    "2agent": {"targets": ["l2_halo", "l1_lyapunov", "l2_lyapunov"],
+               "agents": ["dro_6_15", "dro_5_03"]},
+    "focus1target": {"targets": ["butterfly", "l2_lyapunov"],
+                     "agents": ["l2_halo"]},
+}
+
+
+def load_scenario(name: str):
+    """
+    Loads the initial conditions and periods of the targets and agents of a scenario.
+
+    Parameters:
+        name (str): Name of the scenario, one of the keys of SCENARIOS.
+
+    Returns:
+        dict: The arrays "targets", "target_periods", "agents" and "agent_periods", as taken by SSA_Problem.
+
+    """
+    if name not in SCENARIOS:
+        raise ValueError(f"Unknown scenario {name}. Must be one of {list(SCENARIOS)}")
+
+    scenario = {}
+    for role in ["targets", "agents"]:
+        orbits = [ORBITS[orbit] for orbit in SCENARIOS[name][role]]
+        scenario[role] = np.array([ic for ic, _ in orbits])
+        scenario[role[:-1] + "_periods"] = np.array([period for _, period in orbits])
+
+    return scenario
@@ -1,10 +1,42 @@
+import hashlib
+import os
+import pickle
 import numpy as np
 from scipy.interpolate import make_interp_spline
 from typing import Optional
 from numpy.typing import ArrayLike
 
+from SensorTasking.instrumentation import Stats, timer
+
 from .cr3bp import build_taylor_cr3bp
 
+# directory the ephemerides at phase zero are shared through, and those loaded or fitted by this process. See
+# `set_ephemeris_cache`.
+_ephemeris_cache_dir = None
+_ephemerides = {}
+
+def set_ephemeris_cache(cache_dir: Optional[str]):
+    """
+    Shares the splines of orbits at phase zero, which every problem fits when it is built, through a directory. Processes
+    that set the same directory, e.g. the workers of a batch of experiments, fit each orbit once.
+
+    Parameters:
+        cache_dir (Optional[str]): The directory, created if needed. None disables the cache, the default.
+
+    Returns:
+        Optional[str]: The previous directory.
+    """
+    global _ephemeris_cache_dir
+
+    previous = _ephemeris_cache_dir
+    _ephemeris_cache_dir = cache_dir
+    _ephemerides.clear()
+
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    return previous
+
 
 class TargetGenerator:
     """
@@ -19,23 +51,31 @@ class TargetGenerator:
         LU (float): Unit of length in kilometers.
         TU (float): Unit of time in seconds.
         r (np.ndarray[float]): Taylor integrator object from heyokapy for integrating CR3BP equations.
+        n_points (int): Number of ephemeris samples per period used to fit splines.
+        stats (Optional[Stats]): If set, propagation and spline fitting are timed, and integrator
+            steps counted, in it. Defaults to None.
 
     Methods:
         __init__(catalog, periods): Initializes the TargetGenerator with a catalog of targets and their periods.
         add_to_catalog(ic, period): Adds a new target to the catalog.
         gen_phased_ics(num_targets, gen_P): Provides phased initial conditions for requested targets.
+        default_covariance(): Returns the initial covariance of a target.
         gen_phased_ics_from(x): Generates phased initial conditions from a given phase array.
+        gen_phased_ic(catalog_ID, phase): Generates the phased initial condition of a single target.
         gen_state_history(catalog_ID, n_points, phase): Generates state history for a target.
+        gen_splines(catalog_ID, phase): Generates the state and STM splines of a target.
         make_spline(data, periodic): Generates a spline interpolation of data.
 
     """
-    def __init__(self, catalog: ArrayLike, periods: ArrayLike) -> None:
+    def __init__(self, catalog: ArrayLike, periods: ArrayLike, n_points: Optional[int] = 500, stats: Optional[Stats] = None) -> None:
         """
         Initializes the TargetGenerator with a catalog of targets and their periods.
 
         Parameters:
             catalog: An array containing the initial conditions of targets.
             periods: An array containing the periods of targets.
+            n_points: Number of ephemeris samples per period used to fit splines. Defaults to 500.
+            stats: Statistics propagation and spline fitting are recorded in. Defaults to None.
 
         Returns:
             None
@@ -48,6 +88,8 @@ class TargetGenerator:
         self.mu = 1.215058560962404e-02  # earth-moon mass ratio
         self.LU = 384400 # Earth-moon distance (km)
         self.TU = 3.751902619517228e+05 # time unit
+        self.n_points = n_points
+        self.stats = stats
     
         self.r, _, _ = build_taylor_cr3bp(self.mu, stm=True)
 
@@ -96,7 +138,7 @@ class TargetGenerator:
 
         """
         if gen_P:
-            target_P0 = np.block([[((500 / self.LU)**2) * np.eye(3), np.zeros(shape=(3,3))], [np.zeros(shape=(3,3)), ((0.001 * self.TU/self.LU)**2) * np.eye(3)]]) # 500 km uncertainty in position and 0.001 km/s uncertainty in velocity
+            target_P0 = self.default_covariance()
         else:
             target_P0 = None
 
@@ -107,9 +149,7 @@ class TargetGenerator:
 
         target_x = self.catalog[catalog_ID, :]
 
-        state_hist, stm_hist = self.gen_state_history(catalog_ID, 500, phase = 0)
-        spl = self.make_spline(state_hist, periodic=True)
-        stm_spl = self.make_spline(stm_hist, periodic=False)
+        spl, stm_spl = self.gen_splines(catalog_ID, phase=0)
         
         targets.append({
         "state" : target_x,
@@ -125,7 +165,7 @@ class TargetGenerator:
         
         for j in range(1, num_targets):
 
-            state_hist, stm_hist = self.gen_state_history(catalog_ID, 500, phase = shift * j / T)
+            state_hist, stm_hist = self.gen_state_history(catalog_ID, self.n_points, phase = shift * j / T)
             target = {
                 "state" : state_hist[0, 1:],
                 "covariance" : target_P0,
@@ -138,6 +178,16 @@ class TargetGenerator:
 
         return np.array(targets)
     
+    def default_covariance(self) -> np.ndarray[float]:
+        """
+        Returns the initial covariance of a target, 500 km uncertainty in position and 0.001 km/s uncertainty in velocity.
+
+        Returns:
+            np.ndarray[float]: Covariance matrix in nondimensional units, of shape (6, 6).
+
+        """
+        return np.block([[((500 / self.LU)**2) * np.eye(3), np.zeros(shape=(3,3))], [np.zeros(shape=(3,3)), ((0.001 * self.TU/self.LU)**2) * np.eye(3)]])
+
     def gen_phased_ics_from(self, x: ArrayLike):
         """
         Generates phased initial conditions from a given phase array.
@@ -150,27 +200,35 @@ class TargetGenerator:
 
         """
 
-        targets = []
+        targets = [self.gen_phased_ic(i, phase) for i, phase in enumerate(x)]
 
-        for i, phase in enumerate(x):
+        return np.array(targets)
 
-            T = self.periods[i]
+    def gen_phased_ic(self, catalog_ID: int, phase: float):
+        """
+        Generates the phased initial condition of a single target in the catalog.
 
-            target_x = self.catalog[i, :]
+        Parameters:
+            catalog_ID (int): Index of the target in the catalog.
+            phase (float): Phase offset, as a fraction of the period.
+
+        Returns:
+            dict: Phased initial condition, period, phase and splines of the target.
+
+        """
+        T = self.periods[catalog_ID]
 
-            state_hist, stm_hist = self.gen_state_history(i, 500, phase=phase)
-            spl = self.make_spline(state_hist, periodic=True)
-            stm_spl = self.make_spline(stm_hist, periodic=False)
-            
-            targets.append({
+        target_x = self.catalog[catalog_ID, :]
+
+        spl, stm_spl = self.gen_splines(catalog_ID, phase=phase)
+
+        return {
             "state" : target_x,
             "covariance" : None,
             "period" : T,
             "phase" : phase,
             "spline" : spl,
-            "stm_spline": stm_spl})
-
-        return np.array(targets)
+            "stm_spline": stm_spl}
     
     def gen_state_history(self, catalog_ID: int, n_points: int, phase: Optional[float] = 0):
         """
@@ -186,31 +244,72 @@ class TargetGenerator:
 
         """
 
-        tt = np.linspace(0, self.periods[catalog_ID], n_points)
-        state_history = np.zeros(shape=(n_points, 1 + self.dim))
-        stm_history = np.zeros(shape=(n_points, 1 + self.dim**2))
+        with timer(self.stats, "propagation"):
+            tt = np.linspace(0, self.periods[catalog_ID], n_points)
+            state_history = np.zeros(shape=(n_points, 1 + self.dim))
+            stm_history = np.zeros(shape=(n_points, 1 + self.dim**2))
 
-        ic = self.catalog[catalog_ID]
+            ic = self.catalog[catalog_ID]
 
-        state_history[:, 0] = tt
-        stm_history[:,0] = tt
-    
-        self.r.state[:] = np.hstack((ic, np.eye(self.dim).flatten()))
-        self.r.propagate_for(delta_t = phase * self.periods[catalog_ID])
+            state_history[:, 0] = tt
+            stm_history[:,0] = tt
 
+            self.r.state[:] = np.hstack((ic, np.eye(self.dim).flatten()))
+            phasing = self.r.propagate_for(delta_t = phase * self.periods[catalog_ID])
 
-        self.r.time = 0
-        state_history[0, 1:] = self.r.state[:self.dim]
-        stm_history[0, 1:] = self.r.state[self.dim:]
 
-        out = self.r.propagate_grid(tt)
+            self.r.time = 0
+            state_history[0, 1:] = self.r.state[:self.dim]
+            stm_history[0, 1:] = self.r.state[self.dim:]
 
-        state_history[:, 1:] = out[-1][:, :self.dim]
-        stm_history[:, 1:] = out[-1][:, self.dim:]
+            out = self.r.propagate_grid(tt)
+
+            state_history[:, 1:] = out[-1][:, :self.dim]
+            stm_history[:, 1:] = out[-1][:, self.dim:]
+
+            if self.stats is not None:
+                self.stats.add("propagations")
+                self.stats.add("heyoka_steps", phasing[3] + out[3])
 
         return state_history, stm_history
 
     
+    def gen_splines(self, catalog_ID: int, phase: Optional[float] = 0):
+        """
+        Generates the state and STM splines of a target, from the ephemeris cache at phase zero if it is set.
+
+        Parameters:
+            catalog_ID (int): Index of the target in the catalog.
+            phase (Optional[float], optional): Phase offset. Defaults to 0.
+
+        Returns:
+            Tuple[BSpline, BSpline]: State and STM splines.
+
+        """
+        if phase != 0 or _ephemeris_cache_dir is None:
+            state_hist, stm_hist = self.gen_state_history(catalog_ID, self.n_points, phase=phase)
+            return self.make_spline(state_hist, periodic=True), self.make_spline(stm_hist, periodic=False)
+
+        key = hashlib.sha1(np.hstack((self.catalog[catalog_ID], self.periods[catalog_ID], self.mu, self.n_points)).tobytes()).hexdigest()
+
+        if key not in _ephemerides:
+            path = os.path.join(_ephemeris_cache_dir, f"{key}.pkl")
+
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    _ephemerides[key] = pickle.load(f)
+            else:
+                state_hist, stm_hist = self.gen_state_history(catalog_ID, self.n_points)
+                _ephemerides[key] = (self.make_spline(state_hist, periodic=True), self.make_spline(stm_hist, periodic=False))
+
+                # written under a temporary name, so that other processes never read a partial file
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    pickle.dump(_ephemerides[key], f)
+                os.replace(tmp, path)
+
+        return _ephemerides[key]
+
     def make_spline(self, data: np.ndarray[float], periodic: bool):
         """
         Generates a spline interpolation of data.
@@ -223,16 +322,17 @@ class TargetGenerator:
             BSpline: Spline interpolation of data.
 
         """
-        if periodic:
-            x = np.append(data[:,0], data[-1, 0] + data[1,0])  # append another timestep to time grid
-            y = np.append(data[:, 1:], [data[0, 1:]], axis=0)
+        with timer(self.stats, "spline_fitting"):
+            if periodic:
+                x = np.append(data[:,0], data[-1, 0] + data[1,0])  # append another timestep to time grid
+                y = np.append(data[:, 1:], [data[0, 1:]], axis=0)
 
-            bspl = make_interp_spline(x, y, k=3, bc_type='periodic', axis=0)
+                bspl = make_interp_spline(x, y, k=3, bc_type='periodic', axis=0)
 
-        else:
-            x = data[:,0]
-            y = data[:, 1:]
+            else:
+                x = data[:,0]
+                y = data[:, 1:]
 
-            bspl = make_interp_spline(x, y, k=3, bc_type=None, axis=0)
+                bspl = make_interp_spline(x, y, k=3, bc_type=None, axis=0)
 
-        return bspl
\ No newline at end of file
+        return bspl
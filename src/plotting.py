@@ -8,6 +8,7 @@ import warnings
 
 from SensorTasking.ssa_problem import SSA_Problem
 from SensorTasking.compute_coefficients import compute_coefficients
+from SensorTasking.control import control_to_index
 
 def render(p: SSA_Problem,
            x: np.ndarray[float],
@@ -21,7 +22,8 @@ def render(p: SSA_Problem,
         p (SSA_Problem): The SSA problem instance.
         x (np.ndarray[float]): The phases of each observer.
         fig (int): The figure number to use for the animation.
-        control (Optional[np.ndarray[int]], optional): The control sequence. Defaults to None.
+        control (Optional[np.ndarray[int]], optional): The control sequence, either as a binary assignment matrix or in compact
+            form as target indices of shape (steps, observers). Defaults to None.
         save : Saves gif to file if True
     Returns:
         animation.FuncAnimation: The animation object.
@@ -47,9 +49,12 @@ def render(p: SSA_Problem,
     else:
         p._gen_env(x)
 
-    if control.dtype != int:
+    if not np.issubdtype(control.dtype, np.integer):
         warnings.warn("`control` does not contain elements of type `int`, program may raise Exceptions")
 
+    if control.ndim == 3:
+        control = control_to_index(control)
+
 
     p.env.reset()
 
@@ -78,29 +83,33 @@ def render(p: SSA_Problem,
     # place dots at initial observer positions
     obs_scat = ax.scatter(obs_posns[:,0], obs_posns[:,1], c="blue")
 
-    # connect the observer and target with a line
-    ctrls = np.where(control[0] == 1)[1]
+    # connect the observer and target with a line, idle observers are connected to themselves
     lines = [None]*p.env.observers.size
 
     
-    for i, ctrl in enumerate(ctrls):
-        lines[i] = ax.plot([obs_posns[i,0], truth_posns[ctrl,0]], [obs_posns[i,1], truth_posns[ctrl,1]], linewidth = 0.2, linestyle = "--")
+    for i, ctrl in enumerate(control[0]):
+        end = truth_posns[ctrl] if ctrl >= 0 else obs_posns[i]
+        lines[i] = ax.plot([obs_posns[i,0], end[0]], [obs_posns[i,1], end[1]], linewidth = 0.2, linestyle = "--")
+
+    # frames are drawn at the start of each time step, which may be non-uniform
+    t_frames, _ = p.env.step_times(0, p.env.maxsteps)
 
     def update(frame):
         # for each frame, update the data stored on each artist.
         for i, truth in enumerate(p.env.truths):
-            state_ = truth.spl(frame*truth.tstep)
+            state_ = truth.spl(t_frames[frame])
             truth_posns[i] = state_[:2]
 
         # connect the observer and target with a line
-        ctrls = np.where(control[frame] == 1.)[1]
+        ctrls = control[frame]
 
         for i, observer in enumerate(p.env.observers):
-            state = observer.spl(frame*observer.tstep)
+            state = observer.spl(t_frames[frame])
             obs_posns[i] = state[:2]
 
-            lines[i][0].set_xdata( [obs_posns[i,0], truth_posns[ctrls[i],0]] )
-            lines[i][0].set_ydata( [obs_posns[i,1], truth_posns[ctrls[i],1]] )
+            end = truth_posns[ctrls[i]] if ctrls[i] >= 0 else obs_posns[i]
+            lines[i][0].set_xdata( [obs_posns[i,0], end[0]] )
+            lines[i][0].set_ydata( [obs_posns[i,1], end[1]] )
 
 
         # update the scatter plots